@@ -0,0 +1,30 @@
+/* โหลดกราฟด้านล่างของหน้าเมื่อเลื่อนมาเห็น (หรือเมื่อเปิด tab ที่มี section นั้น)
+   แต่ละ section ที่มี data-lazy-section จะตั้งค่า dcc.Store "<id>-visible" เป็น true ครั้งเดียว */
+(function () {
+    var observed = new WeakSet();
+
+    var intersection = new IntersectionObserver(function (entries) {
+        entries.forEach(function (entry) {
+            if (!entry.isIntersecting || !window.dash_clientside) {
+                return;
+            }
+            var section = entry.target.getAttribute('data-lazy-section');
+            window.dash_clientside.set_props(section + '-visible', {data: true});
+            intersection.unobserve(entry.target);
+        });
+    }, {rootMargin: '200px 0px'});
+
+    function observeSections() {
+        document.querySelectorAll('[data-lazy-section]').forEach(function (el) {
+            if (!observed.has(el)) {
+                observed.add(el);
+                intersection.observe(el);
+            }
+        });
+    }
+
+    new MutationObserver(observeSections).observe(document.documentElement, {
+        childList: true,
+        subtree: true
+    });
+})();
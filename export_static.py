@@ -0,0 +1,273 @@
+import argparse
+import html as html_lib
+import json
+import os
+import re
+import shutil
+
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+import extra_dash as dashboard
+
+# ส่งออกหน้า dashboard สถานะเริ่มต้นเป็นไฟล์ HTML/JSON แบบ static
+# ทุกชุดค่าผสมของ cost-type x program-type-filter ให้ CDN หรือ file server เสิร์ฟได้โดยไม่ต้องมี Python
+#
+#   python export_static.py --out static_snapshot
+#
+# โครงสร้างผลลัพธ์:
+#   index.html                       -> ค่าเริ่มต้น (ต่อภาค, ทุกประเภท)
+#   <cost>/<program-type>/index.html -> หน้าแต่ละชุดค่าผสม
+#   figures/*.json                   -> figure ของแต่ละกราฟ (plotly JSON)
+#   manifest.json                    -> รายการไฟล์ทั้งหมดตามชุดค่าผสม
+
+COST_TYPE_SLUGS = {
+    'ค่าใช้จ่ายต่อภาค': 'semester',
+    'ค่าใช้จ่ายตลอดหลักสูตร': 'total',
+}
+
+VOID_TAGS = {'br', 'hr', 'img', 'input'}
+
+
+def program_type_slug(value):
+    if value == 'all':
+        return 'all'
+    values = [o['value'] for o in dashboard.PROGRAM_TYPE_OPTIONS]
+    return f"type-{values.index(value)}"
+
+
+def page_path(cost_type, program_type):
+    return f"{COST_TYPE_SLUGS[cost_type]}/{program_type_slug(program_type)}/index.html"
+
+
+def style_to_css(style):
+    rules = []
+    for key, value in (style or {}).items():
+        prop = re.sub(r'([A-Z])', lambda m: '-' + m.group(1).lower(), key)
+        if prop.startswith('webkit-'):
+            prop = '-' + prop
+        rules.append(f"{prop}: {value}")
+    return '; '.join(rules)
+
+
+def render_attributes(props):
+    attrs = []
+    if props.get('id'):
+        attrs.append(f'id="{html_lib.escape(str(props["id"]))}"')
+    if props.get('className'):
+        attrs.append(f'class="{html_lib.escape(props["className"])}"')
+    if props.get('style'):
+        attrs.append(f'style="{html_lib.escape(style_to_css(props["style"]))}"')
+    for key, value in props.items():
+        if key.startswith('data-') or key in ('href', 'src', 'title'):
+            attrs.append(f'{key}="{html_lib.escape(str(value))}"')
+    return (' ' + ' '.join(attrs)) if attrs else ''
+
+
+def render_figure(graph_id, figure):
+    fig_json = pio.to_json(figure, validate=False)
+    return (f'<div id="{graph_id}"></div>'
+            f'<script>(function(){{var f={fig_json};'
+            f'Plotly.newPlot("{graph_id}", f.data, f.layout, {{responsive: true}});}})();</script>')
+
+
+def render_radio_links(props, current, href_for):
+    items = []
+    for option in props.get('options', []):
+        label = html_lib.escape(str(option['label']))
+        if option['value'] == current:
+            items.append(f'<strong style="margin-right: 25px">&#9679; {label}</strong>')
+        else:
+            items.append(f'<a href="{href_for(option["value"])}" '
+                         f'style="margin-right: 25px">&#9675; {label}</a>')
+    return f'<div{render_attributes(props)}>{"".join(items)}</div>'
+
+
+def render_component(node, context):
+    # แปลง component tree ของ Dash เป็น HTML แบบ static
+    if node is None:
+        return ''
+    if isinstance(node, (list, tuple)):
+        return ''.join(render_component(child, context) for child in node)
+    if isinstance(node, (str, int, float)):
+        return html_lib.escape(str(node))
+
+    props = node.to_plotly_json()['props']
+    node_type = node._type
+    node_id = props.get('id')
+
+    if node._namespace == 'dash_html_components':
+        tag = node_type.lower()
+        if tag in VOID_TAGS:
+            return f'<{tag}{render_attributes(props)}>'
+        children = context['children'].get(node_id, props.get('children'))
+        return f'<{tag}{render_attributes(props)}>{render_component(children, context)}</{tag}>'
+
+    if node_type == 'Graph':
+        return render_figure(node_id, context['figures'][node_id])
+    if node_type == 'RadioItems' and node_id in context['radio_links']:
+        current, href_for = context['radio_links'][node_id]
+        return render_radio_links(props, current, href_for)
+    if node_type == 'Dropdown':
+        value = context['values'].get(node_id, props.get('value'))
+        if not value:
+            return ''
+        values = value if isinstance(value, list) else [value]
+        text = ', '.join(html_lib.escape(str(v)) for v in values)
+        return f'<div style="{style_to_css(dashboard.dropdown_style)}; padding: 8px 12px">{text}</div>'
+    # Store และ component อื่นที่ไม่มีผลต่อการแสดงผลแบบ static
+    return ''
+
+
+def find_component(component_id):
+    for node in dashboard.app.layout._traverse():
+        if getattr(node, 'id', None) == component_id:
+            return node
+    return None
+
+
+def default_selections():
+    uni1 = find_component('university-1-dropdown').value
+    uni2 = find_component('university-2-dropdown').value
+    _, prog1 = dashboard.search_program_options(uni1, '', None)
+    _, prog2 = dashboard.search_program_options(uni2, '', None)
+    return {
+        'university-1-dropdown': uni1,
+        'program-1-dropdown': prog1,
+        'university-2-dropdown': uni2,
+        'program-2-dropdown': prog2,
+    }
+
+
+def write_text(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(data)
+
+
+def export(out_dir):
+    dashboard.create_app()
+    os.makedirs(out_dir, exist_ok=True)
+    os.makedirs(os.path.join(out_dir, 'assets'), exist_ok=True)
+    with open(os.path.join(out_dir, 'assets', 'plotly.min.js'), 'w', encoding='utf-8') as f:
+        f.write(get_plotlyjs())
+    shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'style.css'),
+                os.path.join(out_dir, 'assets', 'style.css'))
+
+    selections = default_selections()
+    cost_types = [o['value'] for o in dashboard.COST_TYPE_OPTIONS]
+    program_types = [o['value'] for o in dashboard.PROGRAM_TYPE_OPTIONS]
+
+    # กราฟที่ขึ้นกับตัวแปรเดียว คำนวณครั้งเดียวต่อค่า
+    figure_files = {}
+    comparison = {}
+    for cost_type in cost_types:
+        comparison[cost_type] = dashboard.build_comparison_chart(
+            selections['university-1-dropdown'], selections['program-1-dropdown'],
+            selections['university-2-dropdown'], selections['program-2-dropdown'],
+            cost_type)
+        path = f"figures/comparison-{COST_TYPE_SLUGS[cost_type]}.json"
+        write_text(os.path.join(out_dir, path), pio.to_json(comparison[cost_type], validate=False))
+        figure_files[('comparison', cost_type)] = path
+
+    # heatmap กรองตามประเภทหลักสูตรเหมือนใน app (args เดียวกับ warmup_tasks -> ใช้แคชร่วมกัน)
+    heatmaps = {}
+    for cost_type in cost_types:
+        for program_type in program_types:
+            heatmaps[(cost_type, program_type)] = dashboard.build_cost_heatmap(cost_type, program_type, ())
+            path = f"figures/heatmap-{COST_TYPE_SLUGS[cost_type]}-{program_type_slug(program_type)}.json"
+            write_text(os.path.join(out_dir, path),
+                       pio.to_json(heatmaps[(cost_type, program_type)], validate=False))
+            figure_files[('heatmap', cost_type, program_type)] = path
+
+    field_bars = {}
+    for program_type in program_types:
+        field_bars[program_type] = dashboard.build_field_average_bar(program_type)
+        path = f"figures/field-bar-{program_type_slug(program_type)}.json"
+        write_text(os.path.join(out_dir, path),
+                   pio.to_json(field_bars[program_type], validate=False))
+        figure_files[('field-bar', program_type)] = path
+
+    def render_snapshot(cost_type, program_type, root):
+        distribution, distribution_table = dashboard.build_cost_distribution(
+            cost_type, find_component('distribution-dimension').value, program_type)
+        trend, trend_changes = dashboard.build_cost_trends(cost_type)
+        context = {
+            'figures': {
+                'comparison-chart': comparison[cost_type],
+                'field-average-cost-bar': field_bars[program_type],
+                'cost-heatmap-campus-field': heatmaps[(cost_type, program_type)],
+                'cost-distribution-chart': distribution,
+                'trend-chart': trend,
+            },
+            'children': {
+                'insights-content': dashboard.build_insights(cost_type, program_type),
+                'cost-distribution-table': distribution_table,
+                'trend-changes': trend_changes,
+                'similar-programs': dashboard.build_similar_programs(
+                    selections['university-1-dropdown'], selections['program-1-dropdown'], cost_type),
+                'affordable-programs': dashboard.build_affordable_table(
+                    *dashboard.query_affordable(), 0),
+            },
+            'values': selections,
+            'radio_links': {
+                'cost-type': (cost_type, lambda v: root + page_path(v, program_type)),
+                'program-type-filter': (program_type, lambda v: root + page_path(cost_type, v)),
+            },
+        }
+        return render_page(render_component(dashboard.app.layout, context), root)
+
+    manifest = {'default': 'index.html', 'pages': []}
+    for cost_type in cost_types:
+        for program_type in program_types:
+            rel_page = page_path(cost_type, program_type)
+            write_text(os.path.join(out_dir, rel_page),
+                       render_snapshot(cost_type, program_type, '../' * rel_page.count('/')))
+            manifest['pages'].append({
+                'cost_type': cost_type,
+                'program_type': program_type,
+                'page': rel_page,
+                'figures': {
+                    'comparison': figure_files[('comparison', cost_type)],
+                    'heatmap': figure_files[('heatmap', cost_type, program_type)],
+                    'field_bar': figure_files[('field-bar', program_type)],
+                },
+            })
+
+    # หน้าแรกคือสถานะเริ่มต้นของ dashboard
+    write_text(os.path.join(out_dir, 'index.html'),
+               render_snapshot(cost_types[0], 'all', ''))
+
+    write_text(os.path.join(out_dir, 'manifest.json'),
+               json.dumps(manifest, ensure_ascii=False, indent=2))
+    return manifest
+
+
+def render_page(body, root):
+    return f"""<!DOCTYPE html>
+<html lang="th">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>University Engineering Programs Analysis</title>
+<link rel="stylesheet" href="{root}assets/style.css">
+<script src="{root}assets/plotly.min.js"></script>
+</head>
+<body style="margin: 0">
+{body}
+</body>
+</html>
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export static snapshot of extra_dash")
+    parser.add_argument('--out', default='static_snapshot', help="output directory")
+    args = parser.parse_args()
+
+    manifest = export(args.out)
+    print(f"💾 Exported {len(manifest['pages'])} pages to {args.out}/")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,55 @@
+import time
+STARTUP_START = time.perf_counter()
+
+import argparse
+import functools
+import importlib.util
+import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
 import dash
-from dash import dcc, html, Input, Output, callback
-import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import pandas as pd
-import numpy as np
+from dash import dcc, html, Input, Output, State, callback
+from dash.exceptions import PreventUpdate
+from flask import request, jsonify, Response, stream_with_context
+from tcas_cache import make_cache, dataset_version, uncached
+from tcas_metrics import RunMetrics
+
+# เวลาเริ่มโปรแกรมแยกตาม phase (imports, module, heavy_imports, skeletons, load_data, indexes,
+# layout, warm_up)
+# ดู startup_profile และ python extra_dash.py --startup-profile
+startup = RunMetrics()
+startup.record('imports', time.perf_counter() - STARTUP_START)
+MODULE_START = time.perf_counter()
+
+# pandas/numpy และโมดูลดัชนี/ประวัติ (ซึ่ง import pandas) โหลดใน create_app ไม่ใช่ตอน import extra_dash
+# ทุกชื่อประกาศไว้ที่นี่ (None จนกว่าจะโหลด) - ฟังก์ชันที่ใช้ถูกเรียกหลัง create_app เท่านั้น
+# (plotly ไม่ต้องเลื่อน: dash และ tcas_cache import plotly อยู่แล้ว)
+pd = np = tcas_cdc = tcas_history = None
+SearchIndex = BitmapIndex = QuantileSketch = GroupAggregates = NearestNeighbourIndex = ColumnTable = None
+
+
+def import_heavy_modules():
+    global pd, np, tcas_cdc, tcas_history
+    global SearchIndex, BitmapIndex, QuantileSketch, GroupAggregates, NearestNeighbourIndex, ColumnTable
+    import pandas as pd
+    import numpy as np
+    from tcas_index import (SearchIndex, BitmapIndex, QuantileSketch, GroupAggregates,
+                            NearestNeighbourIndex, ColumnTable)
+    import tcas_cdc
+    import tcas_history
+
 
 # อ่านข้อมูล
-df = pd.read_csv('tcas_cleaned.csv')
+DATA_FILE = 'tcas_cleaned.csv'
 
-# ทำความสะอาดข้อมูล
-df['ค่าใช้จ่ายต่อภาค'] = pd.to_numeric(df['ค่าใช้จ่ายต่อภาค'], errors='coerce')
-df['ค่าใช้จ่ายตลอดหลักสูตร'] = pd.to_numeric(
-    df['ค่าใช้จ่ายตลอดหลักสูตร'], errors='coerce')
+# แคชผลลัพธ์ของ callback (ดู tcas_cache.py) - key ผูกกับเวอร์ชันของไฟล์ข้อมูล
+# (DATASET_VERSION กำหนดใน load_data)
+DATASET_VERSION = None
+result_cache = make_cache()
 
 # สร้างตัวแปรสำหรับการจัดกลุ่มมหาวิทยาลัย
 
@@ -30,11 +67,234 @@ def categorize_university(uni_name):
         return 'Private'
 
 
-df['University_Category'] = df['มหาวิทยาลัย'].apply(categorize_university)
+def prepare_frame(frame):
+    # หนึ่งแถวต่อ url (แถวแรก) - ค่าสรุปทั้งแบบสร้างใหม่และแบบ delta (tcas_cdc ใช้ url เป็น key)
+    # จึงเห็นชุดแถวเดียวกันเสมอ, index ต้องเป็น RangeIndex สำหรับ bitmap
+    frame = frame.dropna(subset=['url']).drop_duplicates(subset=['url']).reset_index(drop=True)
+    # ทำความสะอาดข้อมูล
+    frame['ค่าใช้จ่ายต่อภาค'] = pd.to_numeric(frame['ค่าใช้จ่ายต่อภาค'], errors='coerce')
+    frame['ค่าใช้จ่ายตลอดหลักสูตร'] = pd.to_numeric(
+        frame['ค่าใช้จ่ายตลอดหลักสูตร'], errors='coerce')
+    frame['University_Category'] = frame['มหาวิทยาลัย'].apply(categorize_university)
+    return frame
+
+
+# ตัวเลือกของ radio ที่ใช้ร่วมกันหลาย callback
+COST_TYPE_OPTIONS = [
+    {'label': 'Per Semester', 'value': 'ค่าใช้จ่ายต่อภาค'},
+    {'label': 'Total Program', 'value': 'ค่าใช้จ่ายตลอดหลักสูตร'}
+]
+
+# ข้อมูลโหลดใน create_app (ไม่ใช่ตอน import) - df และ PROGRAM_TYPE_OPTIONS ว่างจนกว่าจะโหลด
+df = None
+PROGRAM_TYPE_OPTIONS = []
+
+
+def load_data(path=DATA_FILE):
+    global df, DATASET_VERSION, PROGRAM_TYPE_OPTIONS
+    df = prepare_frame(pd.read_csv(path))
+    DATASET_VERSION = dataset_version(path)
+    PROGRAM_TYPE_OPTIONS = [{'label': pt, 'value': pt} for pt in sorted(df['ประเภทหลักสูตร'].dropna().unique())] + [
+        {'label': 'All Programs', 'value': 'all'}
+    ]
+    refresh_state['mtime'] = os.path.getmtime(path)
+    return df
+
+# ดัชนีค้นหาสำหรับ dropdown - ส่งเฉพาะรายการที่ตรงกับคำค้นไปที่ browser
+DROPDOWN_OPTION_LIMIT = 50
+
+# cross-filter: คลิกกราฟหนึ่งแล้วกรองกราฟอื่น ใช้ bitmap index ต่อค่าของแต่ละคอลัมน์
+# (df ต้องมี RangeIndex - ตำแหน่งแถวตรงกับบิตใน bitmap)
+CROSS_FILTER_COLUMNS = ['สาขาวิชา', 'ชื่อวิทยาเขต', 'University_Category']
+
+
+# ดัชนีระดับแถว (สร้างใน create_app / refresh_dataset)
+university_index = program_ids_by_university = program_index = None
+program_lookup = program_pair_by_url = comparison_index = comparison_labels = None
+program_bitmaps = None
+
+
+def build_row_indexes(frame):
+    # ดัชนีระดับแถวทั้งหมดของ frame -> dict ของชื่อ global (ดู install_row_indexes)
+    # refresh_dataset สร้างจาก df ใหม่ให้เสร็จก่อน แล้วจึงสลับพร้อมกับ df
+
+    university_index = SearchIndex(
+        [(uni, uni, [uni]) for uni in sorted(frame['มหาวิทยาลัย'].dropna().unique())])
+
+    program_items = []
+    program_ids_by_university = {}
+    for (uni, prog), group in frame.dropna(subset=['มหาวิทยาลัย', 'ชื่อหลักสูตร']).groupby(
+            ['มหาวิทยาลัย', 'ชื่อหลักสูตร'], sort=False):
+        texts = [prog]
+        if 'ชื่อหลักสูตรภาษาอังกฤษ' in frame.columns:
+            texts += group['ชื่อหลักสูตรภาษาอังกฤษ'].dropna().tolist()
+        program_ids_by_university.setdefault(uni, []).append(len(program_items))
+        program_items.append((prog, prog, texts))
+    program_index = SearchIndex(program_items)
+
+    # ตารางค้นหาหลักสูตรแบบ batch: (มหาวิทยาลัย, ชื่อหลักสูตร) -> แถวแรกที่พบ (เหมือน .iloc[0] เดิม)
+    program_lookup = frame.dropna(subset=['มหาวิทยาลัย', 'ชื่อหลักสูตร']).drop_duplicates(
+        subset=['มหาวิทยาลัย', 'ชื่อหลักสูตร']).set_index(['มหาวิทยาลัย', 'ชื่อหลักสูตร'])
+    program_pair_by_url = dict(zip(program_lookup['url'], program_lookup.index))
+
+    # ดัชนีค้นหาสำหรับ dropdown เปรียบเทียบหลายหลักสูตร (value = url)
+    comparison_index = SearchIndex([
+        (row_url, f"{prog} — {uni}", [prog, uni])
+        for row_url, (uni, prog) in program_pair_by_url.items()
+    ])
+    comparison_labels = dict(zip(comparison_index.values, comparison_index.labels))
+
+    program_bitmaps = BitmapIndex(frame, CROSS_FILTER_COLUMNS + ['ประเภทหลักสูตร'])
+    return {
+        'university_index': university_index,
+        'program_ids_by_university': program_ids_by_university,
+        'program_index': program_index,
+        'program_lookup': program_lookup,
+        'program_pair_by_url': program_pair_by_url,
+        'comparison_index': comparison_index,
+        'comparison_labels': comparison_labels,
+        'program_bitmaps': program_bitmaps,
+    }
+
+
+def install_row_indexes(indexes):
+    globals().update(indexes)
+
+
+def freeze_filters(cross_filter, exclude=()):
+    # dict จาก dcc.Store -> tuple ที่เรียงแล้ว ใช้เป็น key ของแคชได้
+    return tuple(
+        (column, tuple(sorted(values)))
+        for column, values in sorted((cross_filter or {}).items())
+        if values and column in CROSS_FILTER_COLUMNS and column not in exclude
+    )
+
+
+def filter_query(program_type='all', filters=()):
+    query = dict(filters)
+    if program_type and program_type != 'all':
+        query['ประเภทหลักสูตร'] = [program_type]
+    return query
+
+
+def apply_filters(frame, program_type='all', filters=()):
+    query = filter_query(program_type, filters)
+    if not query:
+        return frame
+    mask = program_bitmaps.mask(program_bitmaps.query(query))
+    return frame[mask[frame.index.to_numpy()]]
+
+
+# การกระจายของค่าใช้จ่าย: เก็บ quantile sketch ต่อกลุ่มย่อยที่เล็กที่สุดไว้ล่วงหน้า
+# ตัวกรองใด ๆ = รวม (merge) sketch ของกลุ่มที่ตรงเงื่อนไข ไม่ต้องเรียงข้อมูลดิบใหม่
+SKETCH_COLUMNS = CROSS_FILTER_COLUMNS + ['ประเภทหลักสูตร']
+DISTRIBUTION_DIMENSIONS = [
+    {'label': 'Field of Study', 'value': 'สาขาวิชา'},
+    {'label': 'Campus', 'value': 'ชื่อวิทยาเขต'},
+    {'label': 'University Category', 'value': 'University_Category'}
+]
+PERCENTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+
+# ค่าสรุปต่อกลุ่มย่อยของแต่ละ cost type: ผลรวม/จำนวน (ค่าเฉลี่ยของ field bar และ heatmap)
+# และ quantile sketch - refresh_dataset อัปเดตด้วย delta ของ crawl ใหม่แทนการคำนวณใหม่ทั้งหมด
+cost_summaries = {}
+
+
+def build_sketches(view, sketches=None, remove=False):
+    sketches = {} if sketches is None else sketches
+    for key, group in view.dropna(subset=SKETCH_COLUMNS).groupby(SKETCH_COLUMNS, sort=False):
+        values = group['cost_numeric'].to_numpy()
+        if remove:
+            if key in sketches and sketches[key].remove_many(values).count == 0:
+                del sketches[key]
+        else:
+            sketches.setdefault(key, QuantileSketch()).add_many(values)
+    return sketches
+
+
+def cost_summary(cost_type):
+    summary = cost_summaries.get(cost_type)
+    if summary is None:
+        # สร้างครั้งแรกภายใต้ refresh_lock - ค่าที่คำนวณจาก df เดิมจะไม่หลุดเข้า cost_summaries ชุดใหม่
+        with refresh_lock:
+            summary = cost_summaries.get(cost_type)
+            if summary is None:
+                view = cost_view(cost_type)
+                summary = (GroupAggregates(SKETCH_COLUMNS).add(view, 'cost_numeric'),
+                           build_sketches(view))
+                cost_summaries[cost_type] = summary
+    return summary
+
+
+def apply_cost_delta(summary, outgoing, incoming, cost_type):
+    # delta ของ crawl ใหม่บนสำเนา - ชุดเดิมไม่ถูกแก้ request ที่อ่านอยู่ (ไม่ถือ lock) จึงไม่เห็นค่าครึ่งทาง
+    aggregates, sketches = summary
+    old_rows = with_cost_numeric(outgoing, cost_type)
+    new_rows = with_cost_numeric(incoming, cost_type)
+    aggregates = aggregates.copy().remove(old_rows, 'cost_numeric').add(new_rows, 'cost_numeric')
+    sketches = {key: sketch.copy() for key, sketch in sketches.items()}
+    build_sketches(old_rows, sketches, remove=True)
+    build_sketches(new_rows, sketches)
+    return aggregates, sketches
+
+
+def cost_aggregates(cost_type):
+    return cost_summary(cost_type)[0]
+
+
+def cost_sketches(cost_type):
+    return cost_summary(cost_type)[1]
+
+
+def merged_sketches(cost_type, dimension, program_type='all', filters=()):
+    query = {column: set(values) for column, values in filter_query(program_type, filters).items()}
+    position = {column: i for i, column in enumerate(SKETCH_COLUMNS)}
+
+    merged = {}
+    for key, sketch in cost_sketches(cost_type).items():
+        if any(key[position[column]] not in values for column, values in query.items()):
+            continue
+        group = key[position[dimension]]
+        if group in merged:
+            merged[group].merge(sketch)
+        else:
+            merged[group] = sketch.copy()
+    return merged
+
+
+def with_selected_option(options, value):
+    # ค่าที่เลือกไว้ต้องอยู่ใน options เสมอ ไม่เช่นนั้น dropdown จะแสดงค่าว่าง
+    if value is not None and not any(o['value'] == value for o in options):
+        options = [{'label': value, 'value': value}] + options
+    return options
 
 # สร้าง Dash app
 app = dash.Dash(__name__)
 
+# โหมด lazy: heatmap และ insights (อยู่ด้านล่างของหน้า) จะคำนวณเมื่อเลื่อนมาเห็นเท่านั้น
+# ดู assets/lazy_sections.js
+LAZY_SECTIONS = os.environ.get('TCAS_LAZY_SECTIONS', '0') == '1'
+
+# ดาวน์โหลดแบบ Parquet ใช้ได้เมื่อติดตั้ง pyarrow (ไม่มี -> ซ่อนลิงก์)
+PARQUET_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+# โหมด background: heatmap, distribution และ insights คำนวณในโปรเซสแยก (Dash DiskcacheManager)
+# worker ของเว็บจึงว่างรับ callback เบา ๆ ระหว่างรอ, แสดง progress และงานเก่าถูกยกเลิกเมื่อ input เปลี่ยนอีก
+#   TCAS_BACKGROUND_CALLBACKS=1 -> เปิดใช้ (ต้องติดตั้ง diskcache, multiprocess, psutil)
+#   TCAS_JOB_DIR=...            -> โฟลเดอร์คิวงาน (ค่าเริ่มต้น .tcas_jobs)
+BACKGROUND_CALLBACKS = os.environ.get('TCAS_BACKGROUND_CALLBACKS', '0') == '1'
+HEAVY_SECTIONS = ['heatmap', 'distribution', 'insights']
+background_manager = None
+if BACKGROUND_CALLBACKS:
+    try:
+        import diskcache
+        background_manager = dash.DiskcacheManager(
+            diskcache.Cache(os.environ.get('TCAS_JOB_DIR', '.tcas_jobs')))
+    except ImportError as e:
+        print(f"Error in background callbacks: {e} - heavy views will run in the request")
+        BACKGROUND_CALLBACKS = False
+
 # ธีมสีหลัก
 THEME_COLORS = {
     'primary': '#2E86AB',        # น้ำเงินเข้ม
@@ -48,6 +308,13 @@ THEME_COLORS = {
     'border': '#E2E8F0'          # เทาขอบ
 }
 
+# สีของแท่งกราฟเปรียบเทียบ (วนซ้ำเมื่อเลือกหลักสูตรมากกว่าจำนวนสี)
+COMPARISON_COLORS = [
+    THEME_COLORS['primary'], THEME_COLORS['secondary'], THEME_COLORS['accent'],
+    THEME_COLORS['success'], '#3b82f6', '#10b981', '#8b5cf6', '#ec4899',
+    '#06b6d4', '#f59e0b'
+]
+
 # สไตล์สำหรับการ์ด
 card_style = {
     'backgroundColor': THEME_COLORS['surface'],
@@ -61,6 +328,20 @@ card_style = {
     'overflow': 'hidden'
 }
 
+# สไตล์หัวตาราง/เซลล์ของตาราง html (ตัวเลขชิดขวา - คอลัมน์ข้อความ override เป็น textAlign left)
+table_header_style = {
+    'padding': '8px 12px',
+    'textAlign': 'right',
+    'borderBottom': f'2px solid {THEME_COLORS["border"]}',
+    'color': THEME_COLORS['text_primary']
+}
+table_cell_style = {
+    'padding': '6px 12px',
+    'textAlign': 'right',
+    'borderBottom': f'1px solid {THEME_COLORS["border"]}',
+    'color': THEME_COLORS['text_secondary']
+}
+
 # สไตล์สำหรับ dropdown
 dropdown_style = {
     'backgroundColor': THEME_COLORS['surface'],
@@ -98,250 +379,290 @@ section_title_style = {
 }
 
 # Layout
-app.layout = html.Div([
-    # Header
-    html.Div([
+def build_layout():
+    # สร้างครั้งเดียวใน create_app (ใช้ df ที่โหลดแล้ว)
+    return html.Div([
+        # สถานะการมองเห็นของ section ที่โหลดแบบ lazy
+        dcc.Store(id='heatmap-section-visible', data=not LAZY_SECTIONS),
+        dcc.Store(id='insights-section-visible', data=not LAZY_SECTIONS),
+        dcc.Store(id='distribution-section-visible', data=not LAZY_SECTIONS),
+        dcc.Store(id='trend-section-visible', data=not LAZY_SECTIONS),
+        dcc.Store(id='cross-filter', data={}),
+
+        # Header
         html.Div([
-            html.H1("🎓 University Engineering Programs Analysis",
-                    style=main_title_style),
-            html.P("Comprehensive Analysis of Computer Science & AI Engineering Programs in Thailand",
-                   style={
-                       'textAlign': 'center',
-                       'color': THEME_COLORS['text_secondary'],
-                       'marginBottom': '0',
-                       'fontSize': '1.3rem',
-                       'fontFamily': 'Inter, sans-serif',
-                       'fontWeight': '400',
-                       'maxWidth': '800px',
-                       'margin': '0 auto'
-                   })
-        ], style={'maxWidth': '1200px', 'margin': '0 auto'})
-    ], style={
-        'padding': '40px 20px',
-        'background': f'linear-gradient(135deg, {THEME_COLORS["background"]}, #E6FFFA)',
-        'marginBottom': '30px',
-        'position': 'relative'
-    }),
-
-    # Key Metrics Row
-    html.Div([
-        html.Div([
-            html.Div([
-                html.H3(f"{len(df)}", style={
-                    'color': THEME_COLORS['primary'],
-                    'fontSize': '3rem',
-                    'margin': '0',
-                    'fontWeight': '700'
-                }),
-                html.P("Total Programs", style={
-                    'color': THEME_COLORS['text_secondary'],
-                    'margin': '8px 0',
-                    'fontSize': '1rem',
-                    'fontWeight': '500'
-                })
-            ], style={
-                **card_style,
-                'textAlign': 'center',
-                'width': '22%',
-                'display': 'inline-block',
-                'background': f'linear-gradient(135deg, {THEME_COLORS["primary"]}15, {THEME_COLORS["primary"]}05)'
-            }),
-
             html.Div([
-                html.H3(f"{df['มหาวิทยาลัย'].nunique()}", style={
-                    'color': THEME_COLORS['secondary'],
-                    'fontSize': '3rem',
-                    'margin': '0',
-                    'fontWeight': '700'
-                }),
-                html.P("Universities", style={
-                    'color': THEME_COLORS['text_secondary'],
-                    'margin': '8px 0',
-                    'fontSize': '1rem',
-                    'fontWeight': '500'
-                })
-            ], style={
-                **card_style,
-                'textAlign': 'center',
-                'width': '22%',
-                'display': 'inline-block',
-                'background': f'linear-gradient(135deg, {THEME_COLORS["secondary"]}15, {THEME_COLORS["secondary"]}05)'
-            }),
+                html.H1("🎓 University Engineering Programs Analysis",
+                        style=main_title_style),
+                html.P("Comprehensive Analysis of Computer Science & AI Engineering Programs in Thailand",
+                       style={
+                           'textAlign': 'center',
+                           'color': THEME_COLORS['text_secondary'],
+                           'marginBottom': '0',
+                           'fontSize': '1.3rem',
+                           'fontFamily': 'Inter, sans-serif',
+                           'fontWeight': '400',
+                           'maxWidth': '800px',
+                           'margin': '0 auto'
+                       })
+            ], style={'maxWidth': '1200px', 'margin': '0 auto'})
+        ], style={
+            'padding': '40px 20px',
+            'background': f'linear-gradient(135deg, {THEME_COLORS["background"]}, #E6FFFA)',
+            'marginBottom': '30px',
+            'position': 'relative'
+        }),
 
+        # Key Metrics Row
+        html.Div([
             html.Div([
-                html.H3(f"฿{df['ค่าใช้จ่ายต่อภาค'].mean():,.0f}", style={
-                    'color': THEME_COLORS['accent'],
-                    'fontSize': '3rem',
-                    'margin': '0',
-                    'fontWeight': '700'
+                html.Div([
+                    html.H3(f"{len(df)}", style={
+                        'color': THEME_COLORS['primary'],
+                        'fontSize': '3rem',
+                        'margin': '0',
+                        'fontWeight': '700'
+                    }),
+                    html.P("Total Programs", style={
+                        'color': THEME_COLORS['text_secondary'],
+                        'margin': '8px 0',
+                        'fontSize': '1rem',
+                        'fontWeight': '500'
+                    })
+                ], style={
+                    **card_style,
+                    'textAlign': 'center',
+                    'width': '22%',
+                    'display': 'inline-block',
+                    'background': f'linear-gradient(135deg, {THEME_COLORS["primary"]}15, {THEME_COLORS["primary"]}05)'
                 }),
-                html.P("Avg. Cost/Semester", style={
-                    'color': THEME_COLORS['text_secondary'],
-                    'margin': '8px 0',
-                    'fontSize': '1rem',
-                    'fontWeight': '500'
-                })
-            ], style={
-                **card_style,
-                'textAlign': 'center',
-                'width': '22%',
-                'display': 'inline-block',
-                'background': f'linear-gradient(135deg, {THEME_COLORS["accent"]}15, {THEME_COLORS["accent"]}05)'
-            }),
 
-            html.Div([
-                html.H3(f"{df['สาขาวิชา'].nunique()}", style={
-                    'color': THEME_COLORS['success'],
-                    'fontSize': '3rem',
-                    'margin': '0',
-                    'fontWeight': '700'
+                html.Div([
+                    html.H3(f"{df['มหาวิทยาลัย'].nunique()}", style={
+                        'color': THEME_COLORS['secondary'],
+                        'fontSize': '3rem',
+                        'margin': '0',
+                        'fontWeight': '700'
+                    }),
+                    html.P("Universities", style={
+                        'color': THEME_COLORS['text_secondary'],
+                        'margin': '8px 0',
+                        'fontSize': '1rem',
+                        'fontWeight': '500'
+                    })
+                ], style={
+                    **card_style,
+                    'textAlign': 'center',
+                    'width': '22%',
+                    'display': 'inline-block',
+                    'background': f'linear-gradient(135deg, {THEME_COLORS["secondary"]}15, {THEME_COLORS["secondary"]}05)'
                 }),
-                html.P("Specialized Fields", style={
-                    'color': THEME_COLORS['text_secondary'],
-                    'margin': '8px 0',
-                    'fontSize': '1rem',
-                    'fontWeight': '500'
-                })
-            ], style={
-                **card_style,
-                'textAlign': 'center',
-                'width': '22%',
-                'display': 'inline-block',
-                'background': f'linear-gradient(135deg, {THEME_COLORS["success"]}15, {THEME_COLORS["success"]}05)'
-            })
-        ], style={'maxWidth': '1200px', 'margin': '0 auto', 'textAlign': 'center'})
-    ], style={'marginBottom': '40px'}),
 
-    # Controls Section
-    html.Div([
-        html.Div([
-            html.H3("Program Comparison", style={
-                **section_title_style,
-                'marginBottom': '30px'
-            }),
-
-            html.Div([
-                # University 1 Selection
                 html.Div([
-                    html.Label("Select First University:", style={
-                        'fontWeight': '600',
-                        'color': THEME_COLORS['text_primary'],
-                        'marginBottom': '8px',
-                        'display': 'block',
-                        'fontSize': '1rem'
+                    html.H3(f"฿{df['ค่าใช้จ่ายต่อภาค'].mean():,.0f}", style={
+                        'color': THEME_COLORS['accent'],
+                        'fontSize': '3rem',
+                        'margin': '0',
+                        'fontWeight': '700'
                     }),
-                    dcc.Dropdown(
-                        id='university-1-dropdown',
-                        options=[{'label': uni, 'value': uni}
-                                 for uni in sorted(df['มหาวิทยาลัย'].unique())],
-                        value=df['มหาวิทยาลัย'].iloc[0] if len(
-                            df) > 0 else None,
-                        style={
-                            **dropdown_style,
-                            'zIndex': '999'  # เพิ่ม z-index
-                        },
-                        optionHeight=40,
-                        maxHeight=200  # จำกัดความสูงของ dropdown list
-                    )
+                    html.P("Avg. Cost/Semester", style={
+                        'color': THEME_COLORS['text_secondary'],
+                        'margin': '8px 0',
+                        'fontSize': '1rem',
+                        'fontWeight': '500'
+                    })
                 ], style={
-                    'width': '30%',
+                    **card_style,
+                    'textAlign': 'center',
+                    'width': '22%',
                     'display': 'inline-block',
-                    'marginRight': '3%',
-                    'position': 'relative',  # เพิ่ม position relative
-                    'zIndex': '999'  # เพิ่ม z-index สำหรับ container
+                    'background': f'linear-gradient(135deg, {THEME_COLORS["accent"]}15, {THEME_COLORS["accent"]}05)'
                 }),
 
-                # Program 1 Selection
                 html.Div([
-                    html.Label("Select First Program:", style={
-                        'fontWeight': '600',
-                        'color': THEME_COLORS['text_primary'],
-                        'marginBottom': '8px',
-                        'display': 'block',
-                        'fontSize': '1rem'
+                    html.H3(f"{df['สาขาวิชา'].nunique()}", style={
+                        'color': THEME_COLORS['success'],
+                        'fontSize': '3rem',
+                        'margin': '0',
+                        'fontWeight': '700'
                     }),
-                    dcc.Dropdown(
-                        id='program-1-dropdown',
-                        style={
-                            **dropdown_style,
-                            'zIndex': '998'  # เพิ่ม z-index
-                        },
-                        optionHeight=40,
-                        maxHeight=200
-                    )
+                    html.P("Specialized Fields", style={
+                        'color': THEME_COLORS['text_secondary'],
+                        'margin': '8px 0',
+                        'fontSize': '1rem',
+                        'fontWeight': '500'
+                    })
                 ], style={
-                    'width': '30%',
+                    **card_style,
+                    'textAlign': 'center',
+                    'width': '22%',
                     'display': 'inline-block',
-                    'marginRight': '3%',
-                    'position': 'relative',
-                    'zIndex': '998'
+                    'background': f'linear-gradient(135deg, {THEME_COLORS["success"]}15, {THEME_COLORS["success"]}05)'
+                })
+            ], style={'maxWidth': '1200px', 'margin': '0 auto', 'textAlign': 'center'})
+        ], style={'marginBottom': '40px'}),
+
+        # Controls Section
+        html.Div([
+            html.Div([
+                html.H3("Program Comparison", style={
+                    **section_title_style,
+                    'marginBottom': '30px'
                 }),
 
-                # Cost Type Selection
                 html.Div([
-                    html.Label("Cost Type:", style={
-                        'fontWeight': '600',
-                        'color': THEME_COLORS['text_primary'],
-                        'marginBottom': '8px',
-                        'display': 'block',
-                        'fontSize': '1rem',
+                    # University 1 Selection
+                    html.Div([
+                        html.Label("Select First University:", style={
+                            'fontWeight': '600',
+                            'color': THEME_COLORS['text_primary'],
+                            'marginBottom': '8px',
+                            'display': 'block',
+                            'fontSize': '1rem'
+                        }),
+                        dcc.Dropdown(
+                            id='university-1-dropdown',
+                            options=with_selected_option(
+                                university_index.options(
+                                    university_index.search('', DROPDOWN_OPTION_LIMIT)),
+                                df['มหาวิทยาลัย'].iloc[0] if len(df) > 0 else None),
+                            value=df['มหาวิทยาลัย'].iloc[0] if len(
+                                df) > 0 else None,
+                            style={
+                                **dropdown_style,
+                                'zIndex': '999'  # เพิ่ม z-index
+                            },
+                            optionHeight=40,
+                            maxHeight=200  # จำกัดความสูงของ dropdown list
+                        )
+                    ], style={
+                        'width': '30%',
+                        'display': 'inline-block',
+                        'marginRight': '3%',
+                        'position': 'relative',  # เพิ่ม position relative
+                        'zIndex': '999'  # เพิ่ม z-index สำหรับ container
                     }),
-                    dcc.RadioItems(
-                        id='cost-type',
-                        options=[
-                            {'label': 'Per Semester', 'value': 'ค่าใช้จ่ายต่อภาค'},
-                            {'label': 'Total Program',
-                                'value': 'ค่าใช้จ่ายตลอดหลักสูตร'}
-                        ],
-                        value='ค่าใช้จ่ายต่อภาค',
-                        style={'marginTop': '10px'},
-                        labelStyle={
+
+                    # Program 1 Selection
+                    html.Div([
+                        html.Label("Select First Program:", style={
+                            'fontWeight': '600',
+                            'color': THEME_COLORS['text_primary'],
+                            'marginBottom': '8px',
                             'display': 'block',
+                            'fontSize': '1rem'
+                        }),
+                        dcc.Dropdown(
+                            id='program-1-dropdown',
+                            style={
+                                **dropdown_style,
+                                'zIndex': '998'  # เพิ่ม z-index
+                            },
+                            optionHeight=40,
+                            maxHeight=200
+                        )
+                    ], style={
+                        'width': '30%',
+                        'display': 'inline-block',
+                        'marginRight': '3%',
+                        'position': 'relative',
+                        'zIndex': '998'
+                    }),
+
+                    # Cost Type Selection
+                    html.Div([
+                        html.Label("Cost Type:", style={
+                            'fontWeight': '600',
+                            'color': THEME_COLORS['text_primary'],
                             'marginBottom': '8px',
-                            'fontSize': '0.95rem',
-                            'color': THEME_COLORS['text_primary']
-                        }
-                    )
-                ], style={'width': '30%', 'display': 'inline-block'})
-            ], style={
-                'marginBottom': '50px',  # เพิ่ม margin bottom ให้มากขึ้น
-                'overflow': 'visible'  # เพิ่ม overflow visible
-            }),
+                            'display': 'block',
+                            'fontSize': '1rem',
+                        }),
+                        dcc.RadioItems(
+                            id='cost-type',
+                            options=COST_TYPE_OPTIONS,
+                            value='ค่าใช้จ่ายต่อภาค',
+                            style={'marginTop': '10px'},
+                            labelStyle={
+                                'display': 'block',
+                                'marginBottom': '8px',
+                                'fontSize': '0.95rem',
+                                'color': THEME_COLORS['text_primary']
+                            }
+                        )
+                    ], style={'width': '30%', 'display': 'inline-block'})
+                ], style={
+                    'marginBottom': '50px',  # เพิ่ม margin bottom ให้มากขึ้น
+                    'overflow': 'visible'  # เพิ่ม overflow visible
+                }),
 
-            html.Div([
-                # University 2 Selection
                 html.Div([
-                    html.Label("Select Second University:", style={
-                        'fontWeight': '600',
-                        'color': THEME_COLORS['text_primary'],
-                        'marginBottom': '8px',
-                        'display': 'block',
-                        'fontSize': '1rem'
+                    # University 2 Selection
+                    html.Div([
+                        html.Label("Select Second University:", style={
+                            'fontWeight': '600',
+                            'color': THEME_COLORS['text_primary'],
+                            'marginBottom': '8px',
+                            'display': 'block',
+                            'fontSize': '1rem'
+                        }),
+                        dcc.Dropdown(
+                            id='university-2-dropdown',
+                            options=with_selected_option(
+                                university_index.options(
+                                    university_index.search('', DROPDOWN_OPTION_LIMIT)),
+                                df['มหาวิทยาลัย'].iloc[1] if len(df) > 1 else (
+                                    df['มหาวิทยาลัย'].iloc[0] if len(df) > 0 else None)),
+                            value=df['มหาวิทยาลัย'].iloc[1] if len(df) > 1 else (
+                                df['มหาวิทยาลัย'].iloc[0] if len(df) > 0 else None),
+                            style={
+                                **dropdown_style,
+                                'zIndex': '997'
+                            },
+                            optionHeight=40,
+                            maxHeight=200
+                        )
+                    ], style={
+                        'width': '30%',
+                        'display': 'inline-block',
+                        'marginRight': '3%',
+                        'position': 'relative',
+                        'zIndex': '997'
                     }),
-                    dcc.Dropdown(
-                        id='university-2-dropdown',
-                        options=[{'label': uni, 'value': uni}
-                                 for uni in sorted(df['มหาวิทยาลัย'].unique())],
-                        value=df['มหาวิทยาลัย'].iloc[1] if len(df) > 1 else (
-                            df['มหาวิทยาลัย'].iloc[0] if len(df) > 0 else None),
-                        style={
-                            **dropdown_style,
-                            'zIndex': '997'
-                        },
-                        optionHeight=40,
-                        maxHeight=200
-                    )
+
+                    # Program 2 Selection
+                    html.Div([
+                        html.Label("Select Second Program:", style={
+                            'fontWeight': '600',
+                            'color': THEME_COLORS['text_primary'],
+                            'marginBottom': '8px',
+                            'display': 'block',
+                            'fontSize': '1rem'
+                        }),
+                        dcc.Dropdown(
+                            id='program-2-dropdown',
+                            style={
+                                **dropdown_style,
+                                'zIndex': '996'
+                            },
+                            optionHeight=40,
+                            maxHeight=200
+                        )
+                    ], style={
+                        'width': '30%',
+                        'display': 'inline-block',
+                        'marginRight': '3%',
+                        'position': 'relative',
+                        'zIndex': '996'
+                    })
                 ], style={
-                    'width': '30%',
-                    'display': 'inline-block',
-                    'marginRight': '3%',
-                    'position': 'relative',
-                    'zIndex': '997'
+                    'marginBottom': '30px',
+                    'overflow': 'visible'  # เพิ่ม overflow visible
                 }),
 
-                # Program 2 Selection
+                # เปรียบเทียบเพิ่มเติมได้หลายหลักสูตร
                 html.Div([
-                    html.Label("Select Second Program:", style={
+                    html.Label("Compare More Programs:", style={
                         'fontWeight': '600',
                         'color': THEME_COLORS['text_primary'],
                         'marginBottom': '8px',
@@ -349,72 +670,303 @@ app.layout = html.Div([
                         'fontSize': '1rem'
                     }),
                     dcc.Dropdown(
-                        id='program-2-dropdown',
+                        id='comparison-programs-dropdown',
+                        options=[],
+                        value=[],
+                        multi=True,
+                        placeholder="Type to search programs or universities...",
                         style={
                             **dropdown_style,
-                            'zIndex': '996'
+                            'zIndex': '995'
                         },
                         optionHeight=40,
                         maxHeight=200
                     )
                 ], style={
-                    'width': '30%',
-                    'display': 'inline-block',
-                    'marginRight': '3%',
+                    'width': '93%',
                     'position': 'relative',
-                    'zIndex': '996'
+                    'zIndex': '995'
                 })
             ], style={
+                'maxWidth': '1200px',
+                'margin': '0 auto',
                 'overflow': 'visible'  # เพิ่ม overflow visible
             })
-        ], style={
-            'maxWidth': '1200px',
-            'margin': '0 auto',
-            'overflow': 'visible'  # เพิ่ม overflow visible
-        })
-    ], style={
-        **card_style,
-        'marginBottom': '40px',
-        'overflow': 'visible',  # เพิ่ม overflow visible
-        'position': 'relative'  # เพิ่ม position relative
-    }),
-
-    # Charts Row 1 - Comparison Chart
-    html.Div([
-        html.Div([
-            dcc.Graph(id='comparison-chart')
         ], style={
             **card_style,
-            'width': '80%',
-            'margin': '20px auto',
-            'display': 'block'
-        })
-    ]),
+            'marginBottom': '40px',
+            'overflow': 'visible',  # เพิ่ม overflow visible
+            'position': 'relative'  # เพิ่ม position relative
+        }),
 
-    # Charts Row 2: Average Cost by Field
-    html.Div([
+        # Charts Row 1 - Comparison Chart
         html.Div([
-            html.H3("Average Cost by Field of Study", style={
-                **section_title_style,
-                'marginBottom': '25px'
-            }),
+            html.Div([
+                dcc.Graph(id='comparison-chart')
+            ], style={
+                **card_style,
+                'width': '80%',
+                'margin': '20px auto',
+                'display': 'block'
+            })
+        ]),
 
+        # หลักสูตรที่คล้ายกับหลักสูตรแรกที่เลือก
+        html.Div([
+            html.Div([
+                html.H3("Similar Programs", style={
+                    **section_title_style,
+                    'marginBottom': '20px'
+                }),
+                dcc.Checklist(
+                    id='similar-cheaper-only',
+                    options=[{'label': 'Only cheaper than the selected program', 'value': 'cheaper'}],
+                    value=[],
+                    labelStyle={
+                        'display': 'inline-block',
+                        'fontSize': '1rem',
+                        'color': THEME_COLORS['text_primary'],
+                        'fontWeight': '500'
+                    },
+                    inputStyle={'marginRight': '8px'},
+                    style={'textAlign': 'center', 'marginBottom': '20px'}
+                ),
+                html.Div(id='similar-programs')
+            ], style={'maxWidth': '1200px', 'margin': '0 auto'})
+        ], style={**card_style, 'width': '80%', 'margin': '20px auto 40px'}),
+
+        # หลักสูตรที่จ่ายไหวตามงบประมาณ (JSON เดียวกันที่ /api/affordable)
+        html.Div([
             html.Div([
-                html.Label("Filter by Program Type:", style={
-                    'fontWeight': '600',
-                    'color': THEME_COLORS['text_primary'],
-                    'marginBottom': '15px',
-                    'display': 'block',
-                    'fontSize': '1.1rem',
-                    'textAlign': 'center'
+                html.H3("Affordable Programs", style={
+                    **section_title_style,
+                    'marginBottom': '20px'
+                }),
+                html.Div([
+                    html.Div([
+                        html.Label("Budget per Semester (THB):", style={
+                            'fontWeight': '600',
+                            'color': THEME_COLORS['text_primary'],
+                            'marginBottom': '8px',
+                            'display': 'block'
+                        }),
+                        dcc.Input(
+                            id='affordable-budget',
+                            type='number',
+                            min=0,
+                            step=1000,
+                            debounce=True,
+                            placeholder="e.g. 25000",
+                            style={**dropdown_style, 'padding': '8px 12px', 'width': '90%'}
+                        )
+                    ], style={'width': '24%', 'display': 'inline-block', 'verticalAlign': 'top',
+                              'marginRight': '1%'}),
+                    html.Div([
+                        html.Label("Fields:", style={
+                            'fontWeight': '600',
+                            'color': THEME_COLORS['text_primary'],
+                            'marginBottom': '8px',
+                            'display': 'block'
+                        }),
+                        dcc.Dropdown(
+                            id='affordable-fields',
+                            options=[{'label': field, 'value': field}
+                                     for field in sorted(df['สาขาวิชา'].dropna().unique())],
+                            value=[],
+                            multi=True,
+                            placeholder="All fields",
+                            style=dropdown_style
+                        )
+                    ], style={'width': '25%', 'display': 'inline-block', 'verticalAlign': 'top',
+                              'marginRight': '1%'}),
+                    html.Div([
+                        html.Label("Program Type:", style={
+                            'fontWeight': '600',
+                            'color': THEME_COLORS['text_primary'],
+                            'marginBottom': '8px',
+                            'display': 'block'
+                        }),
+                        dcc.Dropdown(
+                            id='affordable-program-type',
+                            options=PROGRAM_TYPE_OPTIONS,
+                            value='all',
+                            clearable=False,
+                            style=dropdown_style
+                        )
+                    ], style={'width': '20%', 'display': 'inline-block', 'verticalAlign': 'top',
+                              'marginRight': '1%'}),
+                    html.Div([
+                        html.Label("University Categories:", style={
+                            'fontWeight': '600',
+                            'color': THEME_COLORS['text_primary'],
+                            'marginBottom': '8px',
+                            'display': 'block'
+                        }),
+                        dcc.Dropdown(
+                            id='affordable-categories',
+                            options=[{'label': cat, 'value': cat}
+                                     for cat in sorted(df['University_Category'].dropna().unique())],
+                            value=[],
+                            multi=True,
+                            placeholder="All categories",
+                            style=dropdown_style
+                        )
+                    ], style={'width': '28%', 'display': 'inline-block', 'verticalAlign': 'top'})
+                ], style={'marginBottom': '20px'}),
+                html.Div(id='affordable-programs'),
+                dcc.Store(id='affordable-page', data=0),
+                html.Div([
+                    html.Button("‹ Previous", id='affordable-prev', n_clicks=0, style={
+                        'padding': '8px 18px',
+                        'borderRadius': '8px',
+                        'border': f'1px solid {THEME_COLORS["border"]}',
+                        'backgroundColor': THEME_COLORS['surface'],
+                        'color': THEME_COLORS['text_primary'],
+                        'cursor': 'pointer',
+                        'marginRight': '10px'
+                    }),
+                    html.Button("Next ›", id='affordable-next', n_clicks=0, style={
+                        'padding': '8px 18px',
+                        'borderRadius': '8px',
+                        'border': f'1px solid {THEME_COLORS["border"]}',
+                        'backgroundColor': THEME_COLORS['surface'],
+                        'color': THEME_COLORS['text_primary'],
+                        'cursor': 'pointer'
+                    })
+                ], style={'textAlign': 'center', 'marginTop': '15px'})
+            ], style={'maxWidth': '1200px', 'margin': '0 auto', 'overflow': 'visible'})
+        ], style={**card_style, 'width': '80%', 'margin': '20px auto 40px', 'overflow': 'visible'}),
+
+        # Charts Row 2: Average Cost by Field
+        html.Div([
+            html.Div([
+                html.H3("Average Cost by Field of Study", style={
+                    **section_title_style,
+                    'marginBottom': '25px'
+                }),
+
+                html.Div([
+                    html.Label("Filter by Program Type:", style={
+                        'fontWeight': '600',
+                        'color': THEME_COLORS['text_primary'],
+                        'marginBottom': '15px',
+                        'display': 'block',
+                        'fontSize': '1.1rem',
+                        'textAlign': 'center'
+                    }),
+                    html.Div([
+                        dcc.RadioItems(
+                            id='program-type-filter',
+                            options=PROGRAM_TYPE_OPTIONS,
+                            value='all',
+                            labelStyle={
+                                'display': 'inline-block',
+                                'marginRight': '25px',
+                                'fontSize': '1rem',
+                                'color': THEME_COLORS['text_primary'],
+                                'fontWeight': '500'
+                            },
+                            inputStyle={'marginRight': '8px'},
+                            style={'textAlign': 'center'}
+                        )
+                    ], style={'textAlign': 'center', 'marginBottom': '25px'}),
+
+                    html.Label("Filter by University Category:", style={
+                        'fontWeight': '600',
+                        'color': THEME_COLORS['text_primary'],
+                        'marginBottom': '15px',
+                        'display': 'block',
+                        'fontSize': '1.1rem',
+                        'textAlign': 'center'
+                    }),
+                    html.Div([
+                        dcc.Checklist(
+                            id='category-filter',
+                            options=[{'label': cat, 'value': cat}
+                                     for cat in sorted(df['University_Category'].dropna().unique())],
+                            value=[],
+                            labelStyle={
+                                'display': 'inline-block',
+                                'marginRight': '25px',
+                                'fontSize': '1rem',
+                                'color': THEME_COLORS['text_primary'],
+                                'fontWeight': '500'
+                            },
+                            inputStyle={'marginRight': '8px'},
+                            style={'textAlign': 'center'}
+                        )
+                    ], style={'textAlign': 'center', 'marginBottom': '15px'}),
+
+                    # สรุปตัวกรองที่เลือกจากการคลิกกราฟ
+                    html.Div([
+                        html.Span(id='cross-filter-summary',
+                                  children="Click a bar or heatmap cell to filter the other charts",
+                                  style={
+                                      'color': THEME_COLORS['text_secondary'],
+                                      'fontSize': '0.95rem',
+                                      'marginRight': '15px'
+                                  }),
+                        html.Button("Clear Filters", id='clear-cross-filter', n_clicks=0, style={
+                            'backgroundColor': THEME_COLORS['surface'],
+                            'border': f'1px solid {THEME_COLORS["border"]}',
+                            'borderRadius': '8px',
+                            'padding': '6px 14px',
+                            'cursor': 'pointer',
+                            'color': THEME_COLORS['text_primary']
+                        }),
+                        # ดาวน์โหลดข้อมูลตามตัวกรองปัจจุบัน (href อัปเดตโดย update_download_links)
+                        html.A("Download CSV", id='download-csv', style={
+                            'marginLeft': '15px',
+                            'color': THEME_COLORS['primary'],
+                            'fontWeight': '600'
+                        }),
+                        html.A("Download Parquet", id='download-parquet', style={
+                            'marginLeft': '15px',
+                            'color': THEME_COLORS['primary'],
+                            'fontWeight': '600',
+                            'display': 'inline' if PARQUET_AVAILABLE else 'none'
+                        })
+                    ], style={'textAlign': 'center', 'marginBottom': '25px'}),
+                    # แสดงระหว่างที่งาน background ของ heatmap/distribution/insights ยังไม่เสร็จ
+                    html.Div([
+                        html.Span("Updating heatmap, distribution and insights…", style={
+                            'color': THEME_COLORS['text_secondary'],
+                            'fontSize': '0.9rem',
+                            'marginRight': '10px'
+                        }),
+                        html.Progress(id='heavy-views-progress', value='0', max=str(len(HEAVY_SECTIONS)))
+                    ], id='heavy-views-status', style={'display': 'none'})
+                ]),
+
+                dcc.Graph(id='field-average-cost-bar')
+            ], style={'maxWidth': '1400px', 'margin': '0 auto'})
+        ], style={**card_style, 'marginBottom': '40px'}),
+
+        # Charts Row 3: Cost Heatmap by Campus and Field
+        html.Div([
+            html.Div([
+                html.H3("Campus vs Field of Study", style={
+                    **section_title_style,
+                    'marginBottom': '25px'
+                }),
+                dcc.Graph(id='cost-heatmap-campus-field',
+                          style={'minHeight': '600px'})
+            ], style={'maxWidth': '1400px', 'margin': '0 auto'})
+        ], id='heatmap-section', **{'data-lazy-section': 'heatmap-section'},
+            style={**card_style, 'marginBottom': '40px'}),
+
+        # Charts Row 4: Cost Distribution (percentiles)
+        html.Div([
+            html.Div([
+                html.H3("Cost Distribution", style={
+                    **section_title_style,
+                    'marginBottom': '25px'
                 }),
                 html.Div([
                     dcc.RadioItems(
-                        id='program-type-filter',
-                        options=[{'label': pt, 'value': pt} for pt in sorted(df['ประเภทหลักสูตร'].dropna().unique())] + [
-                            {'label': 'All Programs', 'value': 'all'}
-                        ],
-                        value='all',
+                        id='distribution-dimension',
+                        options=DISTRIBUTION_DIMENSIONS,
+                        value='สาขาวิชา',
                         labelStyle={
                             'display': 'inline-block',
                             'marginRight': '25px',
@@ -425,103 +977,243 @@ app.layout = html.Div([
                         inputStyle={'marginRight': '8px'},
                         style={'textAlign': 'center'}
                     )
-                ], style={'textAlign': 'center', 'marginBottom': '25px'})
-            ]),
-
-            dcc.Graph(id='field-average-cost-bar')
-        ], style={'maxWidth': '1400px', 'margin': '0 auto'})
-    ], style={**card_style, 'marginBottom': '40px'}),
-
-    # Charts Row 3: Cost Heatmap by Campus and Field
-    html.Div([
+                ], style={'textAlign': 'center', 'marginBottom': '25px'}),
+                dcc.Graph(id='cost-distribution-chart',
+                          style={'minHeight': '500px'}),
+                html.Div(id='cost-distribution-table')
+            ], style={'maxWidth': '1400px', 'margin': '0 auto'})
+        ], id='distribution-section', **{'data-lazy-section': 'distribution-section'},
+            style={**card_style, 'marginBottom': '40px'}),
+
+        # Charts Row 5: Year-over-year trends (จาก history/ ดู tcas_history.py)
         html.Div([
-            html.H3("Campus vs Field of Study", style={
-                **section_title_style,
-                'marginBottom': '25px'
-            }),
-            dcc.Graph(id='cost-heatmap-campus-field')
-        ], style={'maxWidth': '1400px', 'margin': '0 auto'})
-    ], style={**card_style, 'marginBottom': '40px'}),
+            html.Div([
+                html.H3("Cost Trends Across TCAS Years", style={
+                    **section_title_style,
+                    'marginBottom': '25px'
+                }),
+                dcc.Graph(id='trend-chart', style={'minHeight': '450px'}),
+                html.Div(id='trend-changes')
+            ], style={'maxWidth': '1400px', 'margin': '0 auto'})
+        ], id='trend-section', **{'data-lazy-section': 'trend-section'},
+            style={**card_style, 'marginBottom': '40px'}),
 
-    # Key Insights
-    html.Div([
+        # Key Insights
         html.Div([
-            html.H3("Key Insights & Recommendations", style={
-                **section_title_style,
-                'marginBottom': '30px'
-            }),
-            html.Div(id='insights-content')
-        ], style={'maxWidth': '1200px', 'margin': '0 auto'})
-    ], style={**card_style, 'marginBottom': '40px'})
+            html.Div([
+                html.H3("Key Insights & Recommendations", style={
+                    **section_title_style,
+                    'marginBottom': '30px'
+                }),
+                html.Div(id='insights-content')
+            ], style={'maxWidth': '1200px', 'margin': '0 auto'})
+        ], id='insights-section', **{'data-lazy-section': 'insights-section'},
+            style={**card_style, 'marginBottom': '40px'})
 
-], style={
-    'backgroundColor': THEME_COLORS['background'],
-    'minHeight': '100vh',
-    'fontFamily': 'Inter, -apple-system, BlinkMacSystemFont, sans-serif',
-    'padding': '0',
-    'marginLeft': '500',
-    'justifyContent': 'center',  # แนวนอน
-    'alignItems': 'center',      # แนวตั้ง
-})
+    ], style={
+        'backgroundColor': THEME_COLORS['background'],
+        'minHeight': '100vh',
+        'fontFamily': 'Inter, -apple-system, BlinkMacSystemFont, sans-serif',
+        'padding': '0',
+        'marginLeft': '500',
+        'justifyContent': 'center',  # แนวนอน
+        'alignItems': 'center',      # แนวตั้ง
+    })
 
 
 # Callbacks
 
 
-@callback(
-    [Output('program-1-dropdown', 'options'),
-     Output('program-1-dropdown', 'value')],
-    Input('university-1-dropdown', 'value')
-)
-def update_program_1_options(selected_university):
+def search_university_options(search_value, current_value):
     try:
-        if selected_university and selected_university in df['มหาวิทยาลัย'].values:
-            programs = df[df['มหาวิทยาลัย'] ==
-                          selected_university]['ชื่อหลักสูตร'].unique()
-            options = [{'label': prog, 'value': prog}
-                       for prog in programs if pd.notna(prog)]
-            value = options[0]['value'] if len(options) > 0 else None
+        ids = university_index.search(search_value, DROPDOWN_OPTION_LIMIT)
+        return with_selected_option(university_index.options(ids), current_value)
+    except Exception as e:
+        print(f"Error in university search: {e}")
+    return with_selected_option([], current_value)
+
+
+def search_program_options(selected_university, search_value, current_value,
+                           university_changed=True):
+    # เปลี่ยนมหาวิทยาลัย -> เลือกหลักสูตรแรก, พิมพ์ค้นหา -> คงค่าเดิมไว้
+    # (คืน no_update - ส่งค่าเดิมกลับไป Dash จะนับว่า value เปลี่ยนและยิง update_cost_views ทุกครั้งที่พิมพ์)
+    try:
+        if selected_university in program_ids_by_university:
+            ids = program_index.search(
+                '' if university_changed else search_value,
+                DROPDOWN_OPTION_LIMIT,
+                restrict_to=program_ids_by_university[selected_university])
+            options = program_index.options(ids)
+            if university_changed:
+                value = options[0]['value'] if len(options) > 0 else None
+            else:
+                value = dash.no_update
+                options = with_selected_option(options, current_value)
             return options, value
     except Exception as e:
-        print(f"Error in program 1 options: {e}")
+        print(f"Error in program options: {e}")
     return [], None
 
 
 @callback(
-    [Output('program-2-dropdown', 'options'),
-     Output('program-2-dropdown', 'value')],
-    Input('university-2-dropdown', 'value')
+    Output('university-1-dropdown', 'options'),
+    Input('university-1-dropdown', 'search_value'),
+    State('university-1-dropdown', 'value'),
+    prevent_initial_call=True
+)
+def update_university_1_options(search_value, current_value):
+    return search_university_options(search_value, current_value)
+
+
+@callback(
+    Output('university-2-dropdown', 'options'),
+    Input('university-2-dropdown', 'search_value'),
+    State('university-2-dropdown', 'value'),
+    prevent_initial_call=True
+)
+def update_university_2_options(search_value, current_value):
+    return search_university_options(search_value, current_value)
+
+
+@callback(
+    Output('comparison-programs-dropdown', 'options'),
+    Input('comparison-programs-dropdown', 'search_value'),
+    State('comparison-programs-dropdown', 'value'),
 )
-def update_program_2_options(selected_university):
+def update_comparison_programs_options(search_value, selected_urls):
     try:
-        if selected_university and selected_university in df['มหาวิทยาลัย'].values:
-            programs = df[df['มหาวิทยาลัย'] ==
-                          selected_university]['ชื่อหลักสูตร'].unique()
-            options = [{'label': prog, 'value': prog}
-                       for prog in programs if pd.notna(prog)]
-            value = options[0]['value'] if len(options) > 0 else None
-            return options, value
+        selected_urls = selected_urls or []
+        ids = comparison_index.search(search_value, DROPDOWN_OPTION_LIMIT)
+        options = [o for o in comparison_index.options(ids)
+                   if o['value'] not in selected_urls]
+        return [{'label': comparison_labels.get(u, u), 'value': u}
+                for u in selected_urls] + options
     except Exception as e:
-        print(f"Error in program 2 options: {e}")
-    return [], None
+        print(f"Error in comparison programs search: {e}")
+    return []
 
 
 @callback(
-    Output('comparison-chart', 'figure'),
+    [Output('program-1-dropdown', 'options'),
+     Output('program-1-dropdown', 'value')],
     [Input('university-1-dropdown', 'value'),
-     Input('program-1-dropdown', 'value'),
-     Input('university-2-dropdown', 'value'),
-     Input('program-2-dropdown', 'value'),
-     Input('cost-type', 'value')],
-    prevent_initial_call=False
+     Input('program-1-dropdown', 'search_value')],
+    State('program-1-dropdown', 'value')
 )
-def update_comparison_chart(uni1, prog1, uni2, prog2, cost_type):
+def update_program_1_options(selected_university, search_value, current_value):
+    return search_program_options(
+        selected_university, search_value, current_value,
+        university_changed=dash.ctx.triggered_id != 'program-1-dropdown')
+
+
+@callback(
+    [Output('program-2-dropdown', 'options'),
+     Output('program-2-dropdown', 'value')],
+    [Input('university-2-dropdown', 'value'),
+     Input('program-2-dropdown', 'search_value')],
+    State('program-2-dropdown', 'value')
+)
+def update_program_2_options(selected_university, search_value, current_value):
+    return search_program_options(
+        selected_university, search_value, current_value,
+        university_changed=dash.ctx.triggered_id != 'program-2-dropdown')
+
+
+def with_cost_numeric(frame, cost_type):
+    cost_numeric = pd.to_numeric(
+        frame[cost_type].astype(str).str.replace(',', ''), errors='coerce')
+    return frame.assign(cost_numeric=cost_numeric).dropna(subset=['cost_numeric'])
+
+
+@functools.lru_cache(maxsize=8)
+def cost_view(cost_type):
+    # มุมมองข้อมูลที่กรองและแปลงค่าใช้จ่ายเป็นตัวเลขแล้ว ใช้ร่วมกันทุกกราฟที่ขึ้นกับ cost-type
+    # (อย่าแก้ไข DataFrame ที่ได้ - เป็น object เดียวกันทุกครั้งที่เรียก)
+    return with_cost_numeric(df, cost_type)
+
+
+# รับข้อมูล crawl รอบใหม่ระหว่างที่ app รันอยู่: diff กับ df เดิม (tcas_cdc.py) แล้วอัปเดต
+# ผลรวม/จำนวนและ sketch ต่อกลุ่มด้วยเฉพาะแถวที่เพิ่ม/ลบ/เปลี่ยน ส่วนดัชนีระดับแถว (ค้นหา, bitmap)
+# สร้างใหม่จาก df ใหม่ - การ์ดสรุปและตัวเลือกใน layout ยังเป็นค่าตอนเริ่มโปรแกรม
+# TCAS_REFRESH_SECONDS > 0 -> ตรวจ mtime ของ DATA_FILE ไม่เกินทุก ๆ N วินาทีก่อนตอบ request
+REFRESH_SECONDS = float(os.environ.get('TCAS_REFRESH_SECONDS', '0'))
+refresh_lock = threading.Lock()
+refresh_state = {'mtime': None, 'checked': time.monotonic()}
+
+
+def refresh_dataset(path=DATA_FILE):
+    global df, DATASET_VERSION, cost_summaries
+    with refresh_lock:
+        new_df = prepare_frame(pd.read_csv(path))
+        changes = tcas_cdc.diff_snapshots(df, new_df)
+        if not changes.is_empty():
+            # สร้างทุกอย่างของชุดใหม่ให้เสร็จก่อน แล้วสลับ df/ค่าสรุป/ดัชนีติดกันตอนท้าย
+            # DATASET_VERSION เปลี่ยนหลังสุด: ผลที่ memoize ระหว่างสลับจะอยู่ใต้ key เวอร์ชันเดิมซึ่งไม่ถูกใช้อีก
+            outgoing, incoming = changes.outgoing(), changes.incoming()
+            new_summaries = {cost_type: apply_cost_delta(summary, outgoing, incoming, cost_type)
+                             for cost_type, summary in cost_summaries.items()}
+            indexes = build_row_indexes(new_df)
+            new_version = dataset_version(path)
+
+            df, cost_summaries = new_df, new_summaries
+            install_row_indexes(indexes)
+            cost_view.cache_clear()
+            similarity_index.cache_clear()
+            program_table.cache_clear()
+            DATASET_VERSION = new_version
+        refresh_state['mtime'] = os.path.getmtime(path)
+        return changes
+
+
+def refresh_if_modified():
+    if df is None:
+        return
+    now = time.monotonic()
+    if now - refresh_state['checked'] < REFRESH_SECONDS:
+        return
+    refresh_state['checked'] = now
+    try:
+        if os.path.getmtime(DATA_FILE) != refresh_state['mtime']:
+            changes = refresh_dataset()
+            summary = changes.summary()
+            print(f"Refreshed {DATA_FILE}: {summary['added']} added, "
+                  f"{summary['removed']} removed, {summary['changed']} changed")
+            # เวอร์ชันข้อมูลเปลี่ยน -> แคชเดิมใช้ไม่ได้ อุ่นใหม่ใน background
+            if WARMUP and not changes.is_empty():
+                threading.Thread(target=warm_up, daemon=True).start()
+    except Exception as e:
+        print(f"Error in dataset refresh: {e}")
+
+
+if REFRESH_SECONDS > 0:
+    app.server.before_request(refresh_if_modified)
+
+
+def compare_programs(pairs, cost_type):
+    # ค้นหาทุกคู่ (มหาวิทยาลัย, หลักสูตร) ในครั้งเดียวด้วย MultiIndex
+    if not pairs:
+        return program_lookup.iloc[0:0]
+    rows = program_lookup.reindex(pd.MultiIndex.from_tuples(
+        pairs, names=program_lookup.index.names))
+    rows = rows[rows['url'].notna()]
+    costs = pd.to_numeric(
+        rows[cost_type].astype(str).str.replace(',', ''), errors='coerce')
+    return rows.assign(cost_numeric=costs.fillna(0))
+
+
+def build_comparison_chart(uni1, prog1, uni2, prog2, cost_type, extra_urls=None):
     # Create empty figure first
     fig = go.Figure()
 
     try:
+        pairs = [(uni, prog) for uni, prog in [(uni1, prog1), (uni2, prog2)]
+                 if uni and prog]
+        pairs += [program_pair_by_url[u]
+                  for u in (extra_urls or []) if u in program_pair_by_url]
+        pairs = list(dict.fromkeys(pairs))
+
         # Check if we have all required inputs
-        if not all([uni1, prog1, uni2, prog2, cost_type]):
+        if not pairs or not cost_type:
             fig.add_annotation(
                 text="Please select universities and programs",
                 xref="paper", yref="paper",
@@ -529,43 +1221,31 @@ def update_comparison_chart(uni1, prog1, uni2, prog2, cost_type):
                 showarrow=False, font=dict(size=16)
             )
         else:
-            # Filter data
-            data1 = df[(df['มหาวิทยาลัย'] == uni1) &
-                       (df['ชื่อหลักสูตร'] == prog1)]
-            data2 = df[(df['มหาวิทยาลัย'] == uni2) &
-                       (df['ชื่อหลักสูตร'] == prog2)]
-
-            if not data1.empty and not data2.empty and cost_type in df.columns:
-                # Get costs safely
-                cost1 = 0
-                cost2 = 0
-
-                if not data1[cost_type].empty and pd.notna(data1[cost_type].iloc[0]):
-                    try:
-                        cost1 = float(
-                            str(data1[cost_type].iloc[0]).replace(',', ''))
-                    except:
-                        cost1 = 0
-
-                if not data2[cost_type].empty and pd.notna(data2[cost_type].iloc[0]):
-                    try:
-                        cost2 = float(
-                            str(data2[cost_type].iloc[0]).replace(',', ''))
-                    except:
-                        cost2 = 0
-
-                # Create bar chart
-                universities = [uni1[:25] + "..." if len(uni1) > 25 else uni1,
-                                uni2[:25] + "..." if len(uni2) > 25 else uni2]
-                costs = [cost1, cost2]
+            rows = compare_programs(pairs, cost_type) \
+                if cost_type in df.columns else program_lookup.iloc[0:0]
+
+            if not rows.empty:
+                universities = [uni[:25] + "..." if len(uni) > 25 else uni
+                                for uni, _ in rows.index]
+                # มหาวิทยาลัยซ้ำกัน -> ใส่ท้ายชื่อหลักสูตรเพื่อไม่ให้แท่งซ้อนกัน
+                if len(set(universities)) < len(universities):
+                    universities = [
+                        f"{label}<br>{'...' + prog[-30:] if len(prog) > 30 else prog}"
+                        for label, (_, prog) in zip(universities, rows.index)]
+                    seen = {}
+                    for i, label in enumerate(universities):
+                        seen[label] = seen.get(label, 0) + 1
+                        if seen[label] > 1:
+                            universities[i] = f"{label} ({seen[label]})"
+                costs = rows['cost_numeric'].tolist()
 
                 fig.add_trace(go.Bar(
                     x=universities,
                     y=costs,
                     text=[f"฿{c:,.0f}" for c in costs],
                     textposition='auto',
-                    marker_color=[THEME_COLORS['primary'],
-                                  THEME_COLORS['secondary']],
+                    marker_color=[COMPARISON_COLORS[i % len(COMPARISON_COLORS)]
+                                  for i in range(len(costs))],
                     name='Cost Comparison'
                 ))
             else:
@@ -600,147 +1280,413 @@ def update_comparison_chart(uni1, prog1, uni2, prog2, cost_type):
     return fig
 
 
-@callback(
-    Output('field-average-cost-bar', 'figure'),
-    Input('program-type-filter', 'value'),
-    prevent_initial_call=False
-)
-def update_field_average_bar(program_type):
-    fig = go.Figure()
+# หลักสูตรที่คล้ายกัน: เวกเตอร์ต่อหลักสูตร = one-hot ของสาขา, ประเภทหลักสูตร และภูมิภาคของวิทยาเขต
+# + log ของค่าใช้จ่าย (standardize) - หมวดที่ต่างกันหนึ่งหมวดมีระยะเท่ากับน้ำหนักของหมวดนั้น
+SIMILARITY_WEIGHTS = {'สาขาวิชา': 2.0, 'ประเภทหลักสูตร': 1.0, 'region': 1.0, 'cost': 1.5}
+SIMILAR_PROGRAM_LIMIT = 8
+
+# ภูมิภาคจากชื่อวิทยาเขตก่อน แล้วจึงดูจากชื่อมหาวิทยาลัย (วิทยาเขต "หลัก")
+# ไม่ตรงคำใดเลย -> กรุงเทพฯ และปริมณฑล (มหาวิทยาลัยส่วนใหญ่ในข้อมูลอยู่ที่นี่)
+CAMPUS_REGIONS = [
+    ('เชียงใหม่', 'ภาคเหนือ'), ('แม่ฟ้าหลวง', 'ภาคเหนือ'), ('พะเยา', 'ภาคเหนือ'),
+    ('นเรศวร', 'ภาคเหนือ'), ('พิบูลสงคราม', 'ภาคเหนือ'),
+    ('ขอนแก่น', 'ภาคตะวันออกเฉียงเหนือ'), ('นครราชสีมา', 'ภาคตะวันออกเฉียงเหนือ'),
+    ('สุรนารี', 'ภาคตะวันออกเฉียงเหนือ'), ('อีสาน', 'ภาคตะวันออกเฉียงเหนือ'),
+    ('อุบลราชธานี', 'ภาคตะวันออกเฉียงเหนือ'), ('กาฬสินธุ์', 'ภาคตะวันออกเฉียงเหนือ'),
+    ('นครพนม', 'ภาคตะวันออกเฉียงเหนือ'), ('เฉลิมพระเกียรติ', 'ภาคตะวันออกเฉียงเหนือ'),
+    ('หาดใหญ่', 'ภาคใต้'), ('ภูเก็ต', 'ภาคใต้'), ('สงขลา', 'ภาคใต้'), ('ตรัง', 'ภาคใต้'),
+    ('ชุมพร', 'ภาคใต้'), ('ศรีวิชัย', 'ภาคใต้'), ('วลัยลักษณ์', 'ภาคใต้'), ('นราธิวาส', 'ภาคใต้'),
+    ('ศรีราชา', 'ภาคตะวันออก'), ('บูรพา', 'ภาคตะวันออก'),
+    ('กำแพงแสน', 'ภาคกลาง'), ('องครักษ์', 'ภาคกลาง'), ('วังไกลกังวล', 'ภาคกลาง'),
+]
+DEFAULT_REGION = 'กรุงเทพฯ และปริมณฑล'
+
+
+def campus_region(university, campus):
+    for text in (campus, university):
+        if isinstance(text, str):
+            for keyword, region in CAMPUS_REGIONS:
+                if keyword in text:
+                    return region
+    return DEFAULT_REGION
+
+
+def one_hot(values, weight):
+    # หมวดต่างกัน = ต่างกันสองมิติ -> หารด้วย sqrt(2) ให้ระยะเท่ากับ weight พอดี
+    codes, uniques = pd.factorize(pd.Series(values).fillna(''))
+    matrix = np.zeros((len(codes), len(uniques)), dtype=np.float32)
+    matrix[np.arange(len(codes)), codes] = weight / np.sqrt(2)
+    return matrix
+
+
+@functools.lru_cache(maxsize=8)
+def similarity_index(cost_type):
+    # หลักสูตรที่มีค่าใช้จ่ายของ cost type นี้ (หนึ่งแถวต่อ url) + เมทริกซ์ feature + ดัชนีเพื่อนบ้าน
+    programs = cost_view(cost_type).drop_duplicates(subset=['url']).reset_index(drop=True)
+    programs = programs.assign(region=[
+        campus_region(uni, campus)
+        for uni, campus in zip(programs['มหาวิทยาลัย'], programs['ชื่อวิทยาเขต'])])
+
+    log_cost = np.log1p(programs['cost_numeric'].clip(lower=0).to_numpy())
+    spread = log_cost.std() or 1.0
+    features = np.hstack([
+        one_hot(programs['สาขาวิชา'], SIMILARITY_WEIGHTS['สาขาวิชา']),
+        one_hot(programs['ประเภทหลักสูตร'], SIMILARITY_WEIGHTS['ประเภทหลักสูตร']),
+        one_hot(programs['region'], SIMILARITY_WEIGHTS['region']),
+        ((log_cost - log_cost.mean()) / spread * SIMILARITY_WEIGHTS['cost'])[:, None],
+    ])
+    position_by_url = {row_url: i for i, row_url in enumerate(programs['url'])}
+    return programs, NearestNeighbourIndex(features), position_by_url
+
+
+def find_similar_programs(uni, prog, cost_type, cheaper_only=False, k=SIMILAR_PROGRAM_LIMIT):
+    # คืนค่า (แถวของหลักสูตรที่เลือก, DataFrame ของหลักสูตรที่ใกล้สุด k รายการ พร้อมระยะ)
+    if (uni, prog) not in program_lookup.index:
+        return None, None
+    programs, index, position_by_url = similarity_index(cost_type)
+    position = position_by_url.get(program_lookup.loc[(uni, prog), 'url'])
+    if position is None:
+        return None, None
+
+    costs = programs['cost_numeric'].to_numpy()
+    mask = costs < costs[position] if cheaper_only else None
+    nearest, distances = index.query(index.vectors[position], k, mask=mask, exclude=[position])
+    return programs.iloc[position], programs.iloc[nearest].assign(distance=distances)
+
+
+def build_similar_programs(uni, prog, cost_type, cheaper_only=False):
+    try:
+        selected, similar = find_similar_programs(uni, prog, cost_type, cheaper_only)
+        if selected is None:
+            return [html.P("Select a program with cost data in the first comparison slot",
+                           style={'color': THEME_COLORS['text_secondary'], 'textAlign': 'center'})]
+        if similar.empty:
+            return [html.P("No cheaper programs found" if cheaper_only else "No similar programs found",
+                           style={'color': THEME_COLORS['text_secondary'], 'textAlign': 'center'})]
+
+        base_cost = selected['cost_numeric']
+        return [
+            html.P(f"Closest to {selected['ชื่อหลักสูตร'][:60]} — {selected['มหาวิทยาลัย']} "
+                   f"(฿{base_cost:,.0f}) by field, program type, region and cost",
+                   style={'color': THEME_COLORS['text_secondary'], 'marginBottom': '15px'}),
+            html.Table([
+                html.Thead(html.Tr([
+                    html.Th("Program", style={**table_header_style, 'textAlign': 'left'}),
+                    html.Th("Campus", style={**table_header_style, 'textAlign': 'left'}),
+                    html.Th("Field", style={**table_header_style, 'textAlign': 'left'}),
+                    html.Th("Cost", style=table_header_style),
+                    html.Th("vs. Selected", style=table_header_style)
+                ])),
+                html.Tbody([
+                    html.Tr([
+                        html.Td(f"{row['ชื่อหลักสูตร'][:60]} — {row['มหาวิทยาลัย']}",
+                                style={**table_cell_style, 'textAlign': 'left',
+                                       'color': THEME_COLORS['text_primary']}),
+                        html.Td(f"{row['ชื่อวิทยาเขต']} ({row['region']})",
+                                style={**table_cell_style, 'textAlign': 'left'}),
+                        html.Td(row['สาขาวิชา'], style={**table_cell_style, 'textAlign': 'left'}),
+                        html.Td(f"฿{row['cost_numeric']:,.0f}", style=table_cell_style),
+                        html.Td(f"{row['cost_numeric'] - base_cost:+,.0f}",
+                                style={**table_cell_style, 'color': THEME_COLORS['success']
+                                       if row['cost_numeric'] > base_cost else THEME_COLORS['primary']})
+                    ]) for _, row in similar.iterrows()
+                ])
+            ], style={'width': '100%', 'borderCollapse': 'collapse', 'fontSize': '0.95rem'})
+        ]
+    except Exception as e:
+        print(f"Error in similar programs: {e}")
+        return [html.P("Error loading similar programs",
+                       style={'color': 'red', 'textAlign': 'center'})]
+
+
+# หลักสูตรที่จ่ายไหวตามงบต่อภาค: กรองและเรียงตามค่าใช้จ่ายตลอดหลักสูตรบนตารางแบบ column
+# (ColumnTable ใน tcas_index.py) - เงื่อนไขทั้งหมดเป็น mask ของ numpy ครั้งเดียว ไม่วนทีละแถว
+TABLE_CATEGORY_COLUMNS = ['มหาวิทยาลัย', 'สาขาวิชา', 'ชื่อวิทยาเขต', 'ประเภทหลักสูตร',
+                          'University_Category']
+TABLE_COST_COLUMNS = ['ค่าใช้จ่ายต่อภาค', 'ค่าใช้จ่ายตลอดหลักสูตร']
+PROGRAM_RESULT_COLUMNS = ['url', 'มหาวิทยาลัย', 'ชื่อหลักสูตร', 'ชื่อวิทยาเขต', 'สาขาวิชา',
+                          'ประเภทหลักสูตร', 'University_Category'] + TABLE_COST_COLUMNS
+AFFORDABLE_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 200
+
+
+@functools.lru_cache(maxsize=1)
+def program_table():
+    return ColumnTable(df, TABLE_CATEGORY_COLUMNS, TABLE_COST_COLUMNS,
+                       sort_by='ค่าใช้จ่ายตลอดหลักสูตร')
+
+
+def program_snapshot():
+    # df และ ColumnTable ที่ตรงกัน (refresh_dataset เปลี่ยนทั้งคู่ภายใต้ lock เดียวกัน)
+    with refresh_lock:
+        return df, program_table()
+
+
+def query_programs(equals=None, ranges=None, page=0, page_size=AFFORDABLE_PAGE_SIZE):
+    # คืนค่า (จำนวนหลักสูตรที่ผ่านเงื่อนไขทั้งหมด, DataFrame ของหน้านั้น เรียงตามค่าใช้จ่ายตลอดหลักสูตร)
+    frame, table = program_snapshot()
+    total, positions = table.page(table.mask(equals, ranges), page * page_size, page_size)
+    return total, frame.iloc[positions][PROGRAM_RESULT_COLUMNS]
+
+
+def query_affordable(budget=None, fields=(), program_type='all', categories=(),
+                     page=0, page_size=AFFORDABLE_PAGE_SIZE):
+    return query_programs(
+        equals={'สาขาวิชา': list(fields or []),
+                'ประเภทหลักสูตร': [program_type] if program_type and program_type != 'all' else [],
+                'University_Category': list(categories or [])},
+        ranges={'ค่าใช้จ่ายต่อภาค': (None, budget)},
+        page=page, page_size=page_size)
+
+
+def program_records(rows):
+    # NaN -> None เพื่อให้เป็น JSON ที่ถูกต้อง
+    return rows.astype(object).where(rows.notna(), None).to_dict('records')
+
+
+def build_affordable_table(total, rows, page, page_size=AFFORDABLE_PAGE_SIZE):
+    if total == 0:
+        return [html.P("No programs match this budget and filters",
+                       style={'color': THEME_COLORS['text_secondary'], 'textAlign': 'center'})]
+
+    first = page * page_size
+    return [
+        html.P(f"Showing {first + 1}-{first + len(rows)} of {total} programs, cheapest total cost first",
+               style={'color': THEME_COLORS['text_secondary'], 'marginBottom': '15px'}),
+        html.Table([
+            html.Thead(html.Tr([
+                html.Th("#", style=table_header_style),
+                html.Th("Program", style={**table_header_style, 'textAlign': 'left'}),
+                html.Th("Field", style={**table_header_style, 'textAlign': 'left'}),
+                html.Th("Per Semester", style=table_header_style),
+                html.Th("Total Program", style=table_header_style)
+            ])),
+            html.Tbody([
+                html.Tr([
+                    html.Td(f"{first + i + 1}", style=table_cell_style),
+                    html.Td(f"{row['ชื่อหลักสูตร'][:60]} — {row['มหาวิทยาลัย']}",
+                            style={**table_cell_style, 'textAlign': 'left',
+                                   'color': THEME_COLORS['text_primary']}),
+                    html.Td(row['สาขาวิชา'], style={**table_cell_style, 'textAlign': 'left'}),
+                    html.Td(f"฿{row['ค่าใช้จ่ายต่อภาค']:,.0f}"
+                            if pd.notna(row['ค่าใช้จ่ายต่อภาค']) else "-", style=table_cell_style),
+                    html.Td(f"฿{row['ค่าใช้จ่ายตลอดหลักสูตร']:,.0f}"
+                            if pd.notna(row['ค่าใช้จ่ายตลอดหลักสูตร']) else "-", style=table_cell_style)
+                ]) for i, (_, row) in enumerate(rows.iterrows())
+            ])
+        ], style={'width': '100%', 'borderCollapse': 'collapse', 'fontSize': '0.95rem'})
+    ]
+
+
+def parse_number(value):
+    if value in (None, ''):
+        return None
+    return float(value)
+
 
+@app.server.route('/api/affordable')
+def api_affordable():
+    # GET /api/affordable?budget=25000&field=คอมพิวเตอร์&program_type=ปกติ&category=Private&page=0
     try:
-        # Filter data
-        if program_type == 'all':
-            filtered_df = df.copy()
-        else:
-            if 'ประเภทหลักสูตร' in df.columns:
-                filtered_df = df[df['ประเภทหลักสูตร'] == program_type]
-            else:
-                filtered_df = df.copy()
+        budget = parse_number(request.args.get('budget'))
+        page = max(int(request.args.get('page', 0)), 0)
+        page_size = min(max(int(request.args.get('page_size', AFFORDABLE_PAGE_SIZE)), 1),
+                        API_MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({'error': f"Invalid parameter: {e}"}), 400
+
+    total, rows = query_affordable(
+        budget, request.args.getlist('field'), request.args.get('program_type', 'all'),
+        request.args.getlist('category'), page, page_size)
+    return jsonify({'total': total, 'page': page, 'page_size': page_size,
+                    'programs': program_records(rows)})
+
+
+# API อ่านอย่างเดียวสำหรับรายงานภายนอก - เงื่อนไขทุกตัวกรองบน ColumnTable (รหัสของคอลัมน์หมวด,
+# ช่วงค่าใช้จ่ายตลอดหลักสูตรเป็น searchsorted) แล้วดึงเฉพาะแถวของหน้านั้นจาก df
+#   GET /api/programs?university=...&field=...&campus=...&program_type=...&category=...
+#                    &cost_type=semester|total&min_cost=...&max_cost=...&page=0&page_size=50
+#   GET /api/programs?...&format=ndjson   -> ทุกแถวที่ผ่านเงื่อนไข ส่งแบบ stream ทีละ chunk
+#   GET /api/programs?...&format=csv      -> ไฟล์ CSV (utf-8-sig เปิดภาษาไทยใน Excel ได้) แบบ stream
+#   GET /api/programs?...&format=parquet  -> ไฟล์ Parquet หนึ่ง row group ต่อ chunk (ต้องมี pyarrow)
+PROGRAM_FILTER_PARAMS = {
+    'university': 'มหาวิทยาลัย',
+    'field': 'สาขาวิชา',
+    'campus': 'ชื่อวิทยาเขต',
+    'program_type': 'ประเภทหลักสูตร',
+    'category': 'University_Category',
+}
+COST_TYPE_PARAMS = {'semester': 'ค่าใช้จ่ายต่อภาค', 'total': 'ค่าใช้จ่ายตลอดหลักสูตร'}
+API_PAGE_SIZE = 50
+STREAM_CHUNK_SIZE = 1000
+
+
+def parse_program_filters(args):
+    # query string -> (equals, ranges) ของ ColumnTable.mask - ค่าไม่ถูกต้อง = ValueError
+    equals = {column: args.getlist(param) for param, column in PROGRAM_FILTER_PARAMS.items()
+              if args.getlist(param)}
+    cost_type = args.get('cost_type', 'semester')
+    if cost_type not in COST_TYPE_PARAMS:
+        raise ValueError(f"cost_type must be one of {', '.join(COST_TYPE_PARAMS)}")
+    ranges = {COST_TYPE_PARAMS[cost_type]: (parse_number(args.get('min_cost')),
+                                            parse_number(args.get('max_cost')))}
+    return equals, ranges
+
+
+def iter_program_chunks(equals=None, ranges=None, chunk_size=STREAM_CHUNK_SIZE):
+    # แถวที่ผ่านเงื่อนไขทีละ chunk - ไม่สร้าง DataFrame ของผลลัพธ์ทั้งหมดในหน่วยความจำ
+    frame, table = program_snapshot()
+    positions = table.positions[np.flatnonzero(table.mask(equals, ranges))]
+    for start in range(0, len(positions), chunk_size):
+        yield frame.iloc[positions[start:start + chunk_size]][PROGRAM_RESULT_COLUMNS]
+
+
+def csv_stream(chunks):
+    # BOM เฉพาะต้นไฟล์, header เฉพาะ chunk แรก
+    first = True
+    for chunk in chunks:
+        yield (('\ufeff' if first else '') + chunk.to_csv(index=False, header=first)).encode('utf-8')
+        first = False
+    if first:
+        yield ('\ufeff' + pd.DataFrame(columns=PROGRAM_RESULT_COLUMNS).to_csv(index=False)).encode('utf-8')
+
+
+class StreamSink(io.RawIOBase):
+    # ปลายทางของ ParquetWriter ที่ส่งต่อ byte ออกไปทันที แต่ยังรายงานตำแหน่งรวม (tell) ให้ถูกต้อง
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data, self.buffer = bytes(self.buffer), bytearray()
+        return data
+
+
+def parquet_stream(chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column, pa.float64()) if column in TABLE_COST_COLUMNS
+                        else (column, pa.string()) for column in PROGRAM_RESULT_COLUMNS])
+    sink = StreamSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in chunks:
+        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_stream, 'text/csv; charset=utf-8', 'csv'),
+    'parquet': (parquet_stream, 'application/vnd.apache.parquet', 'parquet'),
+}
 
-        # Check required columns
-        if 'ค่าใช้จ่ายต่อภาค' not in filtered_df.columns or 'สาขาวิชา' not in filtered_df.columns:
-            fig.add_annotation(
-                text="Required data columns not found",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                showarrow=False, font=dict(size=16, color='red')
-            )
-        else:
-            # Clean data
-            clean_df = filtered_df.dropna(
-                subset=['สาขาวิชา', 'ค่าใช้จ่ายต่อภาค'])
-
-            # Convert cost to numeric
-            clean_df = clean_df.copy()
-            clean_df['cost_numeric'] = pd.to_numeric(
-                clean_df['ค่าใช้จ่ายต่อภาค'].astype(str).str.replace(',', ''),
-                errors='coerce'
+
+@app.server.route('/api/programs')
+def api_programs():
+    try:
+        equals, ranges = parse_program_filters(request.args)
+        page = max(int(request.args.get('page', 0)), 0)
+        page_size = min(max(int(request.args.get('page_size', API_PAGE_SIZE)), 1),
+                        API_MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({'error': f"Invalid parameter: {e}"}), 400
+
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            for chunk in iter_program_chunks(equals, ranges):
+                yield ''.join(json.dumps(record, ensure_ascii=False) + '\n'
+                              for record in program_records(chunk))
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    export_format = request.args.get('format')
+    if export_format in EXPORT_FORMATS:
+        if export_format == 'parquet' and not PARQUET_AVAILABLE:
+            return jsonify({'error': "Parquet export requires pyarrow"}), 501
+        stream, mimetype, extension = EXPORT_FORMATS[export_format]
+        return Response(
+            stream_with_context(stream(iter_program_chunks(equals, ranges))), mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=tcas_programs.{extension}'})
+
+    total, rows = query_programs(equals, ranges, page, page_size)
+    return jsonify({'total': total, 'page': page, 'page_size': page_size,
+                    'programs': program_records(rows)})
+
+
+# โครงกราฟ (skeleton) - สร้างและ validate ด้วย plotly ครั้งเดียวตอนเริ่มโปรแกรม
+# callback แต่ละครั้งเติมเฉพาะข้อมูล (x, y, z, text) ลงใน dict โดยไม่ผ่าน validation ซ้ำ
+
+
+def message_annotation(text, color=None):
+    font = {**MESSAGE_ANNOTATION['font'], 'color': color} if color else MESSAGE_ANNOTATION['font']
+    return {**MESSAGE_ANNOTATION, 'text': text, 'font': font}
+
+
+def message_figure(skeleton, text, color=None):
+    return {'data': [], 'layout': {**skeleton['layout'],
+                                   'annotations': [message_annotation(text, color)]}}
+
+
+def build_field_bar_skeleton():
+    fig = go.Figure()
+
+    # Create bar chart with beautiful styling
+    fig.add_trace(go.Bar(
+        x=[],
+        y=[],
+        textposition='outside',
+        textfont=dict(
+            size=11,
+            color='#374151',
+            family='Arial Black'
+        ),
+        marker=dict(
+            line=dict(
+                color='rgba(255,255,255,0.8)',
+                width=2
+            ),
+            # Add gradient effect
+            pattern=dict(
+                shape="",
+                bgcolor="rgba(255,255,255,0.1)"
             )
-            clean_df = clean_df.dropna(subset=['cost_numeric'])
-
-            if not clean_df.empty:
-                # Calculate averages
-                avg_costs = clean_df.groupby(
-                    'สาขาวิชา')['cost_numeric'].mean().sort_values(ascending=False)
-
-                if not avg_costs.empty:
-                    fields = avg_costs.index.tolist()
-                    costs = avg_costs.values.tolist()
-
-                    # Create beautiful gradient colors
-                    n_bars = len(costs)
-                    gradient_colors = []
-
-                    # Beautiful color palette - from deep blue to bright cyan
-                    base_colors = [
-                        '#1e3a8a',  # Deep blue
-                        '#3b82f6',  # Blue
-                        '#06b6d4',  # Cyan
-                        '#10b981',  # Emerald
-                        '#f59e0b',  # Amber
-                        '#ef4444',  # Red
-                        '#8b5cf6',  # Violet
-                        '#ec4899'   # Pink
-                    ]
-
-                    # Create gradient for each bar
-                    for i in range(n_bars):
-                        color_idx = i % len(base_colors)
-                        gradient_colors.append(base_colors[color_idx])
-
-                    # Create bar chart with beautiful styling
-                    fig.add_trace(go.Bar(
-                        x=fields,
-                        y=costs,
-                        text=[f"฿{c:,.0f}" for c in costs],
-                        textposition='outside',
-                        textfont=dict(
-                            size=11,
-                            color='#374151',
-                            family='Arial Black'
-                        ),
-                        marker=dict(
-                            color=gradient_colors,
-                            line=dict(
-                                color='rgba(255,255,255,0.8)',
-                                width=2
-                            ),
-                            # Add gradient effect
-                            pattern=dict(
-                                shape="",
-                                bgcolor="rgba(255,255,255,0.1)"
-                            )
-                        ),
-                        name='Average Cost',
-                        # Add hover template
-                        hovertemplate="<b>%{x}</b><br>" +
-                                      "Average Cost: ฿%{y:,.0f}<br>" +
-                                      "<extra></extra>",
-                        # Add animation effect
-                        marker_opacity=0.85
-                    ))
-
-                    # Add shadow effect using a second trace
-                    fig.add_trace(go.Bar(
-                        x=fields,
-                        # Slightly lower for shadow
-                        y=[c * 0.95 for c in costs],
-                        marker=dict(
-                            color='rgba(0,0,0,0.1)',  # Semi-transparent black
-                            line=dict(width=0)
-                        ),
-                        showlegend=False,
-                        hoverinfo='skip',
-                        yaxis='y2'
-                    ))
-
-                    # Reorder traces so shadow appears behind
-                    fig.data = fig.data[::-1]
-
-                else:
-                    fig.add_annotation(
-                        text="No valid cost data found",
-                        xref="paper", yref="paper",
-                        x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                        showarrow=False, font=dict(size=16)
-                    )
-            else:
-                fig.add_annotation(
-                    text="No data available for selected filter",
-                    xref="paper", yref="paper",
-                    x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                    showarrow=False, font=dict(size=16)
-                )
+        ),
+        name='Average Cost',
+        # Add hover template
+        hovertemplate="<b>%{x}</b><br>" +
+                      "Average Cost: ฿%{y:,.0f}<br>" +
+                      "<extra></extra>",
+        # Add animation effect
+        marker_opacity=0.85
+    ))
+
+    # Add shadow effect using a second trace
+    fig.add_trace(go.Bar(
+        x=[],
+        y=[],
+        marker=dict(
+            color='rgba(0,0,0,0.1)',  # Semi-transparent black
+            line=dict(width=0)
+        ),
+        showlegend=False,
+        hoverinfo='skip',
+        yaxis='y2'
+    ))
 
-    except Exception as e:
-        print(f"Error in field average chart: {e}")
-        fig.add_annotation(
-            text="Error loading chart data",
-            xref="paper", yref="paper",
-            x=0.5, y=0.5, xanchor='center', yanchor='middle',
-            showarrow=False, font=dict(size=16, color='red')
-        )
+    # Reorder traces so shadow appears behind
+    fig.data = fig.data[::-1]
 
     # Update layout with beautiful styling
     fig.update_layout(
@@ -799,143 +1745,57 @@ def update_field_average_bar(program_type):
         marker_line_color='rgba(255,255,255,0.8)'
     )
 
-    return fig
+    return fig.to_plotly_json()
 
 
-@callback(
-    Output('cost-heatmap-campus-field', 'figure'),
-    Input('cost-type', 'value'),
-    prevent_initial_call=False
-)
-def update_cost_heatmap(cost_type):
+def build_heatmap_skeleton():
     fig = go.Figure()
 
-    try:
-        # ตรวจสอบว่ามี column ที่จำเป็นหรือไม่
-        required_cols = [cost_type, 'ชื่อวิทยาเขต', 'สาขาวิชา']
-        missing_cols = [col for col in required_cols if col not in df.columns]
-
-        if missing_cols:
-            fig.add_annotation(
-                text=f"Missing required columns: {', '.join(missing_cols)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                showarrow=False, font=dict(size=16, color='red')
-            )
-        else:
-            # ทำความสะอาดข้อมูล - ลบ NaN values
-            clean_df = df.dropna(
-                subset=[cost_type, 'ชื่อวิทยาเขต', 'สาขาวิชา'])
-
-            # แปลงค่าใช้จ่ายเป็นตัวเลข
-            clean_df = clean_df.copy()
-            clean_df['cost_numeric'] = pd.to_numeric(
-                clean_df[cost_type].astype(str).str.replace(',', ''),
-                errors='coerce'
-            )
-            clean_df = clean_df.dropna(subset=['cost_numeric'])
-
-            if not clean_df.empty:
-                # สร้าง pivot table สำหรับ heatmap
-                heatmap_data = clean_df.groupby(['ชื่อวิทยาเขต', 'สาขาวิชา'])[
-                    'cost_numeric'].mean().reset_index()
-                pivot_table = heatmap_data.pivot(
-                    index='สาขาวิชา', columns='ชื่อวิทยาเขต', values='cost_numeric')
-
-                # เติมค่า NaN ด้วย 0 เพื่อการแสดงผลที่ดีขึ้น
-                pivot_table = pivot_table.fillna(0)
-
-                if not pivot_table.empty:
-                    # สร้างสีแบบ custom (อ่อนไปเข้มสำหรับราคาต่ำไปสูง)
-                    colorscale = [
-                        [0.0, '#fef7ed'],  # ครีมอ่อน
-                        [0.1, '#fed7aa'],  # ส้มอ่อนมาก
-                        [0.2, '#fdba74'],  # ส้มอ่อน
-                        [0.3, '#fb923c'],  # ส้มปานกลาง
-                        [0.4, '#f97316'],  # ส้มสด
-                        [0.5, '#ea580c'],  # ส้มเข้ม
-                        [0.6, '#dc2626'],  # แดงส้ม
-                        [0.7, '#b91c1c'],  # แดงเข้ม
-                        [0.8, '#991b1b'],  # แดงเข้มกว่า
-                        [0.9, '#7f1d1d'],  # แดงเลือดหมู
-                        [1.0, '#450a0a']   # แดงเกือบดำ
-                    ]
-
-                    # สร้าง heatmap
-                    fig.add_trace(go.Heatmap(
-                        z=pivot_table.values,
-                        x=pivot_table.columns,
-                        y=pivot_table.index,
-                        colorscale=colorscale,
-                        showscale=True,
-                        colorbar=dict(
-                            title=dict(
-                                text="Cost (THB)",
-                                font=dict(size=14, color='#374151',
-                                          family='Arial Black')
-                            ),
-                            tickformat=',.0f',
-                            tickfont=dict(size=11, color='#6b7280'),
-                            len=0.8,
-                            thickness=20,
-                            bgcolor='rgba(255,255,255,0.8)',
-                            bordercolor='#e5e7eb',
-                            borderwidth=1
-                        ),
-                        hoverongaps=False,
-                        hovertemplate="<b>Campus:</b> %{x}<br>" +
-                        "<b>Field:</b> %{y}<br>" +
-                        "<b>Average Cost:</b> ฿%{z:,.0f}<br>" +
-                        "<extra></extra>",
-                        # เพิ่ม text annotations บนแต่ละช่อง
-                        text=[[f"฿{val:,.0f}" if val > 0 else "" for val in row]
-                              for row in pivot_table.values],
-                        texttemplate="%{text}",
-                        textfont=dict(
-                            size=9,
-                            color='gray',
-                            family='Arial Black'
-                        ),
-                        # จัดการค่า 0 ให้โปร่งใส
-                        zmid=pivot_table.values.max()/2 if pivot_table.values.max() > 0 else 0
-                    ))
-
-                    # เพิ่มขอบสำหรับแต่ละช่องที่มีข้อมูล
-                    shapes = []
-                    for i in range(len(pivot_table.index)):
-                        for j in range(len(pivot_table.columns)):
-                            if pivot_table.iloc[i, j] > 0:  # เฉพาะช่องที่มีข้อมูล
-                                shapes.append(dict(
-                                    type="rect",
-                                    x0=j-0.5, y0=i-0.5, x1=j+0.5, y1=i+0.5,
-                                    line=dict(
-                                        color="rgba(255,255,255,0.3)", width=1),
-                                    fillcolor="rgba(0,0,0,0)"
-                                ))
-
-                else:
-                    fig.add_annotation(
-                        text="No data available to create heatmap",
-                        xref="paper", yref="paper",
-                        x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                        showarrow=False, font=dict(size=16)
-                    )
-            else:
-                fig.add_annotation(
-                    text="No valid data found for heatmap",
-                    xref="paper", yref="paper",
-                    x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                    showarrow=False, font=dict(size=16)
-                )
+    # สร้างสีแบบ custom (อ่อนไปเข้มสำหรับราคาต่ำไปสูง)
+    colorscale = [
+        [0.0, '#fef7ed'],  # ครีมอ่อน
+        [0.1, '#fed7aa'],  # ส้มอ่อนมาก
+        [0.2, '#fdba74'],  # ส้มอ่อน
+        [0.3, '#fb923c'],  # ส้มปานกลาง
+        [0.4, '#f97316'],  # ส้มสด
+        [0.5, '#ea580c'],  # ส้มเข้ม
+        [0.6, '#dc2626'],  # แดงส้ม
+        [0.7, '#b91c1c'],  # แดงเข้ม
+        [0.8, '#991b1b'],  # แดงเข้มกว่า
+        [0.9, '#7f1d1d'],  # แดงเลือดหมู
+        [1.0, '#450a0a']   # แดงเกือบดำ
+    ]
 
-    except Exception as e:
-        print(f"Error in heatmap: {e}")
-        fig.add_annotation(
-            text="Error creating heatmap",
-            xref="paper", yref="paper",
-            x=0.5, y=0.5, xanchor='center', yanchor='middle',
-            showarrow=False, font=dict(size=16, color='red')
+    # สร้าง heatmap
+    fig.add_trace(go.Heatmap(
+        colorscale=colorscale,
+        showscale=True,
+        colorbar=dict(
+            title=dict(
+                text="Cost (THB)",
+                font=dict(size=14, color='#374151',
+                          family='Arial Black')
+            ),
+            tickformat=',.0f',
+            tickfont=dict(size=11, color='#6b7280'),
+            len=0.8,
+            thickness=20,
+            bgcolor='rgba(255,255,255,0.8)',
+            bordercolor='#e5e7eb',
+            borderwidth=1
+        ),
+        hoverongaps=False,
+        hovertemplate="<b>Campus:</b> %{x}<br>" +
+        "<b>Field:</b> %{y}<br>" +
+        "<b>Average Cost:</b> ฿%{z:,.0f}<br>" +
+        "<extra></extra>",
+        texttemplate="%{text}",
+        textfont=dict(
+            size=9,
+            color='gray',
+            family='Arial Black'
         )
+    ))
 
     # อัพเดท layout ด้วยการจัดแต่งที่สวยงาม
     fig.update_layout(
@@ -977,23 +1837,150 @@ def update_cost_heatmap(cost_type):
         ]
     )
 
-    return fig
+    return fig.to_plotly_json()
+
+
+# สร้างใน create_app (build_skeletons) - ต้องใช้ plotly validate ครั้งเดียว
+MESSAGE_ANNOTATION = FIELD_BAR_SKELETON = HEATMAP_SKELETON = None
+
+
+def build_skeletons():
+    global MESSAGE_ANNOTATION, FIELD_BAR_SKELETON, HEATMAP_SKELETON
+    MESSAGE_ANNOTATION = go.layout.Annotation(
+        text="",
+        xref="paper", yref="paper",
+        x=0.5, y=0.5, xanchor='center', yanchor='middle',
+        showarrow=False, font=dict(size=16)
+    ).to_plotly_json()
+    FIELD_BAR_SKELETON = build_field_bar_skeleton()
+    HEATMAP_SKELETON = build_heatmap_skeleton()
+
+# Beautiful color palette - from deep blue to bright cyan
+FIELD_BAR_COLORS = [
+    '#1e3a8a',  # Deep blue
+    '#3b82f6',  # Blue
+    '#06b6d4',  # Cyan
+    '#10b981',  # Emerald
+    '#f59e0b',  # Amber
+    '#ef4444',  # Red
+    '#8b5cf6',  # Violet
+    '#ec4899'   # Pink
+]
 
 
 @callback(
-    Output('insights-content', 'children'),
-    [Input('cost-type', 'value'),
-     Input('program-type-filter', 'value')]
+    Output('field-average-cost-bar', 'figure'),
+    [Input('program-type-filter', 'value'),
+     Input('cross-filter', 'data')],
+    prevent_initial_call=False
 )
-def update_insights(cost_type, program_type_filter):
-    # Filter data by program type
-    if program_type_filter == 'all':
-        filtered_df = df.copy()
-    else:
-        filtered_df = df[df['ประเภทหลักสูตร'] == program_type_filter]
+def update_field_average_bar(program_type, cross_filter=None):
+    # กราฟนี้เป็นตัวเลือกสาขาเอง จึงไม่กรองด้วยสาขาที่เลือก
+    return build_field_average_bar(
+        program_type, freeze_filters(cross_filter, exclude=('สาขาวิชา',)))
+
+
+@result_cache.memoize('field-average-bar', lambda: DATASET_VERSION)
+def build_field_average_bar(program_type, filters=()):
+    try:
+        # Check required columns
+        if 'ค่าใช้จ่ายต่อภาค' not in df.columns or 'สาขาวิชา' not in df.columns:
+            return message_figure(FIELD_BAR_SKELETON,
+                                  "Required data columns not found", color='red')
+
+        # ค่าเฉลี่ยต่อสาขาจากผลรวม/จำนวนของกลุ่มย่อยที่ตรงตัวกรอง (ไม่สแกนแถวข้อมูล)
+        stats = cost_aggregates('ค่าใช้จ่ายต่อภาค').rollup(
+            ['สาขาวิชา'], filter_query(program_type, filters))
+
+        if stats.empty:
+            return message_figure(FIELD_BAR_SKELETON,
+                                  "No data available for selected filter")
+
+        # Calculate averages
+        avg_costs = stats['mean'].sort_values(ascending=False)
+
+        if avg_costs.empty:
+            return message_figure(FIELD_BAR_SKELETON, "No valid cost data found")
+
+        fields = avg_costs.index.tolist()
+        costs = avg_costs.values.tolist()
+        gradient_colors = [FIELD_BAR_COLORS[i % len(FIELD_BAR_COLORS)]
+                           for i in range(len(costs))]
+
+        # เติมข้อมูลลงในโครงกราฟ (trace แรกคือเงา, trace ที่สองคือแท่งหลัก)
+        shadow, main = FIELD_BAR_SKELETON['data']
+        return {
+            'data': [
+                {**shadow, 'x': fields, 'y': [c * 0.95 for c in costs]},
+                {**main, 'x': fields, 'y': costs,
+                 'text': [f"฿{c:,.0f}" for c in costs],
+                 'marker': {**main['marker'], 'color': gradient_colors}},
+            ],
+            'layout': FIELD_BAR_SKELETON['layout'],
+        }
+
+    except Exception as e:
+        print(f"Error in field average chart: {e}")
+        # error ชั่วคราวไม่เก็บในแคช - request ถัดไปคำนวณใหม่
+        return uncached(message_figure(FIELD_BAR_SKELETON, "Error loading chart data", color='red'))
+
+
+@result_cache.memoize('cost-heatmap', lambda: DATASET_VERSION)
+def build_cost_heatmap(cost_type, program_type='all', filters=()):
+    try:
+        # ตรวจสอบว่ามี column ที่จำเป็นหรือไม่
+        required_cols = [cost_type, 'ชื่อวิทยาเขต', 'สาขาวิชา']
+        missing_cols = [col for col in required_cols if col not in df.columns]
+
+        if missing_cols:
+            return message_figure(
+                HEATMAP_SKELETON,
+                f"Missing required columns: {', '.join(missing_cols)}", color='red')
+
+        # ค่าเฉลี่ยต่อ (วิทยาเขต, สาขา) จากผลรวม/จำนวนของกลุ่มย่อย - กลุ่มที่มี NaN ถูกตัดออกแล้ว
+        stats = cost_aggregates(cost_type).rollup(
+            ['ชื่อวิทยาเขต', 'สาขาวิชา'], filter_query(program_type, filters))
+
+        if stats.empty:
+            return message_figure(HEATMAP_SKELETON, "No valid data found for heatmap")
+
+        # สร้าง pivot table สำหรับ heatmap
+        heatmap_data = stats['mean'].rename('cost_numeric').reset_index()
+        pivot_table = heatmap_data.pivot(
+            index='สาขาวิชา', columns='ชื่อวิทยาเขต', values='cost_numeric')
+
+        # เติมค่า NaN ด้วย 0 เพื่อการแสดงผลที่ดีขึ้น
+        pivot_table = pivot_table.fillna(0)
+
+        if pivot_table.empty:
+            return message_figure(HEATMAP_SKELETON, "No data available to create heatmap")
+
+        z = pivot_table.values
+        z_max = z.max()
+        return {
+            'data': [{
+                **HEATMAP_SKELETON['data'][0],
+                'z': z.tolist(),
+                'x': pivot_table.columns.tolist(),
+                'y': pivot_table.index.tolist(),
+                # เพิ่ม text annotations บนแต่ละช่อง
+                'text': [[f"฿{val:,.0f}" if val > 0 else "" for val in row]
+                         for row in z],
+                # จัดการค่า 0 ให้โปร่งใส
+                'zmid': z_max / 2 if z_max > 0 else 0,
+            }],
+            'layout': HEATMAP_SKELETON['layout'],
+        }
+
+    except Exception as e:
+        print(f"Error in heatmap: {e}")
+        return uncached(message_figure(HEATMAP_SKELETON, "Error creating heatmap", color='red'))
+
 
-    # Remove NaN values for calculations
-    filtered_df = filtered_df.dropna(subset=[cost_type])
+@result_cache.memoize('insights', lambda: DATASET_VERSION)
+def build_insights(cost_type, program_type_filter, filters=()):
+    # Filter data by program type and cross-filter (NaN costs are already removed in cost_view)
+    filtered_df = apply_filters(cost_view(cost_type), program_type_filter, filters)
 
     if filtered_df.empty:
         return [html.P("No data available for selected filters",
@@ -1082,5 +2069,540 @@ def update_insights(cost_type, program_type_filter):
     return insights
 
 
+def build_cost_distribution(cost_type, dimension, program_type='all', filters=()):
+    fig = go.Figure()
+    table = []
+
+    try:
+        sketches = merged_sketches(cost_type, dimension, program_type, filters)
+        stats = sorted(
+            ((group, sketch.count, sketch.quantiles(PERCENTILES))
+             for group, sketch in sketches.items() if sketch.count > 0),
+            key=lambda item: item[2][2], reverse=True)
+
+        if stats:
+            groups = [group for group, _, _ in stats]
+            fig.add_trace(go.Box(
+                x=groups,
+                lowerfence=[p[0] for _, _, p in stats],
+                q1=[p[1] for _, _, p in stats],
+                median=[p[2] for _, _, p in stats],
+                q3=[p[3] for _, _, p in stats],
+                upperfence=[p[4] for _, _, p in stats],
+                marker_color=THEME_COLORS['primary'],
+                fillcolor=f'{THEME_COLORS["primary"]}40',
+                line=dict(width=2),
+                name='Cost Distribution',
+                hoverinfo='x+y'
+            ))
+
+            table = [html.Table([
+                html.Thead(html.Tr(
+                    [html.Th("Group", style={**table_header_style, 'textAlign': 'left'}),
+                     html.Th("Programs", style=table_header_style)] +
+                    [html.Th(f"P{int(q * 100)}", style=table_header_style) for q in PERCENTILES])),
+                html.Tbody([
+                    html.Tr(
+                        [html.Td(group, style={**table_cell_style, 'textAlign': 'left',
+                                               'color': THEME_COLORS['text_primary']}),
+                         html.Td(f"{count}", style=table_cell_style)] +
+                        [html.Td(f"฿{value:,.0f}", style=table_cell_style) for value in percentiles])
+                    for group, count, percentiles in stats
+                ])
+            ], style={'width': '100%', 'borderCollapse': 'collapse', 'marginTop': '20px',
+                      'fontSize': '0.95rem'})]
+        else:
+            fig.add_annotation(
+                text="No data available for selected filters",
+                xref="paper", yref="paper",
+                x=0.5, y=0.5, xanchor='center', yanchor='middle',
+                showarrow=False, font=dict(size=16)
+            )
+    except Exception as e:
+        print(f"Error in cost distribution: {e}")
+        fig.add_annotation(
+            text="Error loading chart data",
+            xref="paper", yref="paper",
+            x=0.5, y=0.5, xanchor='center', yanchor='middle',
+            showarrow=False, font=dict(size=16, color='red')
+        )
+
+    fig.update_layout(
+        xaxis=dict(tickangle=-30, tickfont=dict(size=11, color='#6b7280')),
+        yaxis=dict(title="Cost (THB)", tickformat=',.0f',
+                   tickfont=dict(size=11, color='#6b7280')),
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(family="Inter, Arial, sans-serif", size=12),
+        height=500,
+        showlegend=False,
+        margin=dict(t=40, l=80, r=40, b=120)
+    )
+
+    return fig, table
+
+
+TREND_CHANGE_ROWS = 10
+
+
+def build_cost_trends(cost_type):
+    fig = go.Figure()
+    changes_table = []
+
+    try:
+        # อ่านเฉพาะค่าสรุปที่คำนวณไว้ต่อ partition
+        trends = tcas_history.field_trends(cost_type)
+
+        if trends.shape[1] > 0:
+            for i, (field, row) in enumerate(trends.iterrows()):
+                fig.add_trace(go.Scatter(
+                    x=trends.columns.tolist(),
+                    y=row.tolist(),
+                    mode='lines+markers',
+                    name=field,
+                    line=dict(width=3, color=COMPARISON_COLORS[i % len(COMPARISON_COLORS)]),
+                    marker=dict(size=8),
+                    hovertemplate=f"<b>{field}</b><br>%{{x}}: ฿%{{y:,.0f}}<extra></extra>"
+                ))
+
+            changes = tcas_history.program_cost_changes(cost_type)
+            if not changes.empty:
+                changes = changes.reindex(
+                    changes['change'].abs().sort_values(ascending=False).index).head(TREND_CHANGE_ROWS)
+                changes_table = [
+                    html.H4(f"Largest cost changes {changes.attrs['before']} → {changes.attrs['after']}",
+                            style={'color': THEME_COLORS['text_primary'], 'marginTop': '25px'}),
+                    html.Table([
+                        html.Thead(html.Tr([
+                            html.Th("Program", style={**table_header_style, 'textAlign': 'left'}),
+                            html.Th(changes.attrs['before'], style=table_header_style),
+                            html.Th(changes.attrs['after'], style=table_header_style),
+                            html.Th("Change", style=table_header_style)
+                        ])),
+                        html.Tbody([
+                            html.Tr([
+                                html.Td(f"{row['ชื่อหลักสูตร'][:60]} — {row['มหาวิทยาลัย']}",
+                                        style={**table_cell_style, 'textAlign': 'left',
+                                               'color': THEME_COLORS['text_primary']}),
+                                html.Td(f"฿{row['cost_before']:,.0f}", style=table_cell_style),
+                                html.Td(f"฿{row['cost_after']:,.0f}", style=table_cell_style),
+                                html.Td(f"{row['change']:+,.0f}" + (
+                                    f" ({row['change_pct']:+.1%})" if pd.notna(row['change_pct']) else ""),
+                                    style={**table_cell_style, 'color': THEME_COLORS['success']
+                                           if row['change'] > 0 else THEME_COLORS['primary']})
+                            ]) for _, row in changes.iterrows()
+                        ])
+                    ], style={'width': '100%', 'borderCollapse': 'collapse', 'fontSize': '0.95rem'})
+                ]
+        else:
+            fig.add_annotation(
+                text="No historical snapshots yet - add one with: python tcas_history.py add <csv> --year <year>",
+                xref="paper", yref="paper",
+                x=0.5, y=0.5, xanchor='center', yanchor='middle',
+                showarrow=False, font=dict(size=14)
+            )
+    except Exception as e:
+        print(f"Error in cost trends: {e}")
+        fig.add_annotation(
+            text="Error loading chart data",
+            xref="paper", yref="paper",
+            x=0.5, y=0.5, xanchor='center', yanchor='middle',
+            showarrow=False, font=dict(size=16, color='red')
+        )
+
+    fig.update_layout(
+        xaxis=dict(title="TCAS Year / Round", type='category',
+                   tickfont=dict(size=11, color='#6b7280')),
+        yaxis=dict(title="Average Cost (THB)", tickformat=',.0f',
+                   tickfont=dict(size=11, color='#6b7280')),
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(family="Inter, Arial, sans-serif", size=12),
+        height=450,
+        margin=dict(t=40, l=80, r=40, b=60)
+    )
+
+    return fig, changes_table
+
+
+def toggle_filter_value(cross_filter, column, value, selected=None):
+    values = cross_filter.setdefault(column, [])
+    if selected is None:
+        selected = value not in values
+    if selected and value not in values:
+        values.append(value)
+    elif not selected and value in values:
+        values.remove(value)
+
+
+@callback(
+    [Output('cross-filter', 'data'),
+     Output('category-filter', 'value'),
+     Output('cross-filter-summary', 'children')],
+    [Input('field-average-cost-bar', 'clickData'),
+     Input('cost-heatmap-campus-field', 'clickData'),
+     Input('category-filter', 'value'),
+     Input('clear-cross-filter', 'n_clicks')],
+    State('cross-filter', 'data'),
+    prevent_initial_call=True
+)
+def update_cross_filter(field_click, heatmap_click, categories, clear_clicks, current):
+    cross_filter = {column: list(values) for column, values in (current or {}).items()}
+    trigger = dash.ctx.triggered_id
+
+    try:
+        if trigger == 'clear-cross-filter':
+            cross_filter = {}
+        elif trigger == 'field-average-cost-bar' and field_click:
+            toggle_filter_value(cross_filter, 'สาขาวิชา', field_click['points'][0]['x'])
+        elif trigger == 'cost-heatmap-campus-field' and heatmap_click:
+            # คลิกช่อง heatmap = เลือก (วิทยาเขต, สาขา) คู่นั้น, คลิกซ้ำ = ยกเลิก
+            point = heatmap_click['points'][0]
+            selected = not (point['x'] in cross_filter.get('ชื่อวิทยาเขต', []) and
+                            point['y'] in cross_filter.get('สาขาวิชา', []))
+            toggle_filter_value(cross_filter, 'ชื่อวิทยาเขต', point['x'], selected)
+            toggle_filter_value(cross_filter, 'สาขาวิชา', point['y'], selected)
+        elif trigger == 'category-filter':
+            cross_filter['University_Category'] = list(categories or [])
+    except Exception as e:
+        print(f"Error in cross filter: {e}")
+
+    cross_filter = {column: values for column, values in cross_filter.items() if values}
+    if cross_filter:
+        summary = "Filtered by " + " | ".join(
+            f"{column}: {', '.join(values)}" for column, values in cross_filter.items())
+    else:
+        summary = "Click a bar or heatmap cell to filter the other charts"
+    return cross_filter, cross_filter.get('University_Category', []), summary
+
+
+@callback(
+    [Output('affordable-programs', 'children'),
+     Output('affordable-page', 'data')],
+    [Input('affordable-budget', 'value'),
+     Input('affordable-fields', 'value'),
+     Input('affordable-program-type', 'value'),
+     Input('affordable-categories', 'value'),
+     Input('affordable-prev', 'n_clicks'),
+     Input('affordable-next', 'n_clicks')],
+    State('affordable-page', 'data'),
+    prevent_initial_call=False
+)
+def update_affordable_programs(budget, fields, program_type, categories, prev_clicks,
+                               next_clicks, page):
+    # เปลี่ยนเงื่อนไข = กลับไปหน้าแรก
+    trigger = dash.ctx.triggered_id
+    page = page or 0
+    if trigger == 'affordable-prev':
+        page = max(page - 1, 0)
+    elif trigger == 'affordable-next':
+        page += 1
+    else:
+        page = 0
+
+    try:
+        total, rows = query_affordable(budget, fields, program_type, categories, page)
+        last_page = max((total - 1) // AFFORDABLE_PAGE_SIZE, 0)
+        if page > last_page:
+            page = last_page
+            total, rows = query_affordable(budget, fields, program_type, categories, page)
+        return build_affordable_table(total, rows, page), page
+    except Exception as e:
+        print(f"Error in affordable programs: {e}")
+        return [html.P("Error loading affordable programs",
+                       style={'color': 'red', 'textAlign': 'center'})], page
+
+
+@callback(
+    [Output('download-csv', 'href'),
+     Output('download-parquet', 'href')],
+    [Input('program-type-filter', 'value'),
+     Input('cross-filter', 'data')],
+    prevent_initial_call=False
+)
+def update_download_links(program_type, cross_filter):
+    # ตัวกรองเดียวกับที่กราฟแสดงอยู่ -> query string ของ /api/programs
+    params = {param: (cross_filter or {}).get(column) for param, column in PROGRAM_FILTER_PARAMS.items()}
+    params = {param: values for param, values in params.items() if values}
+    if program_type and program_type != 'all':
+        params['program_type'] = [program_type]
+    path = app.get_relative_path('/api/programs')
+    return (f"{path}?{urlencode({**params, 'format': 'csv'}, doseq=True)}",
+            f"{path}?{urlencode({**params, 'format': 'parquet'}, doseq=True)}")
+
+
+# การเปลี่ยน cost-type กระทบ 3 ส่วนพร้อมกัน จึงรวมเป็น callback เดียว
+# = request เดียวต่อการคลิก และใช้ cost_view ร่วมกัน (คำนวณรอบเดียว)
+# ส่วนที่ input ของตัวเองไม่ได้เปลี่ยนจะคืน no_update
+COMPARISON_INPUTS = {'university-1-dropdown', 'program-1-dropdown', 'university-2-dropdown',
+                     'program-2-dropdown', 'comparison-programs-dropdown', 'cost-type'}
+HEATMAP_INPUTS = {'cost-type', 'program-type-filter', 'cross-filter', 'heatmap-section-visible'}
+INSIGHTS_INPUTS = {'cost-type', 'program-type-filter', 'cross-filter', 'insights-section-visible'}
+DISTRIBUTION_INPUTS = {'cost-type', 'program-type-filter', 'cross-filter', 'distribution-dimension',
+                       'distribution-section-visible'}
+TREND_INPUTS = {'cost-type', 'trend-section-visible'}
+SIMILAR_INPUTS = {'university-1-dropdown', 'program-1-dropdown', 'cost-type', 'similar-cheaper-only'}
+
+
+COST_VIEW_INPUTS = [
+    Input('university-1-dropdown', 'value'),
+    Input('program-1-dropdown', 'value'),
+    Input('university-2-dropdown', 'value'),
+    Input('program-2-dropdown', 'value'),
+    Input('cost-type', 'value'),
+    Input('comparison-programs-dropdown', 'value'),
+    Input('program-type-filter', 'value'),
+    Input('cross-filter', 'data'),
+    Input('distribution-dimension', 'value'),
+    Input('heatmap-section-visible', 'data'),
+    Input('insights-section-visible', 'data'),
+    Input('distribution-section-visible', 'data'),
+    Input('trend-section-visible', 'data'),
+    Input('similar-cheaper-only', 'value'),
+]
+LIGHT_OUTPUTS = [
+    Output('comparison-chart', 'figure'),
+    Output('trend-chart', 'figure'),
+    Output('trend-changes', 'children'),
+    Output('similar-programs', 'children'),
+]
+HEAVY_OUTPUTS = [
+    Output('cost-heatmap-campus-field', 'figure'),
+    Output('cost-distribution-chart', 'figure'),
+    Output('cost-distribution-table', 'children'),
+    Output('insights-content', 'children'),
+]
+HEAVY_INPUTS = [
+    Input('cost-type', 'value'),
+    Input('program-type-filter', 'value'),
+    Input('cross-filter', 'data'),
+    Input('distribution-dimension', 'value'),
+    Input('heatmap-section-visible', 'data'),
+    Input('distribution-section-visible', 'data'),
+    Input('insights-section-visible', 'data'),
+]
+
+
+def build_heavy_views(changed, cost_type, program_type, cross_filter, dimension,
+                      heatmap_visible, distribution_visible, insights_visible, set_progress=None):
+    # changed=None -> คำนวณทุกส่วนที่มองเห็น (ส่วนที่ไม่เปลี่ยนได้จาก result_cache)
+    def needs(visible, inputs):
+        return visible and (changed is None or not changed or changed & inputs)
+
+    def progress(done):
+        if set_progress is not None:
+            set_progress((str(done), str(len(HEAVY_SECTIONS))))
+
+    heatmap = dash.no_update
+    if needs(heatmap_visible, HEATMAP_INPUTS):
+        # heatmap เป็นตัวเลือกวิทยาเขตและสาขาเอง จึงกรองเฉพาะมิติอื่น
+        heatmap = build_cost_heatmap(cost_type, program_type, freeze_filters(
+            cross_filter, exclude=('ชื่อวิทยาเขต', 'สาขาวิชา')))
+    progress(1)
+
+    distribution, distribution_table = dash.no_update, dash.no_update
+    if needs(distribution_visible, DISTRIBUTION_INPUTS):
+        distribution, distribution_table = build_cost_distribution(
+            cost_type, dimension, program_type, freeze_filters(cross_filter))
+    progress(2)
+
+    insights = dash.no_update
+    if needs(insights_visible, INSIGHTS_INPUTS):
+        insights = build_insights(cost_type, program_type, freeze_filters(cross_filter))
+    progress(3)
+
+    return heatmap, distribution, distribution_table, insights
+
+
+@callback(
+    LIGHT_OUTPUTS + ([] if BACKGROUND_CALLBACKS else HEAVY_OUTPUTS),
+    COST_VIEW_INPUTS,
+    prevent_initial_call=False
+)
+def update_cost_views(uni1, prog1, uni2, prog2, cost_type, extra_urls, program_type,
+                      cross_filter, dimension, heatmap_visible, insights_visible,
+                      distribution_visible, trend_visible, similar_options):
+    changed = set(dash.ctx.triggered_prop_ids.values())
+    initial = not changed
+
+    comparison = dash.no_update
+    if initial or changed & COMPARISON_INPUTS:
+        comparison = build_comparison_chart(uni1, prog1, uni2, prog2, cost_type, extra_urls)
+
+    trend, trend_changes = dash.no_update, dash.no_update
+    if trend_visible and (initial or changed & TREND_INPUTS):
+        trend, trend_changes = build_cost_trends(cost_type)
+
+    similar = dash.no_update
+    if initial or changed & SIMILAR_INPUTS:
+        similar = build_similar_programs(
+            uni1, prog1, cost_type, 'cheaper' in (similar_options or []))
+
+    outputs = (comparison, trend, trend_changes, similar)
+    if not BACKGROUND_CALLBACKS:
+        outputs += build_heavy_views(changed, cost_type, program_type, cross_filter, dimension,
+                                     heatmap_visible, distribution_visible, insights_visible)
+    if all(output is dash.no_update for output in outputs):
+        raise PreventUpdate
+    return outputs
+
+
+if BACKGROUND_CALLBACKS:
+    # งานที่ยังไม่เสร็จของ callback นี้จะถูกยกเลิกอัตโนมัติเมื่อถูกเรียกใหม่ (input เปลี่ยนระหว่างคำนวณ)
+    @callback(
+        HEAVY_OUTPUTS,
+        HEAVY_INPUTS,
+        background=True,
+        manager=background_manager,
+        progress=[Output('heavy-views-progress', 'value'),
+                  Output('heavy-views-progress', 'max')],
+        running=[(Output('heavy-views-status', 'style'),
+                  {'display': 'block', 'textAlign': 'center', 'marginBottom': '15px'},
+                  {'display': 'none'})],
+        prevent_initial_call=False
+    )
+    def update_heavy_views(set_progress, cost_type, program_type, cross_filter, dimension,
+                           heatmap_visible, distribution_visible, insights_visible):
+        outputs = build_heavy_views(None, cost_type, program_type, cross_filter, dimension,
+                                    heatmap_visible, distribution_visible, insights_visible,
+                                    set_progress)
+        if all(output is dash.no_update for output in outputs):
+            raise PreventUpdate
+        return outputs
+
+
+# อุ่นแคชตอนเริ่มโปรแกรม: field bar, heatmap และ insights มี input จำกัด
+# (cost-type x program-type-filter โดยยังไม่มี cross-filter) จึงคำนวณไว้ล่วงหน้าได้ทั้งหมด
+# ก่อน worker เริ่มรับ request - ผู้ใช้คนแรกหลัง deploy ไม่ต้องรอ
+#   TCAS_WARMUP=0          -> ปิด (เช่นตอนรัน export_static หรือ debug)
+#   TCAS_WARMUP_WORKERS=N  -> จำนวน thread (ค่าเริ่มต้น 4)
+# ใช้ thread ไม่ใช่ process เพราะผลต้องอยู่ใน result_cache ของโปรเซสนี้ (backend lru)
+# gunicorn --preload: อุ่นครั้งเดียวใน master แล้ว fork ไปทุก worker
+WARMUP = os.environ.get('TCAS_WARMUP', '1') == '1'
+WARMUP_WORKERS = int(os.environ.get('TCAS_WARMUP_WORKERS', '4'))
+
+
+def warmup_tasks():
+    # argument ต้องตรงกับที่ callback ส่ง (key ของแคชมาจาก argument) - cross-filter เริ่มต้นคือ {}
+    cost_types = [o['value'] for o in COST_TYPE_OPTIONS]
+    program_types = [o['value'] for o in PROGRAM_TYPE_OPTIONS]
+    tasks = [(build_field_average_bar, (program_type, freeze_filters({}, exclude=('สาขาวิชา',))))
+             for program_type in program_types]
+    for cost_type in cost_types:
+        for program_type in program_types:
+            tasks.append((build_cost_heatmap, (cost_type, program_type, freeze_filters(
+                {}, exclude=('ชื่อวิทยาเขต', 'สาขาวิชา')))))
+            tasks.append((build_insights, (cost_type, program_type, freeze_filters({}))))
+    return tasks
+
+
+def warm_up(workers=WARMUP_WORKERS):
+    start = time.perf_counter()
+    try:
+        # ข้อมูลที่ใช้ร่วมกัน (lru_cache / cost_summaries) สร้างก่อนทีละตัว กันหลาย thread สร้างซ้ำพร้อมกัน
+        for option in COST_TYPE_OPTIONS:
+            cost_summary(option['value'])
+        tasks = warmup_tasks()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda task: task[0](*task[1]), tasks))
+        print(f"Warm-up: {len(tasks)} views cached in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        print(f"Error in warm-up: {e}")
+
+
+startup.record('module', time.perf_counter() - MODULE_START)
+
+
+# app factory: โหลดข้อมูล, สร้างดัชนี, layout (ครั้งเดียว) และอุ่นแคช เมื่อเรียกครั้งแรกเท่านั้น
+# import extra_dash จึงไม่อ่าน CSV - เรียก create_app() ก่อนรับ request
+#   python extra_dash.py
+#   gunicorn 'extra_dash:create_server()'
+# งบเวลาต่อ phase (ms): TCAS_STARTUP_BUDGET="load_data=500,layout=200"
+# TCAS_STARTUP_STRICT=1 -> เกินงบแล้วหยุดโปรแกรม (ใช้ใน CI), ไม่เช่นนั้นแค่แจ้งเตือน
+# ค่าที่วัดได้ (ms) บวกเผื่อเล็กน้อย - import dash เองใช้ราว 500 ms (รวม IPython ที่ dash โหลด)
+STARTUP_BUDGET_MS = {
+    'imports': 800,
+    'module': 50,
+    'heavy_imports': 400,
+    'skeletons': 250,
+    'load_data': 50,
+    'indexes': 50,
+    'layout': 25,
+    'warm_up': 150,
+}
+STARTUP_STRICT = os.environ.get('TCAS_STARTUP_STRICT', '0') == '1'
+init_lock = threading.Lock()
+
+
+def startup_budget():
+    budget = dict(STARTUP_BUDGET_MS)
+    for item in os.environ.get('TCAS_STARTUP_BUDGET', '').split(','):
+        if '=' in item:
+            phase, value = item.split('=', 1)
+            budget[phase.strip()] = float(value)
+    return budget
+
+
+def startup_profile():
+    budget = startup_budget()
+    stages = startup.report()['stages']
+    phases = {}
+    for phase, stats in stages.items():
+        elapsed_ms = round(stats['total_s'] * 1000, 1)
+        phases[phase] = {'ms': elapsed_ms, 'budget_ms': budget.get(phase),
+                         'over': phase in budget and elapsed_ms > budget[phase]}
+    return {
+        'phases': phases,
+        'total_ms': round(sum(p['ms'] for p in phases.values()), 1),
+        'over_budget': [phase for phase, p in phases.items() if p['over']],
+    }
+
+
+def check_startup_budget():
+    profile = startup_profile()
+    for phase in profile['over_budget']:
+        p = profile['phases'][phase]
+        print(f"Startup phase '{phase}' took {p['ms']:.0f} ms (budget {p['budget_ms']:.0f} ms)")
+    if profile['over_budget'] and STARTUP_STRICT:
+        raise RuntimeError(f"Startup over budget: {', '.join(profile['over_budget'])}")
+    return profile
+
+
+def create_app():
+    with init_lock:
+        if app.layout is None:
+            with startup.stage('heavy_imports'):
+                import_heavy_modules()
+            with startup.stage('skeletons'):
+                build_skeletons()
+            with startup.stage('load_data'):
+                load_data()
+            with startup.stage('indexes'):
+                install_row_indexes(build_row_indexes(df))
+            with startup.stage('layout'):
+                app.layout = build_layout()
+            if WARMUP:
+                with startup.stage('warm_up'):
+                    warm_up()
+            check_startup_budget()
+    return app
+
+
+def create_server():
+    return create_app().server
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="TCAS engineering programs dashboard")
+    parser.add_argument('--startup-profile', action='store_true',
+                        help="print startup time per phase and exit (status 1 if over budget)")
+    args = parser.parse_args()
+    create_app()
+    if args.startup_profile:
+        profile = startup_profile()
+        for phase, p in profile['phases'].items():
+            budget = f"{p['budget_ms']:.0f}" if p['budget_ms'] is not None else '-'
+            print(f"{phase:<14} {p['ms']:>9.1f} ms  budget {budget:>6} ms{'  OVER' if p['over'] else ''}")
+        print(f"{'total':<14} {profile['total_ms']:>9.1f} ms")
+        raise SystemExit(1 if profile['over_budget'] else 0)
     app.run(debug=True)
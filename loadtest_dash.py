@@ -0,0 +1,273 @@
+import argparse
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from tcas_metrics import RunMetrics, summarize
+
+# ทดสอบโหลดของ extra_dash ด้วยการเล่น session การใช้งานซ้ำกับ app ที่รันอยู่
+# แต่ละ virtual user เปิดหน้า (callback เริ่มต้นทั้งหมด) แล้วทำตาม step ใน session
+# (เปลี่ยน dropdown, สลับ cost-type, คลิกตัวกรองประเภทหลักสูตร) โดยยิง /_dash-update-component
+# แบบเดียวกับ browser ทั้ง input/state ปัจจุบันและ callback ต่อเนื่องที่ output ไปเปลี่ยน input ของ callback อื่น
+#
+#   python extra_dash.py                                   # (อีก terminal) หรือ gunicorn ตามที่ใช้จริง
+#   python loadtest_dash.py --users 20 --sessions 200 --save-trace trace.json
+#   python loadtest_dash.py --users 50 --trace trace.json --out loadtest_report.json
+#
+# trace.json = {"sessions": [[{"set": {"cost-type.value": "..."}, "think": 1.0}, ...], ...]}
+# ใช้ trace เดิมซ้ำเพื่อเทียบผลก่อน/หลังปรับ scaling
+# หมายเหตุ: callback แบบ background (TCAS_BACKGROUND_CALLBACKS=1) วัดได้แค่เวลารับงาน ไม่รวมเวลาคำนวณ
+
+# input ที่ผู้ใช้เปลี่ยนบ่อยในวันประกาศผล -> (component, property)
+SESSION_ACTIONS = [
+    ('cost-type', 'value'),
+    ('program-type-filter', 'value'),
+    ('university-1-dropdown', 'value'),
+    ('university-2-dropdown', 'value'),
+    ('distribution-dimension', 'value'),
+]
+MAX_CHAIN_DEPTH = 4
+HTTP_TIMEOUT = 60
+
+
+def fetch_json(url, body=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=HTTP_TIMEOUT) as response:
+        payload = response.read()
+        return response.status, (json.loads(payload) if payload else None)
+
+
+def walk_layout(node, components):
+    # id -> props ของทุก component ในหน้า (ค่าเริ่มต้นของ state ฝั่ง browser)
+    if isinstance(node, list):
+        for child in node:
+            walk_layout(child, components)
+        return
+    if not isinstance(node, dict) or 'props' not in node:
+        return
+    props = node['props']
+    if isinstance(props.get('id'), str):
+        components[props['id']] = {k: v for k, v in props.items() if k != 'children'}
+        components[props['id']]['children'] = props.get('children')
+    walk_layout(props.get('children'), components)
+
+
+def parse_outputs(output):
+    # "..a.b...c.d.." -> หลาย output, "a.b" -> output เดียว
+    if output.startswith('..'):
+        return [tuple(part.rsplit('.', 1)) for part in output[2:-2].split('...')], True
+    return [tuple(output.rsplit('.', 1))], False
+
+
+class DashApp:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        _, layout = fetch_json(f"{self.base_url}/_dash-layout")
+        _, dependencies = fetch_json(f"{self.base_url}/_dash-dependencies")
+        self.components = {}
+        walk_layout(layout, self.components)
+        self.callbacks = []
+        for dep in dependencies:
+            # ข้าม clientside callback และ id แบบ pattern-matching
+            if dep.get('clientside_function') or '{' in dep['output']:
+                continue
+            outputs, multi = parse_outputs(dep['output'])
+            self.callbacks.append({
+                'name': dep['output'],
+                'outputs': outputs,
+                'multi': multi,
+                'inputs': [(i['id'], i['property']) for i in dep['inputs']],
+                'state': [(s['id'], s['property']) for s in dep.get('state', [])],
+                'initial': not dep.get('prevent_initial_call'),
+            })
+
+    def options(self, component_id):
+        values = []
+        for option in self.components.get(component_id, {}).get('options') or []:
+            values.append(option['value'] if isinstance(option, dict) else option)
+        return values
+
+
+class Session:
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+        self.state = {cid: dict(props) for cid, props in app.components.items()}
+
+    def value(self, key):
+        component_id, prop = key
+        return self.state.get(component_id, {}).get(prop)
+
+    def call(self, callback, changed):
+        body = {
+            'output': callback['name'],
+            'outputs': [{'id': c, 'property': p} for c, p in callback['outputs']],
+            'inputs': [{'id': c, 'property': p, 'value': self.value((c, p))}
+                       for c, p in callback['inputs']],
+            'state': [{'id': c, 'property': p, 'value': self.value((c, p))}
+                      for c, p in callback['state']],
+            'changedPropIds': sorted(f"{c}.{p}" for c, p in changed),
+        }
+        if not callback['multi']:
+            body['outputs'] = body['outputs'][0]
+        start = time.perf_counter()
+        try:
+            status, payload = fetch_json(f"{self.app.base_url}/_dash-update-component", body)
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, None
+        except Exception:
+            status, payload = None, None
+        self.metrics.record(callback['name'], time.perf_counter() - start)
+        self.metrics.count(f"{callback['name']}|requests")
+        # 204 = PreventUpdate (ไม่ใช่ error)
+        if status not in (200, 204):
+            self.metrics.count(f"{callback['name']}|errors")
+            return set()
+
+        updated = set()
+        for component_id, props in ((payload or {}).get('response') or {}).items():
+            for prop, value in props.items():
+                self.state.setdefault(component_id, {})[prop] = value
+                updated.add((component_id, prop))
+        return updated
+
+    def fire(self, changed, depth=0):
+        # callback ที่มี input เปลี่ยน -> ยิง แล้วไล่ต่อจาก output ที่ได้ (เหมือน renderer ของ Dash)
+        if not changed or depth > MAX_CHAIN_DEPTH:
+            return
+        updated = set()
+        for callback in self.app.callbacks:
+            triggered = changed & set(callback['inputs'])
+            if triggered:
+                updated |= self.call(callback, triggered)
+        self.fire(updated, depth + 1)
+
+    def load(self):
+        start = time.perf_counter()
+        updated = set()
+        for callback in self.app.callbacks:
+            if callback['initial']:
+                updated |= self.call(callback, set())
+        self.fire(updated, 1)
+        self.metrics.record('page_load', time.perf_counter() - start)
+
+    def step(self, step, think_scale=1.0):
+        changed = set()
+        for key, value in step.get('set', {}).items():
+            component_id, prop = key.rsplit('.', 1)
+            self.state.setdefault(component_id, {})[prop] = value
+            changed.add((component_id, prop))
+        start = time.perf_counter()
+        self.fire(changed)
+        self.metrics.record('interaction', time.perf_counter() - start)
+        time.sleep(step.get('think', 0) * think_scale)
+
+
+def generate_sessions(app, sessions, steps, think, seed=None):
+    rng = random.Random(seed)
+    actions = [(cid, prop, app.options(cid)) for cid, prop in SESSION_ACTIONS if app.options(cid)]
+    generated = []
+    for _ in range(sessions):
+        session = []
+        for _ in range(steps):
+            component_id, prop, values = rng.choice(actions)
+            session.append({'set': {f"{component_id}.{prop}": rng.choice(values)},
+                            'think': round(rng.expovariate(1 / think), 3) if think else 0})
+        generated.append(session)
+    return generated
+
+
+def run(app, sessions, users, think_scale=1.0):
+    metrics = RunMetrics()
+
+    def replay(steps):
+        session = Session(app, metrics)
+        session.load()
+        for step in steps:
+            session.step(step, think_scale)
+
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(replay, sessions))
+    return metrics
+
+
+def build_report(metrics, users, sessions):
+    elapsed = metrics.elapsed()
+    callbacks = {}
+    total_requests = total_errors = 0
+    for name, durations in metrics.timings.items():
+        if name in ('page_load', 'interaction'):
+            continue
+        requests = metrics.counters.get(f"{name}|requests", 0)
+        errors = metrics.counters.get(f"{name}|errors", 0)
+        total_requests += requests
+        total_errors += errors
+        callbacks[name] = {**summarize(durations, elapsed), 'errors': errors,
+                           'error_rate': round(errors / requests, 4) if requests else 0.0}
+    return {
+        'users': users,
+        'sessions': sessions,
+        'elapsed_s': round(elapsed, 3),
+        'requests': total_requests,
+        'requests_per_sec': round(total_requests / elapsed, 3) if elapsed else None,
+        'error_rate': round(total_errors / total_requests, 4) if total_requests else 0.0,
+        'page_load': summarize(metrics.timings.get('page_load', [])),
+        'interaction': summarize(metrics.timings.get('interaction', [])),
+        'callbacks': callbacks,
+    }
+
+
+def print_report(report):
+    print(f"👥 {report['users']} users, {report['sessions']} sessions in {report['elapsed_s']}s - "
+          f"{report['requests']} requests ({report['requests_per_sec']}/s), "
+          f"error rate {report['error_rate']:.2%}")
+    print(f"{'callback':<60} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    rows = [('page_load', report['page_load'], 0), ('interaction', report['interaction'], 0)]
+    rows += [(name, stats, stats['errors']) for name, stats in
+             sorted(report['callbacks'].items(), key=lambda item: -(item[1]['p95_ms'] or 0))]
+    for name, stats, errors in rows:
+        label = name if len(name) <= 60 else name[:57] + '...'
+        print(f"{label:<60} {stats['count']:>7} {stats['p50_ms'] or 0:>9.1f} "
+              f"{stats['p95_ms'] or 0:>9.1f} {stats['p99_ms'] or 0:>9.1f} {errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay dashboard sessions against a running extra_dash")
+    parser.add_argument('--url', default='http://127.0.0.1:8050', help="base URL of the running app")
+    parser.add_argument('--users', type=int, default=10, help="concurrent virtual users")
+    parser.add_argument('--trace', help="replay sessions from this JSON trace")
+    parser.add_argument('--sessions', type=int, default=50, help="sessions to generate (without --trace)")
+    parser.add_argument('--steps', type=int, default=8, help="interactions per generated session")
+    parser.add_argument('--think', type=float, default=1.0, help="mean think time between steps (s)")
+    parser.add_argument('--think-scale', type=float, default=1.0, help="0 = no think time (max load)")
+    parser.add_argument('--seed', type=int, help="random seed for generated sessions")
+    parser.add_argument('--save-trace', help="write the generated sessions for later replays")
+    parser.add_argument('--out', help="write the report as JSON")
+    args = parser.parse_args()
+
+    app = DashApp(args.url)
+    if args.trace:
+        with open(args.trace, encoding='utf-8') as f:
+            sessions = json.load(f)['sessions']
+    else:
+        sessions = generate_sessions(app, args.sessions, args.steps, args.think, args.seed)
+        if args.save_trace:
+            with open(args.save_trace, 'w', encoding='utf-8') as f:
+                json.dump({'sessions': sessions}, f, ensure_ascii=False, indent=2)
+            print(f"💾 Saved {len(sessions)} sessions to {args.save_trace}")
+
+    metrics = run(app, sessions, args.users, args.think_scale)
+    report = build_report(metrics, args.users, len(sessions))
+    print_report(report)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 Saved report to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
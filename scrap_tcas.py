@@ -4,36 +4,279 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from bs4 import BeautifulSoup
 import time
+import os
 import re
 import csv
 import urllib.parse
 import logging
+import argparse
+import functools
+import socket
+from collections import deque
+from tcas_frontier import CrawlFrontier, RESULTS_PAGE, PROGRAM_PAGE
+from tcas_metrics import RunMetrics
+from tcas_queue import CrawlQueue, SEARCH_TASK
+from tcas_codes import ProgramCodeLookup, CODE_TABLE
+
+try:
+    import psutil  # ไม่บังคับ - ใช้วัดหน่วยความจำของ Chrome
+except ImportError:
+    psutil = None
+
+try:
+    import fcntl  # ไม่มีบน Windows - ใช้จอง slot ของโปรไฟล์ Chrome
+except ImportError:
+    fcntl = None
 
 # ตั้งค่า logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# ตั้งค่า Chrome options
-chrome_options = Options()
-chrome_options.add_argument("--no-sandbox")
-chrome_options.add_argument("--disable-dev-shm-usage")
-chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-chrome_options.add_experimental_option('useAutomationExtension', False)
-# chrome_options.add_argument("--headless")  # เปิดถ้าต้องการไม่ให้เปิด browser
+# เวลาแยกตามขั้นตอน (navigation, รอโหลด, sleep, parse, ...) และตัวนับของการ crawl รอบนี้
+# จบการ crawl -> เขียนรายงาน JSON ที่ TCAS_RUN_REPORT (pages/sec, p50/p95/p99 ต่อขั้นตอน)
+metrics = RunMetrics()
+RUN_REPORT = os.environ.get('TCAS_RUN_REPORT', 'crawl_report.json')
+
+# มหาวิทยาลัยจากรหัสหลักสูตรใน URL (ตารางจากการ crawl รอบก่อน) - อ่าน DOM เฉพาะรหัสที่ไม่รู้จัก
+code_lookup = ProgramCodeLookup.load()
+
+def pause(seconds):
+    with metrics.stage('sleep'):
+        time.sleep(seconds)
+
+def navigate(driver, url):
+    with metrics.stage('navigation'):
+        driver.get(url)
+
+def parse_page(driver):
+    with metrics.stage('parse'):
+        return BeautifulSoup(driver.page_source, "html.parser")
+
+# โปรไฟล์ Chrome แบบประหยัด - เราอ่านแค่ข้อความจาก DOM จึงไม่ต้องโหลดรูป ฟอนต์ วิดีโอ หรือ tracker
+#   TCAS_HEADLESS=0             -> เปิดหน้าต่าง browser ให้เห็น (ค่าเริ่มต้นคือ headless)
+#   TCAS_LEAN_PROFILE=0         -> โหลดทุกอย่างตามปกติ (ใช้ตอนตรวจหน้าเว็บด้วยตา)
+#   TCAS_CHROME_PROFILE_DIR=... -> โฟลเดอร์แม่ของ user-data ที่ใช้ซ้ำข้ามรอบ (เก็บ cache ของ JS/CSS)
+#                                  Chrome ล็อก user-data-dir ไว้ตัวเดียว จึงแยกโฟลเดอร์ย่อยต่อ slot
+#                                  (<host>-0, <host>-1, ... ตามจำนวน worker ที่รันพร้อมกันบนเครื่อง)
+HEADLESS = os.environ.get('TCAS_HEADLESS', '1') == '1'
+LEAN_PROFILE = os.environ.get('TCAS_LEAN_PROFILE', '1') == '1'
+CHROME_PROFILE_DIR = os.environ.get('TCAS_CHROME_PROFILE_DIR', '.chrome_profile')
+
+# CSS ไม่ถูกบล็อก - find_search_box ใช้ is_displayed() ซึ่งขึ้นกับ stylesheet ของหน้า
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.bmp',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*facebook.net*', '*facebook.com/tr*', '*hotjar.com*',
+]
+
+MAX_PROFILE_SLOTS = 64
+profile_locks = []
+
+def profile_path(name):
+    if not CHROME_PROFILE_DIR:
+        return None
+    return os.path.join(os.path.abspath(CHROME_PROFILE_DIR), re.sub(r'[^\w.-]', '_', name))
+
+@functools.lru_cache(maxsize=None)
+def claim_profile(prefix=None):
+    # slot แรก <prefix>-<n> ที่ไม่มีโปรเซสอื่นถือ lock อยู่ - worker ที่รันใหม่ได้โฟลเดอร์ (และ cache) เดิม
+    # และจำนวนโฟลเดอร์ไม่เกินจำนวน worker ที่เคยรันพร้อมกัน; lock ถือไว้จนโปรเซสจบ (OS ปล่อยเองแม้ crash)
+    prefix = prefix or socket.gethostname()
+    if not CHROME_PROFILE_DIR:
+        return None
+    if fcntl is None:
+        # ไม่มี file lock -> โฟลเดอร์ต่อโปรเซส (ไม่ได้ใช้ซ้ำข้ามรอบ)
+        return profile_path(f"{prefix}-pid-{os.getpid()}")
+    os.makedirs(CHROME_PROFILE_DIR, exist_ok=True)
+    for slot in range(MAX_PROFILE_SLOTS):
+        path = profile_path(f"{prefix}-{slot}")
+        lock = open(f"{path}.lock", 'w')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            continue
+        profile_locks.append(lock)
+        return path
+    raise RuntimeError(f"No free Chrome profile slot for {prefix} in {CHROME_PROFILE_DIR}")
+
+def build_chrome_options(headless=HEADLESS, lean=LEAN_PROFILE, profile_dir=None):
+    profile_dir = profile_dir or claim_profile()
+    chrome_options = Options()
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    if headless:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1366,900")
+    if profile_dir:
+        chrome_options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+    if lean:
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--mute-audio")
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_argument("--disable-renderer-backgrounding")
+        chrome_options.add_argument("--disable-features=Translate,MediaRouter,OptimizationHints")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+        # ไม่รอรูป/ฟอนต์ - wait_for_page_load ยังรอ readyState == complete อยู่
+        chrome_options.page_load_strategy = 'eager'
+    return chrome_options
+
+def create_driver(headless=HEADLESS, lean=LEAN_PROFILE, profile_dir=None):
+    new_driver = webdriver.Chrome(options=build_chrome_options(headless, lean, profile_dir))
+    new_driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    if lean:
+        try:
+            new_driver.execute_cdp_cmd("Network.enable", {})
+            new_driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            logger.warning(f"⚠️ Could not enable request blocking: {e}")
+    return new_driver
+
+# วงจรชีวิตของ driver: Chrome ใช้หน่วยความจำเพิ่มขึ้นเรื่อย ๆ และแท็บที่ค้างจะหยุดทั้ง crawl
+# DriverManager จำกัดเวลาโหลดหน้า, วัด RSS และอัตราความผิดพลาด แล้วเปลี่ยน driver ใหม่เมื่อ
+# ครบจำนวนหน้า/ใช้หน่วยความจำเกิน/ผิดพลาดถี่/ค้าง และลอง URL ที่ล้มเหลวซ้ำบน driver ใหม่
+PAGE_LOAD_TIMEOUT = int(os.environ.get('TCAS_PAGE_LOAD_TIMEOUT', '30'))
+MAX_PAGES_PER_DRIVER = int(os.environ.get('TCAS_MAX_PAGES_PER_DRIVER', '150'))
+MAX_DRIVER_RSS_MB = int(os.environ.get('TCAS_MAX_DRIVER_RSS_MB', '1500'))
+ERROR_WINDOW = 20
+MAX_ERROR_RATE = 0.5
+MAX_RETRIES = 2
+
+# worker ที่ทำงานจากคิว: ต่ออายุ lease ทุกรอบของการเลื่อนหน้าและทุกครั้งที่ลองซ้ำ
+# (main_worker ตั้ง lease_heartbeat = queue.renew ของงานปัจจุบัน) - lease หลุด -> หยุดงานนั้นทันที
+# เพราะ worker อื่นรับงานต่อไปแล้ว และผลของเราจะถูกทิ้งตอน complete อยู่ดี
+lease_heartbeat = None
+
+class LeaseLost(Exception):
+    pass
+
+def renew_lease():
+    if lease_heartbeat is not None and not lease_heartbeat():
+        raise LeaseLost("lease lost")
+
+class DriverManager:
+    def __init__(self, factory=create_driver, page_load_timeout=PAGE_LOAD_TIMEOUT,
+                 max_pages=MAX_PAGES_PER_DRIVER, max_rss_mb=MAX_DRIVER_RSS_MB,
+                 error_window=ERROR_WINDOW, max_error_rate=MAX_ERROR_RATE, max_retries=MAX_RETRIES):
+        self.factory = factory
+        self.page_load_timeout = page_load_timeout
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.max_error_rate = max_error_rate
+        self.max_retries = max_retries
+        self.outcomes = deque(maxlen=error_window)
+        self.pages = 0
+        self.recycles = 0
+        self._driver = None
 
-driver = webdriver.Chrome(options=chrome_options)
-driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-wait = WebDriverWait(driver, 20)
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._driver = self.factory()
+            self._driver.set_page_load_timeout(self.page_load_timeout)
+            self._driver.set_script_timeout(self.page_load_timeout)
+            # หน้าต่างผลลัพธ์ไม่ล้างตรงนี้ - driver error ที่ recycle ทุกครั้งยังนับรวมในอัตราผิดพลาด
+            self.pages = 0
+        return self._driver
+
+    def quit(self):
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception as e:
+                logger.warning(f"⚠️ Error while closing driver: {e}")
+            self._driver = None
+
+    def recycle(self, reason):
+        logger.info(f"♻️ Recycling driver after {self.pages} pages: {reason}")
+        self.quit()
+        self.recycles += 1
+
+    def rss_mb(self):
+        # RSS ของ chromedriver + Chrome ทุกโปรเซสลูก (ต้องมี psutil)
+        if psutil is None or self._driver is None:
+            return None
+        try:
+            root = psutil.Process(self._driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes if p.is_running()) / (1024 * 1024)
+        except Exception:
+            return None
+
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def check_health(self):
+        if self.pages >= self.max_pages:
+            self.recycle(f"page limit {self.max_pages}")
+            return
+        rss = self.rss_mb()
+        if rss is not None and rss > self.max_rss_mb:
+            self.recycle(f"RSS {rss:.0f} MB > {self.max_rss_mb} MB")
+            return
+        if len(self.outcomes) == self.outcomes.maxlen and self.error_rate() > self.max_error_rate:
+            self.recycle(f"error rate {self.error_rate():.0%}")
+            self.outcomes.clear()
+
+    def record(self, ok):
+        self.pages += 1
+        self.outcomes.append(ok)
+
+    def run(self, func, *args):
+        # func(driver, *args) - driver ค้างหรือพัง -> ทิ้ง driver แล้วลองใหม่บน driver ใหม่
+        for attempt in range(self.max_retries + 1):
+            renew_lease()
+            driver = self.driver
+            try:
+                result = func(driver, *args)
+            except LeaseLost:
+                raise
+            except (TimeoutException, WebDriverException) as e:
+                self.record(False)
+                logger.warning(f"⏱️ Driver failure (attempt {attempt + 1}/{self.max_retries + 1}): "
+                               f"{str(e).splitlines()[0] if str(e) else type(e).__name__}")
+                self.recycle("timeout" if isinstance(e, TimeoutException) else "driver error")
+                if attempt == self.max_retries:
+                    raise
+                continue
+            except Exception:
+                # หน้าเสีย/parse ไม่ได้ - ไม่ลองซ้ำ แต่นับเป็นความผิดพลาดของ driver นี้
+                self.record(False)
+                self.check_health()
+                raise
+            self.record(True)
+            self.check_health()
+            return result
+
+BASE_URL = "https://course.mytcas.com/"
+# ผลการค้นหาที่โหลดเพิ่มเมื่อเลื่อนลง (infinite scroll) หรือกดปุ่มโหลดเพิ่ม
+MAX_SCROLL_ROUNDS = 30
+SCROLL_PAUSE = 1.5
+LOAD_MORE_TEXTS = ['โหลดเพิ่ม', 'ดูเพิ่มเติม', 'แสดงเพิ่มเติม', 'Load more', 'Show more']
+NEXT_PAGE_TEXTS = ['ถัดไป', 'หน้าถัดไป', 'Next', '›', '»']
 
 def wait_for_page_load(driver, timeout=10):
     try:
-        WebDriverWait(driver, timeout).until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
-        )
-        time.sleep(3)
+        with metrics.stage('wait_for_page_load'):
+            WebDriverWait(driver, timeout).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+        pause(3)
         return True
     except Exception as e:
         logger.error(f"❌ Error while waiting for page load: {e}")
@@ -64,8 +307,48 @@ def make_absolute_url(url, base_url):
         return url
     return urllib.parse.urljoin(base_url, url)
 
-def extract_course_info(driver):
-    soup = BeautifulSoup(driver.page_source, "html.parser")
+def click_load_more(driver):
+    for text in LOAD_MORE_TEXTS:
+        try:
+            buttons = driver.find_elements(
+                By.XPATH, f"//button[contains(normalize-space(.), '{text}')] | //a[not(@href)][contains(normalize-space(.), '{text}')]")
+            for button in buttons:
+                if button.is_displayed() and button.is_enabled():
+                    driver.execute_script("arguments[0].click();", button)
+                    return True
+        except:
+            continue
+    return False
+
+@metrics.timed('scroll_to_end')
+def scroll_to_end(driver, max_rounds=MAX_SCROLL_ROUNDS, scroll_pause=SCROLL_PAUSE):
+    # เลื่อนลง/กดโหลดเพิ่มจนจำนวนลิงก์บนหน้าไม่เพิ่มอีก
+    last_count = -1
+    for _ in range(max_rounds):
+        renew_lease()
+        count = driver.execute_script("return document.querySelectorAll('a[href]').length")
+        if count == last_count:
+            break
+        last_count = count
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        click_load_more(driver)
+        pause(scroll_pause)
+    return last_count
+
+def extract_pagination_links(soup, base_url):
+    pages = []
+    candidates = soup.select('a[rel~="next"], [class*="pagination"] a[href], [class*="pager"] a[href]')
+    candidates += [a for a in soup.find_all('a', href=True) if a.get_text(strip=True) in NEXT_PAGE_TEXTS]
+    for link in candidates:
+        href = link.get('href', '')
+        if not href or href.startswith('#') or href.startswith('javascript:'):
+            continue
+        pages.append(make_absolute_url(href, base_url))
+    return list(dict.fromkeys(pages))
+
+def extract_course_info(driver, soup=None):
+    if soup is None:
+        soup = parse_page(driver)
     course_links = []
     links = soup.find_all("a", href=True)
     for link in links:
@@ -78,8 +361,13 @@ def extract_course_info(driver):
             })
     return course_links
 
-def extract_university_name(soup):
+UNIVERSITY_LINK = 'university_link'
+
+@metrics.timed('extract_university_name')
+def extract_university(soup):
+    # คืนค่า (ชื่อ, วิธีที่ใช้) - วิธีที่ 2-4 เป็นการเดา จึงไม่นำไปเรียนรู้รหัสมหาวิทยาลัย
     university_name = ""
+    strategy = None
 
     # วิธีที่ 1: ลิงก์ /universities/
     try:
@@ -88,6 +376,7 @@ def extract_university_name(soup):
             text = link.get_text(strip=True)
             if any(k in text for k in ['มหาวิทยาลัย', 'วิทยาลัย', 'สถาบัน', 'University', 'College']):
                 university_name = text
+                strategy = UNIVERSITY_LINK
                 break
     except:
         pass
@@ -107,6 +396,7 @@ def extract_university_name(soup):
                     if any(k in text for k in ['มหาวิทยาลัย', 'วิทยาลัย', 'สถาบัน', 'University', 'College']):
                         if not any(c in text for c in ['วิศวกรรม', 'Engineering', 'หลักสูตร']):
                             university_name = text
+                            strategy = 'selector'
                             break
                 if university_name:
                     break
@@ -123,6 +413,7 @@ def extract_university_name(soup):
                     text = link.get_text(strip=True)
                     if any(k in text for k in ['มหาวิทยาลัย', 'วิทยาลัย', 'สถาบัน']):
                         university_name = text
+                        strategy = 'breadcrumb'
                         break
                 if university_name:
                     break
@@ -144,18 +435,31 @@ def extract_university_name(soup):
                 matches = re.findall(pattern, text)
                 if matches:
                     university_name = min(matches, key=len).strip()
+                    strategy = 'regex'
                     break
         except:
             pass
 
-    return university_name
+    metrics.count(f"university_strategy.{strategy or 'not_found'}")
+    return university_name, strategy
+
+def extract_university_name(soup):
+    return extract_university(soup)[0]
 
-def extract_detail_from_course(url):
-    driver.get(url)
+@metrics.timed('extract_detail_from_course')
+def extract_detail_from_course(driver, url):
+    navigate(driver, url)
     wait_for_page_load(driver)
-    soup = BeautifulSoup(driver.page_source, "html.parser")
+    soup = parse_page(driver)
 
-    university = extract_university_name(soup)
+    university = code_lookup.university(url)
+    if university:
+        metrics.count('university_strategy.program_code')
+    else:
+        university, strategy = extract_university(soup)
+        # บันทึกลงตารางเฉพาะชื่อจากลิงก์ /universities/ - ชื่อที่เดาผิดจะติดไปทุกหลักสูตรของรหัสนั้น
+        if strategy == UNIVERSITY_LINK:
+            code_lookup.learn(url, university)
 
     # ชื่อหลักสูตร
     course_name = ""
@@ -196,9 +500,33 @@ def extract_detail_from_course(url):
         'ชื่อหลักสูตรภาษาอังกฤษ': course_name_eng
     }
 
-def search_and_extract(driver, keyword):
+def collect_results(driver, frontier=None):
+    # หน้าผลการค้นหาปัจจุบัน (โหลดครบแล้ว) -> ลิงก์หลักสูตร + หน้าถัดไป เข้า frontier
+    soup = parse_page(driver)
+    course_links = extract_course_info(driver, soup)
+    if frontier is not None:
+        frontier.mark_seen(driver.current_url)
+        new_programs = sum(
+            frontier.push(make_absolute_url(course['url'], driver.current_url), PROGRAM_PAGE)
+            for course in course_links)
+        new_pages = sum(
+            frontier.push(page, RESULTS_PAGE)
+            for page in extract_pagination_links(soup, driver.current_url))
+        logger.info(f"🧭 Frontier: +{new_programs} programs, +{new_pages} result pages "
+                    f"({len(frontier)} queued)")
+    return course_links
+
+@metrics.timed('visit_results_page')
+def visit_results_page(driver, url, frontier):
+    navigate(driver, url)
+    wait_for_page_load(driver)
+    scroll_to_end(driver)
+    return collect_results(driver, frontier)
+
+@metrics.timed('search_and_extract')
+def search_and_extract(driver, keyword, frontier=None):
     logger.info(f"\n🔍 Searching: {keyword}")
-    driver.get("https://course.mytcas.com/")
+    navigate(driver, BASE_URL)
     wait_for_page_load(driver)
 
     search_box = find_search_box(driver)
@@ -211,42 +539,178 @@ def search_and_extract(driver, keyword):
     search_box.send_keys(Keys.RETURN)
 
     wait_for_page_load(driver)
-    time.sleep(3)
-    return extract_course_info(driver)
+    pause(3)
+    scroll_to_end(driver)
+    return collect_results(driver, frontier)
 
-def main():
-    keywords = ["วิศวกรรมคอมพิวเตอร์", "วิศวกรรมปัญญาประดิษฐ์"]
+KEYWORDS = ["วิศวกรรมคอมพิวเตอร์", "วิศวกรรมปัญญาประดิษฐ์"]
+OUTPUT_FIELDS = ['url', 'มหาวิทยาลัย', 'ค่าใช้จ่าย', 'ชื่อหลักสูตร', 'ชื่อหลักสูตรภาษาอังกฤษ']
+QUEUE_PATH = os.environ.get('TCAS_QUEUE', 'crawl_queue.db')
+QUEUE_POLL_SECONDS = 10
+
+def write_csv(rows, path="perfect.csv"):
+    if rows:
+        with open(path, "w", newline='', encoding="utf-8-sig") as f:
+            writer = csv.DictWriter(f, fieldnames=OUTPUT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        logger.info(f"💾 Data saved to {path}")
+    else:
+        logger.warning("⚠️ No course data found")
+
+def write_run_report(manager, programs, **extra):
+    pages = len(metrics.timings.get('navigation', []))
+    pages_per_sec = pages / metrics.elapsed() if metrics.elapsed() > 0 else 0.0
+    metrics.write_report(RUN_REPORT, pages=pages, pages_per_sec=round(pages_per_sec, 3),
+                         programs=programs, driver_recycles=manager.recycles, **extra)
+    logger.info(f"📊 {pages} pages in {metrics.elapsed():.0f}s ({pages_per_sec:.2f} pages/s) "
+                f"- report saved to {RUN_REPORT}")
+
+def save_code_lookup():
+    # worker หลายตัวเขียนไฟล์เดียวกันได้ (ตัวสุดท้ายชนะ) - เป็นแค่ cache รหัสที่หายไปจะถูกเรียนรู้ใหม่รอบหน้า
+    if code_lookup.learned:
+        code_lookup.save(CODE_TABLE)
+        logger.info(f"🏷️ Learned {code_lookup.learned} new university codes -> {CODE_TABLE}")
+
+def extract_program(manager, absolute_url):
+    detailed_info = manager.run(extract_detail_from_course, absolute_url)
+    detailed_info['url'] = absolute_url
+    logger.info(f"✅ Extracted course: {detailed_info['ชื่อหลักสูตร']}")
+
+    # 👉 แจ้งเตือนเมื่อเจอมหาวิทยาลัยที่ขึ้นต้นด้วย "สถาบัน" (แต่ไม่หยุด)
+    if detailed_info['มหาวิทยาลัย'].strip().startswith("สถาบัน"):
+        logger.info(f"🛑 พบมหาวิทยาลัยขึ้นต้นด้วย 'สถาบัน': {detailed_info['มหาวิทยาลัย']}")
+    return detailed_info
+
+def main_local(keywords=KEYWORDS):
     all_course_data = []
+    manager = DriverManager(factory=functools.partial(create_driver, profile_dir=claim_profile('local')))
 
+    # หน้าแรกของแต่ละคำค้นมาจากช่องค้นหา หน้าถัดไปและหลักสูตรทั้งหมดมาจาก frontier
+    # (หลักสูตรที่พบจากหลายคำค้น/หลายหน้าจะถูกดึงครั้งเดียว)
+    frontier = CrawlFrontier()
     for keyword in keywords:
-        course_links = search_and_extract(driver, keyword)
-        for course in course_links:
-            absolute_url = make_absolute_url(course['url'], "https://course.mytcas.com/")
+        try:
+            manager.run(search_and_extract, keyword, frontier)
+            metrics.count('searches_ok')
+        except Exception as e:
+            metrics.count('searches_failed')
+            logger.warning(f"❌ Search failed for {keyword}: {e}")
+
+    while frontier:
+        absolute_url, kind = frontier.pop()
+        if kind == RESULTS_PAGE:
             try:
-                detailed_info = extract_detail_from_course(absolute_url)
-                detailed_info['url'] = absolute_url
-                all_course_data.append(detailed_info)
-                logger.info(f"✅ Extracted course: {detailed_info['ชื่อหลักสูตร']}")
+                manager.run(visit_results_page, absolute_url, frontier)
+                metrics.count('results_pages_ok')
+            except Exception as e:
+                metrics.count('results_pages_failed')
+                logger.warning(f"❌ Failed to read results page {absolute_url}: {e}")
+            continue
 
-                # 👉 แจ้งเตือนเมื่อเจอมหาวิทยาลัยที่ขึ้นต้นด้วย "สถาบัน" (แต่ไม่หยุด)
-                if detailed_info['มหาวิทยาลัย'].strip().startswith("สถาบัน"):
-                    logger.info(f"🛑 พบมหาวิทยาลัยขึ้นต้นด้วย 'สถาบัน': {detailed_info['มหาวิทยาลัย']}")
+        try:
+            all_course_data.append(extract_program(manager, absolute_url))
+            metrics.count('programs_ok')
+        except Exception as e:
+            metrics.count('programs_failed')
+            logger.warning(f"❌ Failed to extract from {absolute_url}: {e}")
+        pause(2)
 
-            except Exception as e:
-                logger.warning(f"❌ Failed to extract from {absolute_url}: {e}")
-            time.sleep(2)
+    write_csv(all_course_data)
+    save_code_lookup()
 
-    # เขียนลง CSV
-    if all_course_data:
-        with open("perfect.csv", "w", newline='', encoding="utf-8-sig") as f:
-            writer = csv.DictWriter(f, fieldnames=['url', 'มหาวิทยาลัย', 'ค่าใช้จ่าย', 'ชื่อหลักสูตร', 'ชื่อหลักสูตรภาษาอังกฤษ'])
-            writer.writeheader()
-            writer.writerows(all_course_data)
-        logger.info("💾 Data saved to perfect.csv")
-    else:
-        logger.warning("⚠️ No course data found")
+    logger.info(f"♻️ Drivers recycled: {manager.recycles}")
+    manager.quit()
+
+    # รายงานผลการ crawl
+    write_run_report(manager, len(all_course_data))
+
+# crawl แบบกระจายหลายเครื่อง ผ่านคิวร่วม (tcas_queue.CrawlQueue)
+#   python scrap_tcas.py seed   --queue crawl_queue.db   -> ใส่คำค้นเข้าคิว (ไม่ต้องเปิด Chrome)
+#   python scrap_tcas.py worker --queue crawl_queue.db   -> รันกี่โปรเซส/กี่เครื่องก็ได้
+#   python scrap_tcas.py export --queue crawl_queue.db   -> เขียนผลทั้งหมดเป็น perfect.csv
+# worker ใช้คิวแทน frontier: ลิงก์หลักสูตร/หน้าถัดไปที่พบจะเข้าคิวร่วมให้ worker อื่นหยิบไปทำ
+def main_seed(queue, keywords=KEYWORDS):
+    added = sum(queue.push(keyword, SEARCH_TASK) for keyword in keywords)
+    logger.info(f"🌱 Seeded {added} searches ({queue.remaining()} tasks queued)")
+
+def main_worker(queue, worker_id=None):
+    global lease_heartbeat
+    # โปรไฟล์ตาม slot ของเครื่อง (หรือของ --worker-id) ไม่ใช่ pid - รันใหม่ได้ cache เดิม
+    profile_dir = claim_profile(worker_id)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    manager = DriverManager(factory=functools.partial(create_driver, profile_dir=profile_dir))
+    programs = 0
+    logger.info(f"👷 Worker {worker_id} started")
+
+    while True:
+        tasks = queue.lease(worker_id)
+        if not tasks:
+            # ไม่มีงานพร้อม: จบเมื่อคิวว่างจริง ไม่ใช่แค่งานที่เหลือถูก worker อื่นถืออยู่/รอ backoff
+            if queue.remaining() == 0:
+                break
+            time.sleep(QUEUE_POLL_SECONDS)
+            continue
+
+        url, kind = tasks[0]
+        lease_heartbeat = functools.partial(queue.renew, worker_id, url)
+        try:
+            if kind == SEARCH_TASK:
+                manager.run(search_and_extract, url, queue)
+                committed = queue.complete(worker_id, url)
+            elif kind == RESULTS_PAGE:
+                manager.run(visit_results_page, url, queue)
+                committed = queue.complete(worker_id, url)
+            else:
+                committed = queue.complete(worker_id, url, extract_program(manager, url))
+                programs += committed
+                pause(2)
+            metrics.count(f"{kind}_ok" if committed else f"{kind}_lease_lost")
+        except LeaseLost:
+            metrics.count(f"{kind}_lease_lost")
+            logger.warning(f"⌛ Lease lost ({kind}) {url} - another worker has it now")
+        except Exception as e:
+            status = queue.fail(worker_id, url, e)
+            metrics.count(f"{kind}_failed")
+            logger.warning(f"❌ Task failed ({kind}) {url}: {e} -> {status}")
+        finally:
+            lease_heartbeat = None
+
+    logger.info(f"🏁 Queue drained - {programs} programs committed by {worker_id}")
+    save_code_lookup()
+    manager.quit()
+    write_run_report(manager, programs, worker=worker_id, queue=queue.stats())
 
-    driver.quit()
+def main_export(queue, path="perfect.csv"):
+    logger.info(f"📦 Queue: {queue.stats()}")
+    write_csv(list(queue.results()), path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl engineering programs from course.mytcas.com")
+    parser.add_argument('role', nargs='?', default='local',
+                        choices=['local', 'seed', 'worker', 'export'],
+                        help="local = single process (default); seed/worker/export use the shared queue")
+    parser.add_argument('--queue', default=QUEUE_PATH, help="shared queue database (TCAS_QUEUE)")
+    parser.add_argument('--keyword', action='append', help="search keyword (repeatable)")
+    parser.add_argument('--worker-id', help="defaults to <hostname>-<pid>")
+    parser.add_argument('--out', default="perfect.csv", help="CSV written by export")
+    args = parser.parse_args()
+    keywords = args.keyword or KEYWORDS
+
+    if args.role == 'local':
+        main_local(keywords)
+        return
+
+    queue = CrawlQueue(args.queue)
+    try:
+        if args.role == 'seed':
+            main_seed(queue, keywords)
+        elif args.role == 'worker':
+            main_worker(queue, args.worker_id)
+        else:
+            main_export(queue, args.out)
+    finally:
+        queue.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import wraps
+
+from plotly.basedatatypes import BaseFigure
+
+# แคชผลลัพธ์ของ callback ที่ใช้ร่วมกันได้หลาย worker
+#   TCAS_CACHE_BACKEND=lru    -> แคชในโปรเซส (ค่าเริ่มต้น)
+#   TCAS_CACHE_BACKEND=disk   -> ไฟล์ sqlite ใน TCAS_CACHE_DIR ใช้ร่วมกันทุก worker บนเครื่องเดียวกัน
+#   TCAS_CACHE_BACKEND=redis  -> Redis (หรือเซิร์ฟเวอร์ที่ใช้ protocol เดียวกัน) ที่ TCAS_REDIS_URL
+# key ทุกตัวมีเวอร์ชันของข้อมูลอยู่ด้วย worker แรกที่คำนวณจึงอุ่นแคชให้ worker อื่นทั้งหมด
+
+MISSING = object()
+
+
+class Uncached:
+    # ผลที่ไม่ควรเก็บในแคช (เช่นกราฟแจ้ง error ชั่วคราว) - memoize คืน value แต่ไม่ set
+    def __init__(self, value):
+        self.value = value
+
+
+def uncached(value):
+    return Uncached(value)
+
+
+def dataset_version(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def make_key(name, version, args, kwargs):
+    arg_digest = hashlib.sha1(
+        repr((args, sorted(kwargs.items()))).encode('utf-8')).hexdigest()
+    return f"tcas:{name}:{version}:{arg_digest}"
+
+
+class CacheBackend(ABC):
+    # backend ต้องมี get (คืน MISSING เมื่อไม่พบ) และ set - memoize ใช้ร่วมกันทุก backend
+    @abstractmethod
+    def get(self, key):
+        pass
+
+    @abstractmethod
+    def set(self, key, value):
+        pass
+
+    def memoize(self, name, version):
+        # version: ค่าคงที่ หรือฟังก์ชันที่คืนเวอร์ชันปัจจุบัน (ข้อมูลเปลี่ยนระหว่างรันได้)
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                current = version() if callable(version) else version
+                key = make_key(name, current, args, kwargs)
+                value = self.get(key)
+                if value is MISSING:
+                    value = func(*args, **kwargs)
+                    if isinstance(value, Uncached):
+                        return value.value
+                    # เก็บ figure เป็น dict ธรรมดา - โหลดกลับไม่ต้องผ่าน validation ของ plotly อีก
+                    if isinstance(value, BaseFigure):
+                        value = value.to_plotly_json()
+                    self.set(key, value)
+                return value
+            wrapper.cache = self
+            return wrapper
+        return decorator
+
+
+class LRUCache(CacheBackend):
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return MISSING
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class DiskCache(CacheBackend):
+    def __init__(self, directory, maxsize=4096):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'tcas_cache.sqlite')
+        self.maxsize = maxsize
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB, created REAL)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return MISSING
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created) VALUES (?, ?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), time.time()))
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                "ORDER BY created DESC LIMIT -1 OFFSET ?)", (self.maxsize,))
+
+
+class RedisCache(CacheBackend):
+    def __init__(self, url=None, client=None, ttl=24 * 3600):
+        # client: ส่ง client ที่ใช้ API แบบ redis-py เข้ามาแทนได้ (เช่น fakeredis สำหรับเครื่อง local)
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url or 'redis://localhost:6379/0')
+        self.client = client
+        self.ttl = ttl
+
+    def get(self, key):
+        data = self.client.get(key)
+        if data is None:
+            return MISSING
+        return pickle.loads(data)
+
+    def set(self, key, value):
+        self.client.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=self.ttl)
+
+
+def make_cache(backend=None):
+    backend = backend or os.environ.get('TCAS_CACHE_BACKEND', 'lru')
+    if backend == 'lru':
+        return LRUCache(int(os.environ.get('TCAS_CACHE_SIZE', '256')))
+    if backend == 'disk':
+        return DiskCache(os.environ.get('TCAS_CACHE_DIR', '.tcas_cache'))
+    if backend == 'redis':
+        return RedisCache(os.environ.get('TCAS_REDIS_URL'))
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,104 @@
+import argparse
+
+import pandas as pd
+
+import tcas_history
+
+# change-data-capture ระหว่างสองรอบการ crawl (ใช้ url ของหลักสูตรเป็น key)
+#   added   -> url ที่มีเฉพาะในรอบใหม่
+#   removed -> url ที่มีเฉพาะในรอบเก่า
+#   changed -> url ที่มีทั้งสองรอบแต่ค่าในคอลัมน์ใดคอลัมน์หนึ่งต่างกัน (before/after เรียงตรงกัน)
+# ค่าสรุปของ dashboard ใช้ delta นี้: ลบแถวเก่า (removed + changed before) แล้วเพิ่มแถวใหม่
+# (added + changed after) จึงใช้เวลาตามจำนวนที่เปลี่ยน ไม่ใช่ขนาดข้อมูลทั้งหมด
+#
+#   python tcas_cdc.py old.csv new.csv --out changes.json
+
+KEY_COLUMN = 'url'
+
+
+class ChangeSet:
+    def __init__(self, added, removed, changed_before, changed_after, changed_columns):
+        self.added = added
+        self.removed = removed
+        self.changed_before = changed_before
+        self.changed_after = changed_after
+        # url -> รายชื่อคอลัมน์ที่ค่าเปลี่ยน
+        self.changed_columns = changed_columns
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.changed_after)
+
+    def is_empty(self):
+        return len(self) == 0
+
+    def outgoing(self):
+        # แถวที่ต้องลบออกจากค่าสรุปเดิม
+        return pd.concat([self.removed, self.changed_before])
+
+    def incoming(self):
+        # แถวที่ต้องเพิ่มเข้าค่าสรุปใหม่
+        return pd.concat([self.added, self.changed_after])
+
+    def summary(self):
+        return {'added': len(self.added), 'removed': len(self.removed),
+                'changed': len(self.changed_after)}
+
+    def to_dict(self):
+        return {
+            'summary': self.summary(),
+            'added': self.added[KEY_COLUMN].tolist(),
+            'removed': self.removed[KEY_COLUMN].tolist(),
+            'changed': [{'url': url, 'columns': columns}
+                        for url, columns in self.changed_columns.items()],
+        }
+
+
+def diff_snapshots(old, new, columns=None):
+    # url ซ้ำในรอบเดียวกัน -> ใช้แถวแรก (เหมือนตารางค้นหาหลักสูตรใน extra_dash)
+    old = old.dropna(subset=[KEY_COLUMN]).drop_duplicates(subset=[KEY_COLUMN])
+    new = new.dropna(subset=[KEY_COLUMN]).drop_duplicates(subset=[KEY_COLUMN])
+    old_keyed = old.set_index(KEY_COLUMN, drop=False)
+    new_keyed = new.set_index(KEY_COLUMN, drop=False)
+
+    added = new[~new[KEY_COLUMN].isin(old_keyed.index)]
+    removed = old[~old[KEY_COLUMN].isin(new_keyed.index)]
+
+    shared = new_keyed.index[new_keyed.index.isin(old_keyed.index)]
+    if columns is None:
+        columns = [c for c in new.columns if c in old.columns and c != KEY_COLUMN]
+    before = old_keyed.loc[shared, columns]
+    after = new_keyed.loc[shared, columns]
+    # NaN ทั้งสองฝั่งถือว่าไม่เปลี่ยน
+    differs = (before != after) & ~(before.isna() & after.isna())
+    changed_urls = differs.index[differs.any(axis=1)]
+
+    changed_columns = {
+        url: [c for c, flag in zip(columns, row) if flag]
+        for url, row in zip(changed_urls, differs.loc[changed_urls].to_numpy().tolist())
+    }
+    changed_before = old_keyed.loc[changed_urls].reset_index(drop=True)
+    changed_after = new_keyed.loc[changed_urls].reset_index(drop=True)
+    return ChangeSet(added.reset_index(drop=True), removed.reset_index(drop=True),
+                     changed_before, changed_after, changed_columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two TCAS crawls keyed on program url")
+    parser.add_argument('old_csv')
+    parser.add_argument('new_csv')
+    parser.add_argument('--out', help="write the change set as JSON")
+    args = parser.parse_args()
+
+    old = tcas_history.clean_snapshot(pd.read_csv(args.old_csv))
+    new = tcas_history.clean_snapshot(pd.read_csv(args.new_csv))
+    changes = diff_snapshots(old, new)
+    summary = changes.summary()
+    print(f"🔄 {summary['added']} added, {summary['removed']} removed, "
+          f"{summary['changed']} changed")
+    if args.out:
+        tcas_history.write_json(args.out, changes.to_dict())
+        print(f"💾 Saved change set to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
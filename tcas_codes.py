@@ -0,0 +1,138 @@
+import argparse
+import csv
+import json
+import os
+import re
+from collections import Counter, defaultdict
+
+# รหัสหลักสูตรใน URL ของ mytcas มีโครงสร้างคงที่ เช่น /programs/10010121300501A
+#   1001   -> มหาวิทยาลัย (1001 = จุฬาฯ, 1002 = เกษตรศาสตร์, ...)
+#   01     -> วิทยาเขต (ภายในมหาวิทยาลัย)
+#   21     -> คณะ
+#   300501 -> หลักสูตร/สาขา
+#   A      -> ประเภท (A = ปกติ, E/I = นานาชาติ ฯลฯ)
+# ตาราง lookup สร้างจาก CSV ของการ crawl รอบก่อน -> ชื่อมหาวิทยาลัย/วิทยาเขตได้จาก URL โดยไม่ต้องอ่าน DOM
+# รหัสที่ไม่รู้จักจะใช้ extract_university_name ตามเดิม แล้วเรียนรู้เพิ่มเข้าตาราง
+# (เฉพาะชื่อจากลิงก์ /universities/ - ชื่อจาก selector/breadcrumb/regex เป็นการเดา ไม่บันทึก)
+#
+#   python tcas_codes.py build tcas_cleaned.csv perfect.csv --out program_codes.json
+#   python tcas_codes.py resolve https://course.mytcas.com/programs/10020105300501A
+
+CODE_TABLE = os.environ.get('TCAS_CODE_TABLE', 'program_codes.json')
+DEFAULT_SOURCES = ['tcas_cleaned.csv', 'perfect.csv']
+CODE_PATTERN = re.compile(r'/programs/(\d{4})(\d{2})(\d{2})(\d{6})([A-Z]?)')
+
+
+def parse_program_code(url):
+    match = CODE_PATTERN.search(url or '')
+    if not match:
+        return None
+    university, campus, faculty, program, track = match.groups()
+    return {
+        'university': university,
+        'campus': f"{university}-{campus}",
+        'faculty': f"{university}-{campus}-{faculty}",
+        'program': program,
+        'track': track,
+    }
+
+
+def majority(counts):
+    # รหัสเดียวกันเคยได้ชื่อต่างกัน (เช่นเว้นวรรคต่างกัน) -> ใช้ชื่อที่พบบ่อยที่สุด
+    return {code: names.most_common(1)[0][0] for code, names in counts.items()}
+
+
+class ProgramCodeLookup:
+    def __init__(self, universities=None, campuses=None):
+        self.universities = dict(universities or {})
+        self.campuses = dict(campuses or {})
+        self.learned = 0
+
+    @classmethod
+    def from_rows(cls, rows):
+        universities = defaultdict(Counter)
+        campuses = defaultdict(Counter)
+        for row in rows:
+            code = parse_program_code(row.get('url'))
+            if code is None:
+                continue
+            university = (row.get('มหาวิทยาลัย') or '').strip()
+            campus = (row.get('ชื่อวิทยาเขต') or '').strip()
+            if university:
+                universities[code['university']][university] += 1
+            if campus:
+                campuses[code['campus']][campus] += 1
+        return cls(majority(universities), majority(campuses))
+
+    @classmethod
+    def from_csv(cls, paths):
+        rows = []
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                rows.extend(csv.DictReader(f))
+        return cls.from_rows(rows)
+
+    @classmethod
+    def load(cls, path=CODE_TABLE, sources=DEFAULT_SOURCES):
+        # ไม่มีตารางที่บันทึกไว้ -> สร้างจาก CSV ของรอบก่อนที่มีอยู่
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            return cls(data.get('universities'), data.get('campuses'))
+        return cls.from_csv(sources)
+
+    def save(self, path=CODE_TABLE):
+        # เขียนไฟล์ชั่วคราวแล้ว rename - worker หลายตัวบันทึกพร้อมกันได้โดยไฟล์ไม่เสีย
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'universities': dict(sorted(self.universities.items())),
+                       'campuses': dict(sorted(self.campuses.items()))},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def university(self, url):
+        code = parse_program_code(url)
+        return self.universities.get(code['university']) if code else None
+
+    def campus(self, url):
+        code = parse_program_code(url)
+        return self.campuses.get(code['campus']) if code else None
+
+    def learn(self, url, university):
+        # ชื่อที่ได้จากลิงก์ /universities/ ของรหัสที่ยังไม่รู้จัก (ชื่อว่างไม่บันทึก)
+        code = parse_program_code(url)
+        if code is None or not university or code['university'] in self.universities:
+            return False
+        self.universities[code['university']] = university.strip()
+        self.learned += 1
+        return True
+
+    def __len__(self):
+        return len(self.universities)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Program-code lookup table for TCAS URLs")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="build the table from previous crawls")
+    build.add_argument('sources', nargs='+', help="crawl CSVs with url + มหาวิทยาลัย columns")
+    build.add_argument('--out', default=CODE_TABLE)
+    resolve = subparsers.add_parser('resolve', help="look up program URLs")
+    resolve.add_argument('urls', nargs='+')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        lookup = ProgramCodeLookup.from_csv(args.sources)
+        lookup.save(args.out)
+        print(f"💾 Saved {len(lookup.universities)} universities, "
+              f"{len(lookup.campuses)} campuses to {args.out}")
+    else:
+        lookup = ProgramCodeLookup.load()
+        for url in args.urls:
+            print(f"{url}\t{lookup.university(url) or '?'}\t{lookup.campus(url) or '?'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import hashlib
+import heapq
+import itertools
+import math
+import urllib.parse
+
+# frontier ของการ crawl: คิวลำดับความสำคัญ (heapq) ของ URL ที่ต้องเข้า + bloom filter กันเข้าซ้ำ
+#   RESULTS_PAGE -> หน้าผลการค้นหา (หน้าถัดไปจาก pagination) - ขยายก่อนเพื่อให้เห็นหลักสูตรครบเร็วที่สุด
+#   PROGRAM_PAGE -> หน้ารายละเอียดหลักสูตร - ดึงครั้งเดียวต่อการ crawl
+# bloom filter ใช้หน่วยความจำคงที่ตาม capacity ไม่ว่า URL จะยาวแค่ไหน
+# (มีโอกาสตอบว่า "เคยเห็น" ผิดเท่ากับ error_rate แต่ไม่มีทางตอบว่า "ไม่เคยเห็น" ผิด)
+
+RESULTS_PAGE = 'results'
+PROGRAM_PAGE = 'program'
+PRIORITIES = {RESULTS_PAGE: 0, PROGRAM_PAGE: 1}
+
+
+def canonical_url(url):
+    # URL เดียวกันที่เขียนต่างกัน (ตัวพิมพ์ของ host, / ท้าย path, #fragment) -> key เดียวกัน
+    parts = urllib.parse.urlsplit(url.strip())
+    path = parts.path.rstrip('/') or '/'
+    return urllib.parse.urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
+
+
+class BloomFilter:
+    def __init__(self, capacity=100000, error_rate=1e-6):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # double hashing: ตำแหน่งที่ i = h1 + i * h2
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        # คืนค่า True ถ้าเป็นรายการใหม่
+        added = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item):
+        return all(self.bits[p // 8] & (1 << (p % 8)) for p in self._positions(item))
+
+    def __len__(self):
+        return self.count
+
+
+class CrawlFrontier:
+    def __init__(self, capacity=100000, error_rate=1e-6):
+        self.seen = BloomFilter(capacity, error_rate)
+        self._heap = []
+        self._counter = itertools.count()
+
+    def mark_seen(self, url):
+        self.seen.add(canonical_url(url))
+
+    def push(self, url, kind, priority=None):
+        # URL ที่เคยเข้าคิวแล้วในการ crawl นี้จะถูกข้าม - คืนค่า True ถ้าเข้าคิวใหม่
+        url = canonical_url(url)
+        if not self.seen.add(url):
+            return False
+        priority = PRIORITIES[kind] if priority is None else priority
+        heapq.heappush(self._heap, (priority, next(self._counter), url, kind))
+        return True
+
+    def pop(self):
+        # ลำดับความสำคัญน้อยก่อน, เท่ากันแล้วมาก่อนออกก่อน (FIFO)
+        _, _, url, kind = heapq.heappop(self._heap)
+        return url, kind
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
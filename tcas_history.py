@@ -0,0 +1,200 @@
+import argparse
+import functools
+import json
+import os
+import re
+
+import pandas as pd
+
+# เก็บข้อมูลหลายรอบการ crawl แยก partition ตามปี/รอบ TCAS
+#
+#   history/year=2568/round=1/programs.csv     -> ข้อมูลหลักสูตรของรอบนั้น
+#   history/year=2568/round=1/aggregates.json  -> ค่าสรุปที่คำนวณไว้ตอนเพิ่ม partition
+#
+# เพิ่มปีใหม่ = คำนวณเฉพาะ partition ใหม่, กราฟแนวโน้มอ่านเฉพาะ aggregates.json (ไม่สแกนข้อมูลย้อนหลัง)
+#
+#   python tcas_history.py add tcas_cleaned.csv --year 2568 --round 1
+#   python tcas_history.py list
+
+HISTORY_DIR = os.environ.get('TCAS_HISTORY_DIR', 'history')
+COST_COLUMNS = ['ค่าใช้จ่ายต่อภาค', 'ค่าใช้จ่ายตลอดหลักสูตร']
+PARTITION_PATTERN = re.compile(r'^year=(\d+)$')
+ROUND_PATTERN = re.compile(r'^round=(\w+)$')
+
+
+def partition_dir(year, round_, root=HISTORY_DIR):
+    return os.path.join(root, f"year={year}", f"round={round_}")
+
+
+def partition_label(year, round_):
+    return f"{year}/{round_}"
+
+
+def clean_snapshot(frame):
+    frame = frame.copy()
+    for column in COST_COLUMNS:
+        if column in frame.columns:
+            frame[column] = pd.to_numeric(
+                frame[column].astype(str).str.replace(',', ''), errors='coerce')
+    return frame
+
+
+def compute_aggregates(frame):
+    aggregates = {'programs': int(len(frame)), 'overall': {}, 'fields': {}}
+    for column in COST_COLUMNS:
+        if column not in frame.columns:
+            continue
+        costs = frame[column].dropna()
+        aggregates['overall'][column] = {
+            'count': int(costs.count()),
+            'sum': float(costs.sum()),
+            'mean': float(costs.mean()) if len(costs) else None,
+        }
+        if 'สาขาวิชา' in frame.columns:
+            stats = frame.dropna(subset=[column, 'สาขาวิชา']).groupby(
+                'สาขาวิชา')[column].agg(['count', 'sum', 'mean'])
+            for field, row in stats.iterrows():
+                aggregates['fields'].setdefault(field, {})[column] = {
+                    'count': int(row['count']),
+                    'sum': float(row['sum']),
+                    'mean': float(row['mean']),
+                }
+    return aggregates
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def write_atomic(path, write):
+    tmp_path = path + '.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def add_snapshot(source_csv, year, round_, root=HISTORY_DIR):
+    frame = clean_snapshot(pd.read_csv(source_csv))
+    directory = partition_dir(year, round_, root)
+    os.makedirs(directory, exist_ok=True)
+
+    aggregates = compute_aggregates(frame)
+    aggregates.update({'year': int(year), 'round': str(round_), 'source': os.path.basename(source_csv)})
+
+    write_atomic(os.path.join(directory, 'programs.csv'),
+                 lambda p: frame.to_csv(p, index=False, encoding='utf-8-sig'))
+    # aggregates.json เขียนทีหลังสุด - partition ที่มีไฟล์นี้ถือว่าสมบูรณ์
+    write_atomic(os.path.join(directory, 'aggregates.json'),
+                 lambda p: write_json(p, aggregates))
+    return aggregates
+
+
+def partition_sort_key(partition):
+    # รอบที่เป็นตัวเลขเรียงตามค่า (round=2 ก่อน round=10) ชื่อรอบที่ไม่ใช่ตัวเลขอยู่ท้ายปีนั้น
+    year, round_ = partition
+    return (year, (0, int(round_), '') if round_.isdigit() else (1, 0, round_))
+
+
+def list_partitions(root=HISTORY_DIR):
+    partitions = []
+    if not os.path.isdir(root):
+        return partitions
+    for year_name in os.listdir(root):
+        year_match = PARTITION_PATTERN.match(year_name)
+        if not year_match:
+            continue
+        for round_name in os.listdir(os.path.join(root, year_name)):
+            round_match = ROUND_PATTERN.match(round_name)
+            if round_match and os.path.exists(
+                    os.path.join(root, year_name, round_name, 'aggregates.json')):
+                partitions.append((int(year_match.group(1)), round_match.group(1)))
+    return sorted(partitions, key=partition_sort_key)
+
+
+@functools.lru_cache(maxsize=256)
+def _read_aggregates(path, mtime):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@functools.lru_cache(maxsize=16)
+def _read_programs(path, mtime):
+    return pd.read_csv(path)
+
+
+def load_aggregates(root=HISTORY_DIR):
+    # อ่านเฉพาะไฟล์สรุปของแต่ละ partition (แคชตาม mtime)
+    result = []
+    for year, round_ in list_partitions(root):
+        path = os.path.join(partition_dir(year, round_, root), 'aggregates.json')
+        result.append(_read_aggregates(path, os.path.getmtime(path)))
+    return result
+
+
+def load_partition(year, round_, root=HISTORY_DIR):
+    path = os.path.join(partition_dir(year, round_, root), 'programs.csv')
+    return _read_programs(path, os.path.getmtime(path))
+
+
+def field_trends(cost_type, root=HISTORY_DIR):
+    # ค่าเฉลี่ยต่อสาขาในแต่ละ partition -> DataFrame (index = สาขา, columns = ปี/รอบ)
+    rows = {}
+    for aggregates in load_aggregates(root):
+        label = partition_label(aggregates['year'], aggregates['round'])
+        rows[label] = {field: stats[cost_type]['mean']
+                       for field, stats in aggregates['fields'].items() if cost_type in stats}
+    return pd.DataFrame(rows)
+
+
+def program_cost_changes(cost_type, before=None, after=None, root=HISTORY_DIR):
+    # เปรียบเทียบค่าใช้จ่ายรายหลักสูตร (ใช้ url เป็น key) ระหว่างสอง partition
+    partitions = list_partitions(root)
+    if len(partitions) < 2 and (before is None or after is None):
+        return pd.DataFrame()
+    before = before or partitions[-2]
+    after = after or partitions[-1]
+
+    columns = ['url', 'มหาวิทยาลัย', 'ชื่อหลักสูตร', cost_type]
+    old = load_partition(*before, root=root)[columns]
+    new = load_partition(*after, root=root)[columns]
+    merged = old.merge(new, on='url', suffixes=('_before', '_after'))
+    merged = merged.rename(columns={
+        'มหาวิทยาลัย_after': 'มหาวิทยาลัย',
+        'ชื่อหลักสูตร_after': 'ชื่อหลักสูตร',
+        f'{cost_type}_before': 'cost_before',
+        f'{cost_type}_after': 'cost_after',
+    }).dropna(subset=['cost_before', 'cost_after'])
+    merged['change'] = merged['cost_after'] - merged['cost_before']
+    merged['change_pct'] = merged['change'] / merged['cost_before'].where(merged['cost_before'] != 0)
+    merged.attrs['before'] = partition_label(*before)
+    merged.attrs['after'] = partition_label(*after)
+    return merged[['url', 'มหาวิทยาลัย', 'ชื่อหลักสูตร', 'cost_before', 'cost_after',
+                   'change', 'change_pct']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage partitioned TCAS history snapshots")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    add_parser = subparsers.add_parser('add', help="add a crawl snapshot as a year/round partition")
+    add_parser.add_argument('source_csv')
+    add_parser.add_argument('--year', required=True, type=int, help="TCAS year (e.g. 2568)")
+    add_parser.add_argument('--round', default='1', dest='round_', help="TCAS round")
+    add_parser.add_argument('--root', default=HISTORY_DIR)
+
+    list_parser = subparsers.add_parser('list', help="list stored partitions")
+    list_parser.add_argument('--root', default=HISTORY_DIR)
+
+    args = parser.parse_args()
+    if args.command == 'add':
+        aggregates = add_snapshot(args.source_csv, args.year, args.round_, args.root)
+        print(f"💾 Added {aggregates['programs']} programs as "
+              f"{partition_label(args.year, args.round_)}")
+    else:
+        for aggregates in load_aggregates(args.root):
+            print(f"{partition_label(aggregates['year'], aggregates['round'])}: "
+                  f"{aggregates['programs']} programs")
+
+
+if __name__ == '__main__':
+    main()
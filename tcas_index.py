@@ -0,0 +1,432 @@
+import math
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+
+# ดัชนีสำหรับค้นหาแบบพิมพ์แล้วแสดงผลทันที (search-as-you-type)
+# ภาษาไทยไม่มีการเว้นวรรคระหว่างคำ จึงใช้ n-gram ระดับตัวอักษรแทนการตัดคำ
+
+
+def normalize_text(text):
+    if text is None:
+        return ''
+    text = unicodedata.normalize('NFC', str(text)).lower()
+    return ' '.join(text.split())
+
+
+class SearchIndex:
+    def __init__(self, items):
+        # items: list ของ (value, label, [ข้อความที่ใช้ค้นหา, ...])
+        self.values = []
+        self.labels = []
+        self._keys = []
+        self._unigrams = defaultdict(set)
+        self._bigrams = defaultdict(set)
+
+        for value, label, texts in items:
+            item_id = len(self.values)
+            keys = [normalize_text(t) for t in texts if isinstance(t, str) and t.strip()]
+            self.values.append(value)
+            self.labels.append(label)
+            self._keys.append(keys)
+            for key in keys:
+                for ch in key:
+                    self._unigrams[ch].add(item_id)
+                for i in range(len(key) - 1):
+                    self._bigrams[key[i:i + 2]].add(item_id)
+
+    def __len__(self):
+        return len(self.values)
+
+    def _candidates(self, query):
+        if len(query) == 1:
+            return self._unigrams.get(query, set())
+        grams = {query[i:i + 2] for i in range(len(query) - 1)}
+        postings = sorted((self._bigrams.get(g, set()) for g in grams), key=len)
+        if not postings or not postings[0]:
+            return set()
+        result = set(postings[0])
+        for p in postings[1:]:
+            result &= p
+            if not result:
+                break
+        return result
+
+    def _score(self, item_id, query):
+        best = None
+        for key in self._keys[item_id]:
+            pos = key.find(query)
+            if pos < 0:
+                continue
+            # 0 = ขึ้นต้นด้วยคำค้น, 1 = ขึ้นต้นคำ, 2 = อยู่กลางข้อความ
+            if pos == 0:
+                rank = 0
+            elif key[pos - 1] in ' (-/':
+                rank = 1
+            else:
+                rank = 2
+            score = (rank, pos, len(key))
+            if best is None or score < best:
+                best = score
+        return best
+
+    def search(self, query, limit=50, restrict_to=None):
+        # คืนค่า id ของรายการที่ตรงที่สุด ไม่เกิน limit รายการ
+        query = normalize_text(query)
+        if not query:
+            ids = range(len(self.values)) if restrict_to is None else restrict_to
+            result = []
+            for item_id in ids:
+                result.append(item_id)
+                if len(result) >= limit:
+                    break
+            return result
+
+        candidates = self._candidates(query)
+        if restrict_to is not None:
+            candidates = candidates & set(restrict_to)
+
+        scored = []
+        for item_id in candidates:
+            score = self._score(item_id, query)
+            if score is not None:
+                scored.append((score, item_id))
+        scored.sort()
+        return [item_id for _, item_id in scored[:limit]]
+
+    def options(self, ids):
+        return [{'label': self.labels[i], 'value': self.values[i]} for i in ids]
+
+
+# bitmap index: แต่ละค่าของแต่ละคอลัมน์เก็บเป็นบิตของแถว (uint64 ละ 64 แถว)
+# ตัวกรองหลายค่าในคอลัมน์เดียว = OR, ต่างคอลัมน์ = AND ทำงานเป็นคำละ 64 แถวด้วย numpy
+
+
+def pack_mask(mask, n_words):
+    packed = np.packbits(np.asarray(mask, dtype=bool), bitorder='little')
+    words = np.zeros(n_words * 8, dtype=np.uint8)
+    words[:len(packed)] = packed
+    return words.view(np.uint64)
+
+
+class BitmapIndex:
+    def __init__(self, frame, columns):
+        self.n_rows = len(frame)
+        self.n_words = (self.n_rows + 63) // 64
+        self._bitmaps = {}
+        for column in columns:
+            codes, uniques = pd.factorize(frame[column])
+            self._bitmaps[column] = {
+                value: pack_mask(codes == code, self.n_words)
+                for code, value in enumerate(uniques)
+            }
+        self._all = pack_mask(np.ones(self.n_rows, dtype=bool), self.n_words)
+        self._none = np.zeros(self.n_words, dtype=np.uint64)
+
+    def values(self, column):
+        return list(self._bitmaps[column])
+
+    def bitmap(self, column, values):
+        result = self._none.copy()
+        for value in values:
+            words = self._bitmaps[column].get(value)
+            if words is not None:
+                result |= words
+        return result
+
+    def query(self, filters):
+        # filters: {column: [values]} - คอลัมน์ที่ไม่มีค่าในรายการถือว่าไม่กรอง
+        result = self._all.copy()
+        for column, values in filters.items():
+            if values:
+                result &= self.bitmap(column, values)
+        return result
+
+    def mask(self, words):
+        return np.unpackbits(words.view(np.uint8), bitorder='little')[:self.n_rows].astype(bool)
+
+    def rows(self, words):
+        return np.flatnonzero(self.mask(words))
+
+    def count(self, words):
+        return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+# quantile sketch แบบ bucket ลอการิทึม (แนวเดียวกับ DDSketch)
+# ค่าที่ตอบคลาดเคลื่อนสัมพัทธ์ไม่เกิน relative_accuracy, หน่วยความจำไม่เกิน max_buckets
+# sketch ของกลุ่มย่อยรวมกัน (merge) ได้โดยบวกจำนวนใน bucket เดียวกัน
+
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        if len(positive):
+            keys, counts = np.unique(
+                np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+                return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                self.buckets[key] = self.buckets.get(key, 0) + count
+            self._collapse()
+        return self
+
+    def add(self, value):
+        return self.add_many([value])
+
+    def remove_many(self, values):
+        # ลบค่าที่เคยเพิ่มไว้ (ใช้กับ delta ระหว่างรอบ crawl) - min/max ยังเป็นขอบเขตเดิม
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.count -= len(values)
+        positive = values[values > 0]
+        self.zero_count -= len(values) - len(positive)
+        if len(positive):
+            keys, counts = np.unique(
+                np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+                return_counts=True)
+            lowest = min(self.buckets) if self.buckets else None
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                # bucket ค่าต่ำที่ถูกรวมไปแล้ว (_collapse) อยู่ใน bucket ต่ำสุด
+                if key not in self.buckets and lowest is not None and key < lowest:
+                    key = lowest
+                remaining = self.buckets.get(key, 0) - count
+                if remaining > 0:
+                    self.buckets[key] = remaining
+                else:
+                    self.buckets.pop(key, None)
+        if self.count <= 0:
+            self.count = self.zero_count = 0
+            self.buckets = {}
+            self.min, self.max = math.inf, -math.inf
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        self.zero_count += other.zero_count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self._collapse()
+        return self
+
+    def copy(self):
+        sketch = QuantileSketch(self.relative_accuracy, self.max_buckets)
+        return sketch.merge(self)
+
+    def _collapse(self):
+        # bucket เกินกำหนด -> รวม bucket ค่าต่ำสุดเข้าด้วยกัน (ค่าสูงยังแม่นยำ)
+        if len(self.buckets) <= self.max_buckets:
+            return
+        keys = sorted(self.buckets)
+        overflow = keys[:len(keys) - self.max_buckets + 1]
+        target = overflow[-1]
+        self.buckets[target] = sum(self.buckets.pop(k) for k in overflow[:-1]) + \
+            self.buckets[target]
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(0.0, self.min)
+        seen = self.zero_count
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs):
+        return [self.quantile(q) for q in qs]
+
+
+# ผลรวม/จำนวนต่อกลุ่มย่อยที่เล็กที่สุด (แบบ cube) - ค่าเฉลี่ยตามมิติใด ๆ = รวมกลุ่มที่ตรงเงื่อนไข
+# เพิ่ม/ลบแถวได้ทีละส่วน จึงอัปเดตตาม delta ระหว่างรอบ crawl โดยไม่ต้อง groupby ข้อมูลทั้งหมดใหม่
+
+
+def group_key(values):
+    # NaN ใช้เป็น key ของ dict ไม่ได้ (nan != nan) -> ใช้ None แทน
+    return tuple(None if isinstance(v, float) and math.isnan(v) else v for v in values)
+
+
+class GroupAggregates:
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self._position = {column: i for i, column in enumerate(self.columns)}
+        self.groups = {}
+
+    def add(self, frame, value_column, sign=1):
+        frame = frame.dropna(subset=[value_column])
+        if frame.empty:
+            return self
+        stats = frame.groupby(self.columns, sort=False, dropna=False)[value_column].agg(
+            ['count', 'sum'])
+        for key, count, total in zip(stats.index, stats['count'].tolist(), stats['sum'].tolist()):
+            key = group_key(key if isinstance(key, tuple) else (key,))
+            current = self.groups.get(key, (0, 0.0))
+            count, total = current[0] + sign * count, current[1] + sign * total
+            if count > 0:
+                self.groups[key] = (count, total)
+            else:
+                self.groups.pop(key, None)
+        return self
+
+    def remove(self, frame, value_column):
+        return self.add(frame, value_column, sign=-1)
+
+    def copy(self):
+        aggregates = GroupAggregates(self.columns)
+        aggregates.groups = dict(self.groups)
+        return aggregates
+
+    def rollup(self, dimensions, query=None):
+        # query: {column: set ของค่าที่ต้องการ} -> DataFrame (index = dimensions) ของ count, sum, mean
+        query = {column: set(values) for column, values in (query or {}).items() if values}
+        dims = [self._position[d] for d in dimensions]
+        totals = {}
+        for key, (count, total) in self.groups.items():
+            if any(key[self._position[column]] not in values for column, values in query.items()):
+                continue
+            group = tuple(key[i] for i in dims)
+            if None in group:
+                continue
+            current = totals.get(group, (0, 0.0))
+            totals[group] = (current[0] + count, current[1] + total)
+
+        keys = sorted(totals)
+        if len(dimensions) == 1:
+            index = pd.Index([k[0] for k in keys], name=dimensions[0])
+        else:
+            index = pd.MultiIndex.from_arrays(
+                [[k[i] for k in keys] for i in range(len(dimensions))], names=dimensions)
+        counts = np.array([totals[k][0] for k in keys], dtype=np.int64)
+        sums = np.array([totals[k][1] for k in keys], dtype=float)
+        return pd.DataFrame({'count': counts, 'sum': sums,
+                             'mean': sums / np.maximum(counts, 1)}, index=index)
+
+
+# ค้นหาเพื่อนบ้านใกล้สุด (k-nearest neighbours) แบบตรงตัวบนเมทริกซ์ feature ที่คำนวณไว้ล่วงหน้า
+# feature ส่วนใหญ่เป็น one-hot (หลายมิติ) ต้นไม้แบ่งพื้นที่จึงไม่ช่วย - ใช้ระยะ
+# |a-b|^2 = |a|^2 - 2a.b + |b|^2 ด้วยการคูณเมทริกซ์ครั้งเดียวแล้ว argpartition เลือก k ตัว
+
+
+class NearestNeighbourIndex:
+    def __init__(self, vectors):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self._norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def query(self, vector, k=10, mask=None, exclude=()):
+        # คืนค่า (ตำแหน่งแถว, ระยะทาง) เรียงจากใกล้ไปไกล
+        # mask: bool ต่อแถว (False = ไม่พิจารณา), exclude: ตำแหน่งที่ต้องตัดออก เช่น ตัวมันเอง
+        vector = np.asarray(vector, dtype=np.float32)
+        distances = self._norms - 2 * (self.vectors @ vector) + vector @ vector
+        if mask is not None:
+            distances = np.where(mask, distances, np.inf)
+        distances[list(exclude)] = np.inf
+
+        k = min(k, int(np.isfinite(distances).sum()))
+        if k <= 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        return nearest, np.sqrt(np.maximum(distances[nearest], 0))
+
+
+# ตารางแบบ column สำหรับ query ที่ต้องกรองและเรียงทั้งตาราง (ไม่วนทีละแถวใน Python)
+# คอลัมน์หมวดเก็บเป็นรหัส int32 (dictionary encoding), คอลัมน์ตัวเลขเป็น float64
+# แถวเรียงตาม sort_by ไว้ล่วงหน้า -> กรองด้วย mask แล้วได้ผลที่เรียงแล้วทันที
+# ช่วงค่าของคอลัมน์ที่ใช้เรียง = ช่วงติดกันของแถว หาได้ด้วย searchsorted
+
+
+class ColumnTable:
+    def __init__(self, frame, categorical, numeric, sort_by=None):
+        if sort_by is not None:
+            # NaN อยู่ท้ายสุด
+            order = np.argsort(frame[sort_by].to_numpy(dtype=float), kind='stable')
+        else:
+            order = np.arange(len(frame))
+        self.sort_by = sort_by
+        self.positions = order
+        self.n_rows = len(order)
+        self.codes = {}
+        self.categories = {}
+        self._code_of = {}
+        for column in categorical:
+            codes, uniques = pd.factorize(frame[column])
+            self.codes[column] = codes.astype(np.int32)[order]
+            self.categories[column] = list(uniques)
+            self._code_of[column] = {value: code for code, value in enumerate(uniques)}
+        self.numbers = {column: frame[column].to_numpy(dtype=float)[order] for column in numeric}
+
+    def __len__(self):
+        return self.n_rows
+
+    def code_mask(self, column, values):
+        codes = [self._code_of[column][v] for v in values if v in self._code_of[column]]
+        if not codes:
+            return np.zeros(self.n_rows, dtype=bool)
+        if len(codes) == 1:
+            return self.codes[column] == codes[0]
+        return np.isin(self.codes[column], codes)
+
+    def sorted_range(self, low=None, high=None):
+        # ช่วงแถว [start, stop) ที่ค่าของคอลัมน์ sort_by อยู่ใน [low, high]
+        values = self.numbers[self.sort_by]
+        start = 0 if low is None else int(np.searchsorted(values, low, side='left'))
+        stop = int(np.searchsorted(values, np.inf if high is None else high, side='right'))
+        return start, stop
+
+    def mask(self, equals=None, ranges=None):
+        # equals: {column: [values]} (OR ภายในคอลัมน์, AND ระหว่างคอลัมน์)
+        # ranges: {column: (low, high)} - None = ไม่จำกัดฝั่งนั้น, ค่า NaN ไม่ผ่านเมื่อมีขอบเขต
+        result = np.ones(self.n_rows, dtype=bool)
+        for column, values in (equals or {}).items():
+            if values:
+                result &= self.code_mask(column, values)
+        for column, (low, high) in (ranges or {}).items():
+            if low is None and high is None:
+                continue
+            if column == self.sort_by:
+                start, stop = self.sorted_range(low, high)
+                result[:start] = False
+                result[stop:] = False
+                continue
+            values = self.numbers[column]
+            if low is not None:
+                result &= values >= low
+            if high is not None:
+                result &= values <= high
+        return result
+
+    def page(self, mask, offset=0, limit=50):
+        # คืนค่า (จำนวนทั้งหมดที่ผ่าน, ตำแหน่งแถวใน frame ต้นฉบับของหน้านั้น)
+        matches = np.flatnonzero(mask)
+        return len(matches), self.positions[matches[offset:offset + limit]]
@@ -0,0 +1,93 @@
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+# ตัวจับเวลาแยกตามขั้นตอน + ตัวนับ สำหรับงานที่รันนาน (crawl, load test)
+# รายงานผลเป็น JSON: จำนวนครั้ง, เวลารวม, ค่าเฉลี่ย และ p50/p95/p99 ต่อขั้นตอน
+
+PERCENTILES = [50, 95, 99]
+
+
+def percentile(sorted_values, q):
+    # linear interpolation ระหว่างอันดับ (แบบเดียวกับ numpy.percentile ค่าเริ่มต้น)
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(durations, elapsed=None):
+    values = sorted(durations)
+    summary = {
+        'count': len(values),
+        'total_s': round(sum(values), 6),
+        'mean_ms': round(sum(values) / len(values) * 1000, 3) if values else None,
+        'max_ms': round(values[-1] * 1000, 3) if values else None,
+    }
+    for q in PERCENTILES:
+        value = percentile(values, q)
+        summary[f'p{q}_ms'] = round(value * 1000, 3) if value is not None else None
+    if elapsed:
+        summary['per_sec'] = round(len(values) / elapsed, 3)
+    return summary
+
+
+class RunMetrics:
+    def __init__(self):
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.timings = defaultdict(list)
+        self.counters = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.timings[name].append(seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def report(self, **extra):
+        elapsed = self.elapsed()
+        with self._lock:
+            stages = {name: summarize(values, elapsed) for name, values in self.timings.items()}
+            counters = dict(self.counters)
+        return {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'elapsed_s': round(elapsed, 3),
+            'stages': stages,
+            'counters': counters,
+            **extra,
+        }
+
+    def write_report(self, path, **extra):
+        report = self.report(**extra)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from tcas_frontier import canonical_url, PRIORITIES
+
+# คิวงาน crawl ที่ใช้ร่วมกันหลายโปรเซส/หลายเครื่อง เก็บในไฟล์ SQLite ไฟล์เดียว
+#   tasks   -> URL ที่ต้องเข้า (เป็น seen-set ของทุก worker ไปในตัว: URL เดียวกันเข้าคิวได้ครั้งเดียว)
+#   results -> ผลของหลักสูตร บันทึกได้ครั้งเดียวต่อ URL
+#
+# worker ยืมงาน (lease) ไปทีละชิ้นพร้อมเวลาหมดอายุ - worker ที่ตาย/ค้าง งานจะกลับเข้าคิวเองเมื่อ lease หมด
+# งานที่ยังทำอยู่ต่ออายุด้วย renew (scrap_tcas เรียกทุกรอบเลื่อนหน้า/ทุกครั้งที่ลองซ้ำ และหยุดงานเมื่อ renew คืน False)
+# งานที่ล้มเหลวจะถูกลองใหม่แบบ backoff จนครบ max_attempts แล้วจึงถูกทำเครื่องหมาย failed
+# การบันทึกผล (complete) ตรวจว่ายังถือ lease อยู่ใน transaction เดียวกับการเขียนผล
+# worker ที่ lease หมดไปแล้วจะบันทึกไม่ได้ จึงมีผลเดียวต่อ URL แม้งานจะถูกทำซ้ำ
+#
+# หลายเครื่อง: วางไฟล์บน shared filesystem ที่รองรับ file lock (ค่าเริ่มต้นใช้ rollback journal)
+# หลายโปรเซสบนเครื่องเดียว: TCAS_QUEUE_WAL=1 เพื่อให้อ่าน/เขียนพร้อมกันได้ดีขึ้น
+#
+#   python tcas_queue.py stats crawl_queue.db
+#   python tcas_queue.py requeue-failed crawl_queue.db
+
+SEARCH_TASK = 'search'
+TASK_PRIORITIES = {SEARCH_TASK: -1, **PRIORITIES}
+PENDING, LEASED, DONE, FAILED = 'pending', 'leased', 'done', 'failed'
+
+LEASE_SECONDS = int(os.environ.get('TCAS_QUEUE_LEASE_SECONDS', '300'))
+MAX_ATTEMPTS = int(os.environ.get('TCAS_QUEUE_MAX_ATTEMPTS', '3'))
+RETRY_BACKOFF = 30
+USE_WAL = os.environ.get('TCAS_QUEUE_WAL', '0') == '1'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, priority, seq);
+CREATE TABLE IF NOT EXISTS results (
+    url TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    committed_at REAL NOT NULL
+);
+"""
+
+
+def task_key(url, kind):
+    # คำค้นไม่ใช่ URL - เก็บตามที่พิมพ์
+    return url.strip() if kind == SEARCH_TASK else canonical_url(url)
+
+
+class CrawlQueue:
+    def __init__(self, path, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS,
+                 retry_backoff=RETRY_BACKOFF, wal=USE_WAL):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        # isolation_level=None -> จัดการ transaction เอง (BEGIN IMMEDIATE กันสอง worker ยืมงานเดียวกัน)
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        if wal:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def close(self):
+        self.conn.close()
+
+    def push(self, url, kind, priority=None):
+        # คืนค่า True ถ้าเข้าคิวใหม่ (ใช้แทน CrawlFrontier.push ได้)
+        priority = TASK_PRIORITIES[kind] if priority is None else priority
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO tasks (url, kind, priority, status) VALUES (?, ?, ?, ?)",
+            (task_key(url, kind), kind, priority, PENDING))
+        return cursor.rowcount == 1
+
+    def mark_seen(self, url):
+        # หน้าที่เปิดอยู่แล้ว (เช่นหน้าแรกของผลการค้นหา) ไม่ต้องเข้าคิวอีก
+        self.conn.execute(
+            "INSERT OR IGNORE INTO tasks (url, kind, priority, status) VALUES (?, 'results', 0, ?)",
+            (canonical_url(url), DONE))
+
+    def lease(self, worker, n=1):
+        now = time.time()
+        with self.transaction() as conn:
+            # lease ที่หมดอายุและลองครบแล้ว -> failed
+            conn.execute(
+                "UPDATE tasks SET status = ?, lease_owner = NULL, last_error = 'lease expired' "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, LEASED, now, self.max_attempts))
+            rows = conn.execute(
+                "SELECT url, kind FROM tasks "
+                "WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?) "
+                "ORDER BY priority, seq LIMIT ?",
+                (PENDING, now, LEASED, now, n)).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET status = ?, lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE url = ?",
+                [(LEASED, worker, now + self.lease_seconds, url) for url, _ in rows])
+        return rows
+
+    def renew(self, worker, url):
+        # ต่ออายุ lease ของงานที่ใช้เวลานาน - คืนค่า False ถ้า lease หลุดไปแล้ว
+        cursor = self.conn.execute(
+            "UPDATE tasks SET lease_expires = ? WHERE url = ? AND status = ? AND lease_owner = ?",
+            (time.time() + self.lease_seconds, url, LEASED, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, worker, url, data=None):
+        # ปิดงาน + บันทึกผลใน transaction เดียว - คืนค่า False ถ้าไม่ได้ถือ lease แล้ว (ผลถูกทิ้ง)
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = ?, lease_owner = NULL, last_error = NULL "
+                "WHERE url = ? AND status = ? AND lease_owner = ?",
+                (DONE, url, LEASED, worker))
+            if cursor.rowcount != 1:
+                return False
+            if data is not None:
+                conn.execute(
+                    "INSERT INTO results (url, data, worker, committed_at) VALUES (?, ?, ?, ?)",
+                    (url, json.dumps(data, ensure_ascii=False), worker, time.time()))
+        return True
+
+    def fail(self, worker, url, error):
+        # ลองใหม่หลัง backoff (30s, 60s, ...) จนครบ max_attempts
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM tasks WHERE url = ? AND status = ? AND lease_owner = ?",
+                (url, LEASED, worker)).fetchone()
+            if row is None:
+                return None
+            attempts = row[0]
+            status = FAILED if attempts >= self.max_attempts else PENDING
+            conn.execute(
+                "UPDATE tasks SET status = ?, lease_owner = NULL, available_at = ?, last_error = ? "
+                "WHERE url = ?",
+                (status, time.time() + self.retry_backoff * 2 ** (attempts - 1), str(error)[:500], url))
+        return status
+
+    def requeue_failed(self):
+        cursor = self.conn.execute(
+            "UPDATE tasks SET status = ?, attempts = 0, available_at = 0 WHERE status = ?",
+            (PENDING, FAILED))
+        return cursor.rowcount
+
+    def stats(self):
+        counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status"))
+        counts = {status: counts.get(status, 0) for status in (PENDING, LEASED, DONE, FAILED)}
+        counts['results'] = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return counts
+
+    def remaining(self):
+        # งานที่ยังไม่จบ (รอคิว + กำลังทำ)
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status IN (?, ?)", (PENDING, LEASED)).fetchone()[0]
+
+    def results(self):
+        for (data,) in self.conn.execute("SELECT data FROM results ORDER BY committed_at"):
+            yield json.loads(data)
+
+    def __len__(self):
+        return self.remaining()
+
+    def __bool__(self):
+        return self.remaining() > 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the shared TCAS crawl queue")
+    parser.add_argument('command', choices=['stats', 'requeue-failed'])
+    parser.add_argument('queue', help="path to the queue database")
+    args = parser.parse_args()
+
+    queue = CrawlQueue(args.queue)
+    if args.command == 'stats':
+        print(json.dumps(queue.stats(), indent=2))
+    else:
+        print(f"🔁 Requeued {queue.requeue_failed()} failed tasks")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# โมดูลของโปรเจกต์อยู่ที่ root ของ repo (ไม่ใช่ package)
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+@pytest.fixture
+def dashboard(monkeypatch):
+    # extra_dash อ่าน tcas_cleaned.csv จาก working directory
+    monkeypatch.chdir(REPO_ROOT)
+    monkeypatch.setenv('TCAS_WARMUP', '0')
+    import extra_dash
+    extra_dash.create_app()
+    yield extra_dash
+    extra_dash.refresh_dataset(extra_dash.DATA_FILE)
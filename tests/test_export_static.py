@@ -0,0 +1,23 @@
+import json
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_heatmap_follows_program_type(monkeypatch, tmp_path):
+    monkeypatch.chdir(REPO_ROOT)
+    import export_static
+
+    manifest = export_static.export(str(tmp_path))
+
+    heatmaps = {}
+    for page in manifest['pages']:
+        with open(tmp_path / page['figures']['heatmap'], encoding='utf-8') as f:
+            heatmaps[(page['cost_type'], page['program_type'])] = json.load(f)
+    assert len(set(page['figures']['heatmap'] for page in manifest['pages'])) == len(manifest['pages'])
+    for (cost_type, program_type), figure in heatmaps.items():
+        live = export_static.dashboard.build_cost_heatmap(cost_type, program_type, ())
+        assert figure['data'][0]['z'] == live['data'][0]['z']
+    cost_type = manifest['pages'][0]['cost_type']
+    narrowed = [figure for (ct, pt), figure in heatmaps.items() if ct == cost_type and pt != 'all']
+    assert any(figure['data'][0]['z'] != heatmaps[(cost_type, 'all')]['data'][0]['z'] for figure in narrowed)
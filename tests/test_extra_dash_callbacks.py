@@ -0,0 +1,32 @@
+import json
+
+PROGRAM_1_OUTPUT = '..program-1-dropdown.options...program-1-dropdown.value..'
+
+
+def update_program_1(dashboard, changed, university, search_value, current_value):
+    client = dashboard.app.server.test_client()
+    response = client.post('/_dash-update-component', json={
+        'output': PROGRAM_1_OUTPUT,
+        'outputs': [{'id': 'program-1-dropdown', 'property': 'options'},
+                    {'id': 'program-1-dropdown', 'property': 'value'}],
+        'inputs': [{'id': 'university-1-dropdown', 'property': 'value', 'value': university},
+                   {'id': 'program-1-dropdown', 'property': 'search_value', 'value': search_value}],
+        'state': [{'id': 'program-1-dropdown', 'property': 'value', 'value': current_value}],
+        'changedPropIds': [changed],
+    })
+    assert response.status_code == 200
+    return json.loads(response.data)['response']['program-1-dropdown']
+
+
+def test_program_search_keeps_value_without_update(dashboard):
+    university, program = dashboard.df['มหาวิทยาลัย'][0], dashboard.df['ชื่อหลักสูตร'][0]
+    # พิมพ์ค้นหา -> เปลี่ยนแค่ options, value ไม่ถูกส่งกลับ (update_cost_views จึงไม่ถูกยิงซ้ำ)
+    props = update_program_1(dashboard, 'program-1-dropdown.search_value', university, 'zzz', program)
+    assert 'value' not in props
+    assert [o['value'] for o in props['options']] == [program]
+
+
+def test_university_change_selects_first_program(dashboard):
+    university = dashboard.df['มหาวิทยาลัย'][0]
+    props = update_program_1(dashboard, 'university-1-dropdown.value', university, None, None)
+    assert props['value'] == props['options'][0]['value']
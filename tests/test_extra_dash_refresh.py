@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+
+def summaries(dashboard):
+    return {cost_type: dashboard.cost_summary(cost_type)
+            for cost_type in [o['value'] for o in dashboard.COST_TYPE_OPTIONS]}
+
+
+def assert_same_summaries(incremental, fresh):
+    for cost_type, (aggregates, sketches) in incremental.items():
+        fresh_aggregates, fresh_sketches = fresh[cost_type]
+        assert set(aggregates.groups) == set(fresh_aggregates.groups)
+        for key, (count, total) in aggregates.groups.items():
+            assert count == fresh_aggregates.groups[key][0]
+            assert total == pytest.approx(fresh_aggregates.groups[key][1])
+        assert set(sketches) == set(fresh_sketches)
+        for key, sketch in sketches.items():
+            assert sketch.count == fresh_sketches[key].count
+            assert sketch.buckets == fresh_sketches[key].buckets
+
+
+def test_refresh_with_duplicated_url_matches_rebuild(dashboard, tmp_path):
+    summaries(dashboard)
+    crawl = pd.read_csv(dashboard.DATA_FILE)
+    # url ซ้ำ (ค่าใช้จ่ายต่างกัน) + แถวที่เปลี่ยนค่า + แถวใหม่
+    duplicate = crawl.iloc[[4]].copy()
+    duplicate['ค่าใช้จ่ายต่อภาค'] = 999999
+    duplicate['ชื่อวิทยาเขต'] = 'วิทยาเขตซ้ำ'
+    added = crawl.iloc[[0]].copy()
+    added['url'] = 'https://course.mytcas.com/programs/99990101300501A'
+    crawl.loc[7, 'ค่าใช้จ่ายต่อภาค'] = 12345
+    new_crawl = pd.concat([crawl, duplicate, added], ignore_index=True)
+    path = tmp_path / 'new_crawl.csv'
+    new_crawl.to_csv(path, index=False)
+
+    changes = dashboard.refresh_dataset(str(path))
+    assert changes.summary() == {'added': 1, 'removed': 0, 'changed': 1}
+    incremental = dict(dashboard.cost_summaries)
+
+    dashboard.cost_summaries.clear()
+    assert_same_summaries(incremental, summaries(dashboard))
+    assert dashboard.df['url'].is_unique
+
+
+def test_refresh_does_not_mutate_summaries_in_use(dashboard, tmp_path):
+    # request ที่ถือค่าสรุปชุดเดิมอยู่ระหว่าง refresh ต้องเห็นชุดเดิมครบทั้งชุด
+    held = summaries(dashboard)
+    before = {cost_type: (dict(aggregates.groups), {key: dict(sketch.buckets) for key, sketch in sketches.items()})
+              for cost_type, (aggregates, sketches) in held.items()}
+    crawl = pd.read_csv(dashboard.DATA_FILE)
+    crawl.loc[3, 'ค่าใช้จ่ายต่อภาค'] = 54321
+    crawl = crawl.drop(index=[10])
+    path = tmp_path / 'new_crawl.csv'
+    crawl.to_csv(path, index=False)
+    old_version = dashboard.DATASET_VERSION
+
+    dashboard.refresh_dataset(str(path))
+
+    for cost_type, (aggregates, sketches) in held.items():
+        assert aggregates.groups == before[cost_type][0]
+        assert {key: sketch.buckets for key, sketch in sketches.items()} == before[cost_type][1]
+        assert dashboard.cost_summaries[cost_type][0] is not aggregates
+    assert dashboard.DATASET_VERSION != old_version
+    assert dashboard.program_bitmaps.n_rows == len(dashboard.df)
@@ -0,0 +1,193 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import WebDriverException
+
+import scrap_tcas
+from scrap_tcas import DriverManager
+from tcas_codes import ProgramCodeLookup
+
+PROGRAM_URL = 'https://course.mytcas.com/programs/99990121300501A'
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def profile_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(scrap_tcas, 'CHROME_PROFILE_DIR', str(tmp_path))
+    scrap_tcas.claim_profile.cache_clear()
+    yield tmp_path
+    for lock in scrap_tcas.profile_locks:
+        lock.close()
+    scrap_tcas.profile_locks.clear()
+    scrap_tcas.claim_profile.cache_clear()
+
+
+def claim_in_subprocess(directory, prefix):
+    code = f"import scrap_tcas; print(scrap_tcas.claim_profile({prefix!r}))"
+    env = dict(os.environ, TCAS_CHROME_PROFILE_DIR=str(directory))
+    result = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+class FakeDriver:
+    def __init__(self):
+        self.closed = False
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def quit(self):
+        self.closed = True
+
+
+class FakeFactory:
+    def __init__(self):
+        self.drivers = []
+
+    def __call__(self):
+        self.drivers.append(FakeDriver())
+        return self.drivers[-1]
+
+
+def broken_page(driver):
+    raise ValueError("missing element")
+
+
+def ok_page(driver):
+    return 'ok'
+
+
+def dead_driver(driver):
+    raise WebDriverException("chrome not reachable")
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(scrap_tcas, 'psutil', None)
+    return DriverManager(factory=FakeFactory(), max_pages=1000, error_window=20,
+                         max_error_rate=0.5, max_retries=0)
+
+
+def test_error_rate_over_window_recycles(manager):
+    # 11/20 ผิดพลาด (> 50%) จาก exception ที่ไม่ใช่ driver error
+    for _ in range(9):
+        assert manager.run(ok_page) == 'ok'
+    for _ in range(10):
+        with pytest.raises(ValueError):
+            manager.run(broken_page)
+    assert manager.recycles == 0
+    with pytest.raises(ValueError):
+        manager.run(broken_page)
+    assert manager.recycles == 1
+    assert manager.factory.drivers[0].closed
+    assert len(manager.outcomes) == 0
+
+
+def test_error_rate_at_half_does_not_recycle(manager):
+    for _ in range(10):
+        manager.run(ok_page)
+    for _ in range(10):
+        with pytest.raises(ValueError):
+            manager.run(broken_page)
+    assert manager.recycles == 0
+
+
+def test_window_survives_driver_error_recycles(manager):
+    for _ in range(5):
+        with pytest.raises(WebDriverException):
+            manager.run(dead_driver)
+    assert manager.recycles == 5
+    assert list(manager.outcomes) == [False] * 5
+    assert manager.run(ok_page) == 'ok'
+    assert list(manager.outcomes) == [False] * 5 + [True]
+
+
+def course_page(monkeypatch, html):
+    lookup = ProgramCodeLookup()
+    monkeypatch.setattr(scrap_tcas, 'code_lookup', lookup)
+    monkeypatch.setattr(scrap_tcas, 'navigate', lambda driver, url: None)
+    monkeypatch.setattr(scrap_tcas, 'wait_for_page_load', lambda driver: True)
+    monkeypatch.setattr(scrap_tcas, 'parse_page', lambda driver: BeautifulSoup(html, 'html.parser'))
+    return lookup
+
+
+def test_learns_university_from_link(monkeypatch):
+    lookup = course_page(monkeypatch, '<a href="/universities/9999">มหาวิทยาลัยทดสอบ</a>')
+    info = scrap_tcas.extract_detail_from_course(None, PROGRAM_URL)
+    assert info['มหาวิทยาลัย'] == 'มหาวิทยาลัยทดสอบ'
+    assert lookup.university(PROGRAM_URL) == 'มหาวิทยาลัยทดสอบ'
+
+
+def test_does_not_learn_guessed_university(monkeypatch):
+    lookup = course_page(monkeypatch, '<p>หลักสูตรนี้สอนโดยมหาวิทยาลัยทดสอบ ร่วมกับภาคเอกชน</p>')
+    info = scrap_tcas.extract_detail_from_course(None, PROGRAM_URL)
+    assert info['มหาวิทยาลัย']
+    assert lookup.university(PROGRAM_URL) is None
+    assert lookup.learned == 0
+
+
+class ScrollingDriver(FakeDriver):
+    def __init__(self):
+        super().__init__()
+        self.links = 0
+
+    def execute_script(self, script, *args):
+        self.links += 10
+        return self.links
+
+    def find_elements(self, *args):
+        return []
+
+
+def test_scroll_renews_lease_each_round(monkeypatch):
+    renewals = []
+    monkeypatch.setattr(scrap_tcas, 'lease_heartbeat', lambda: renewals.append(1) or len(renewals) < 3)
+    with pytest.raises(scrap_tcas.LeaseLost):
+        scrap_tcas.scroll_to_end(ScrollingDriver(), max_rounds=10, scroll_pause=0)
+    assert len(renewals) == 3
+
+
+def test_worker_drops_task_when_lease_is_lost(monkeypatch, tmp_path, profile_dir):
+    from tcas_queue import CrawlQueue
+
+    queue = CrawlQueue(str(tmp_path / 'queue.db'))
+    page = 'https://course.mytcas.com/search?page=2'
+    queue.push(page, scrap_tcas.RESULTS_PAGE)
+
+    def stolen_page(driver, url, frontier):
+        # worker อื่นรับงานนี้ไปทำเสร็จระหว่างที่เรายังเลื่อนหน้าอยู่
+        queue.conn.execute("UPDATE tasks SET status = 'done', lease_owner = 'other' WHERE url = ?", (url,))
+        scrap_tcas.renew_lease()
+        raise AssertionError("should not get past a lost lease")
+
+    monkeypatch.setattr(scrap_tcas, 'psutil', None)
+    monkeypatch.setattr(scrap_tcas, 'create_driver', lambda profile_dir=None: FakeDriver())
+    monkeypatch.setattr(scrap_tcas, 'visit_results_page', stolen_page)
+    monkeypatch.setattr(scrap_tcas, 'save_code_lookup', lambda: None)
+    monkeypatch.setattr(scrap_tcas, 'write_run_report', lambda *args, **kwargs: None)
+    lost = scrap_tcas.metrics.counters.get('results_lease_lost', 0)
+
+    scrap_tcas.main_worker(queue, 'me')
+
+    assert scrap_tcas.metrics.counters['results_lease_lost'] == lost + 1
+    assert queue.stats()['failed'] == 0
+    assert scrap_tcas.lease_heartbeat is None
+
+
+@pytest.mark.skipif(scrap_tcas.fcntl is None, reason="profile slots need fcntl")
+def test_profile_slots_are_exclusive_and_reused(profile_dir):
+    mine = scrap_tcas.claim_profile('host')
+    assert mine == str(profile_dir / 'host-0')
+    assert scrap_tcas.claim_profile('host') == mine
+    # โปรเซสอื่นได้ slot ถัดไป และโปรเซสที่รันใหม่ได้ slot เดิมกลับมา (ไม่สร้างโฟลเดอร์เพิ่มทุกรอบ)
+    other = claim_in_subprocess(profile_dir, 'host')
+    assert other == str(profile_dir / 'host-1')
+    assert claim_in_subprocess(profile_dir, 'host') == other
+    assert scrap_tcas.build_chrome_options(profile_dir=other).arguments.count(f"--user-data-dir={other}") == 1
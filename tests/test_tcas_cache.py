@@ -0,0 +1,78 @@
+import pytest
+
+import tcas_cache
+from tcas_cache import MISSING, CacheBackend, DiskCache, LRUCache, uncached
+
+
+@pytest.fixture(params=['lru', 'disk'])
+def cache(request, tmp_path):
+    if request.param == 'lru':
+        return LRUCache(maxsize=2)
+    return DiskCache(str(tmp_path), maxsize=2)
+
+
+def test_backend_must_implement_get_and_set():
+    class Incomplete(CacheBackend):
+        def get(self, key):
+            return MISSING
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_get_missing_and_roundtrip(cache):
+    assert cache.get('a') is MISSING
+    cache.set('a', {'data': [1, 2]})
+    assert cache.get('a') == {'data': [1, 2]}
+
+
+def test_evicts_beyond_maxsize(cache):
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('c', 3)
+    assert cache.get('a') is MISSING
+    assert cache.get('b') == 2
+    assert cache.get('c') == 3
+
+
+def test_lru_keeps_recently_read_keys():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('a') == 1
+    assert cache.get('b') is MISSING
+
+
+def test_memoize_separates_dataset_versions(cache):
+    calls = []
+    version = {'current': 'v1'}
+
+    @cache.memoize('view', lambda: version['current'])
+    def view(cost_type, program_type='all'):
+        calls.append((version['current'], cost_type, program_type))
+        return f"{version['current']}:{cost_type}:{program_type}"
+
+    assert view('semester') == 'v1:semester:all'
+    assert view('semester') == 'v1:semester:all'
+    assert view('semester', program_type='ปกติ') == 'v1:semester:ปกติ'
+    version['current'] = 'v2'
+    assert view('semester') == 'v2:semester:all'
+    assert calls == [('v1', 'semester', 'all'), ('v1', 'semester', 'ปกติ'), ('v2', 'semester', 'all')]
+    assert tcas_cache.make_key('view', 'v1', ('semester',), {}) != tcas_cache.make_key('view', 'v2', ('semester',), {})
+
+
+def test_memoize_skips_uncached_values(cache):
+    results = iter([uncached('error placeholder'), 'figure'])
+    calls = []
+
+    @cache.memoize('heatmap', 'v1')
+    def heatmap():
+        calls.append(1)
+        return next(results)
+
+    assert heatmap() == 'error placeholder'
+    assert heatmap() == 'figure'
+    assert heatmap() == 'figure'
+    assert len(calls) == 2
@@ -0,0 +1,47 @@
+from tcas_frontier import BloomFilter, CrawlFrontier, PROGRAM_PAGE, RESULTS_PAGE, canonical_url
+
+
+def program_url(i):
+    return f"https://course.mytcas.com/programs/1001{i:012d}A"
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    urls = [program_url(i) for i in range(2000)]
+    # URL ใหม่อาจถูกตอบว่า "เคยเห็น" ได้ตาม error_rate แต่ URL ที่เพิ่มแล้วต้องพบเสมอ
+    added = sum(bloom.add(url) for url in urls)
+    assert added >= 1960
+    assert len(bloom) == added
+    assert all(url in bloom for url in urls)
+    assert not any(bloom.add(url) for url in urls)
+
+
+def test_bloom_filter_false_positive_rate_near_target():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    for i in range(2000):
+        bloom.add(program_url(i))
+    probes = [program_url(i) for i in range(100000, 120000)]
+    false_positives = sum(url in bloom for url in probes)
+    assert false_positives / len(probes) < 0.02
+
+
+def test_canonical_url_merges_spellings():
+    url = 'https://course.mytcas.com/programs/10010121300501A'
+    assert canonical_url('HTTPS://Course.MyTCAS.com/programs/10010121300501A/#detail') == url
+    assert canonical_url('https://course.mytcas.com/search?q=a') != canonical_url('https://course.mytcas.com/search?q=b')
+
+
+def test_frontier_pops_results_pages_first_then_fifo():
+    frontier = CrawlFrontier(capacity=100)
+    frontier.mark_seen('https://course.mytcas.com/search?page=1')
+    assert frontier.push(program_url(1), PROGRAM_PAGE)
+    assert frontier.push('https://course.mytcas.com/search?page=2', RESULTS_PAGE)
+    assert frontier.push(program_url(2), PROGRAM_PAGE)
+    assert not frontier.push(program_url(1) + '/', PROGRAM_PAGE)
+    assert not frontier.push('https://course.mytcas.com/search?page=1', RESULTS_PAGE)
+    assert len(frontier) == 3
+
+    order = [frontier.pop() for _ in range(3)]
+    assert order == [('https://course.mytcas.com/search?page=2', RESULTS_PAGE),
+                     (program_url(1), PROGRAM_PAGE), (program_url(2), PROGRAM_PAGE)]
+    assert not frontier
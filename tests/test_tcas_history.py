@@ -0,0 +1,36 @@
+import pandas as pd
+
+import tcas_history
+
+
+def write_round(tmp_path, year, round_, semester_cost):
+    source = tmp_path / f"crawl-{year}-{round_}.csv"
+    pd.DataFrame({
+        'url': ['https://course.mytcas.com/programs/10010121300501A'],
+        'มหาวิทยาลัย': ['จุฬาลงกรณ์มหาวิทยาลัย'],
+        'ชื่อหลักสูตร': ['วิศวกรรมคอมพิวเตอร์'],
+        'สาขาวิชา': ['คอมพิวเตอร์'],
+        'ค่าใช้จ่ายต่อภาค': [semester_cost],
+    }).to_csv(source, index=False)
+    tcas_history.add_snapshot(str(source), year, round_, root=str(tmp_path / 'history'))
+
+
+def test_rounds_sort_numerically(tmp_path):
+    write_round(tmp_path, 2568, 10, 30000)
+    write_round(tmp_path, 2568, 2, 20000)
+    write_round(tmp_path, 2567, 3, 10000)
+    root = str(tmp_path / 'history')
+
+    assert tcas_history.list_partitions(root) == [(2567, '3'), (2568, '2'), (2568, '10')]
+    assert [a['round'] for a in tcas_history.load_aggregates(root)] == ['3', '2', '10']
+
+    # partition ล่าสุดคือ round=10 ไม่ใช่ round=2
+    changes = tcas_history.program_cost_changes('ค่าใช้จ่ายต่อภาค', root=root)
+    assert changes['cost_before'].tolist() == [20000]
+    assert changes['cost_after'].tolist() == [30000]
+
+
+def test_non_numeric_rounds_sort_after_numeric():
+    partitions = [(2568, 'extra'), (2568, '10'), (2568, '2')]
+    assert sorted(partitions, key=tcas_history.partition_sort_key) == [
+        (2568, '2'), (2568, '10'), (2568, 'extra')]
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tcas_index import BitmapIndex, ColumnTable, QuantileSketch
+
+PERCENTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+
+@pytest.fixture
+def programs():
+    # มากกว่า 64 แถวและไม่ลงตัวกับ word - ตรวจบิตข้ามคำและบิตท้ายที่เกินจำนวนแถว
+    rng = np.random.default_rng(7)
+    n = 203
+    return pd.DataFrame({
+        'สาขาวิชา': rng.choice(['คอมพิวเตอร์', 'ปัญญาประดิษฐ์', 'ซอฟต์แวร์', None], n),
+        'ชื่อวิทยาเขต': rng.choice(['หลัก', 'ศรีราชา', 'ภูเก็ต'], n),
+        'ประเภทหลักสูตร': rng.choice(['ปกติ', 'นานาชาติ'], n),
+        'cost': rng.uniform(10000, 200000, n).round(),
+    })
+
+
+BITMAP_COLUMNS = ['สาขาวิชา', 'ชื่อวิทยาเขต', 'ประเภทหลักสูตร']
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'สาขาวิชา': ['คอมพิวเตอร์']},
+    {'สาขาวิชา': ['คอมพิวเตอร์', 'ซอฟต์แวร์'], 'ชื่อวิทยาเขต': ['ศรีราชา']},
+    {'ชื่อวิทยาเขต': ['หลัก', 'ภูเก็ต'], 'ประเภทหลักสูตร': ['นานาชาติ']},
+    {'สาขาวิชา': ['ไม่มีสาขานี้']},
+    {'สาขาวิชา': [], 'ประเภทหลักสูตร': ['ปกติ']},
+])
+def test_bitmap_query_matches_pandas_mask(programs, filters):
+    index = BitmapIndex(programs, BITMAP_COLUMNS)
+    expected = np.ones(len(programs), dtype=bool)
+    for column, values in filters.items():
+        if values:
+            expected &= programs[column].isin(values).to_numpy()
+
+    words = index.query(filters)
+    assert (index.mask(words) == expected).all()
+    assert index.count(words) == expected.sum()
+    assert (index.rows(words) == np.flatnonzero(expected)).all()
+
+
+def test_bitmap_values_skip_missing(programs):
+    index = BitmapIndex(programs, BITMAP_COLUMNS)
+    assert set(index.values('สาขาวิชา')) == set(programs['สาขาวิชา'].dropna())
+
+
+def exact_quantile(values, q):
+    # อันดับเดียวกับ QuantileSketch.quantile: ค่าลำดับที่ floor(q * (n - 1))
+    ordered = np.sort(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+@pytest.fixture
+def costs():
+    rng = np.random.default_rng(11)
+    return np.concatenate([rng.lognormal(11, 0.6, 5000).round(), np.zeros(40)])
+
+
+@pytest.mark.parametrize('q', [0.0, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 1.0])
+def test_sketch_quantile_within_relative_accuracy(costs, q):
+    sketch = QuantileSketch(relative_accuracy=0.01).add_many(costs)
+    expected = exact_quantile(costs, q)
+    assert sketch.count == len(costs)
+    assert sketch.quantile(q) == pytest.approx(expected, rel=0.01, abs=1e-9)
+
+
+def test_sketch_ignores_nan_and_empty():
+    sketch = QuantileSketch().add_many([np.nan, np.nan])
+    assert sketch.count == 0
+    assert sketch.quantile(0.5) is None
+
+
+def test_sketch_merge_equals_single_sketch(costs):
+    left, right = costs[::2], costs[1::2]
+    merged = QuantileSketch().add_many(left).merge(QuantileSketch().add_many(right))
+    whole = QuantileSketch().add_many(costs)
+    assert merged.buckets == whole.buckets
+    assert (merged.count, merged.zero_count, merged.min, merged.max) == \
+        (whole.count, whole.zero_count, whole.min, whole.max)
+    assert merged.quantiles(PERCENTILES) == whole.quantiles(PERCENTILES)
+
+
+def test_sketch_remove_is_exact_inverse_of_add(costs):
+    kept, removed = costs[:3000], costs[3000:]
+    sketch = QuantileSketch().add_many(costs).remove_many(removed)
+    expected = QuantileSketch().add_many(kept)
+    assert sketch.buckets == expected.buckets
+    assert (sketch.count, sketch.zero_count) == (expected.count, expected.zero_count)
+    # min/max เป็นขอบเขตเดิมหลังลบ - quantile กลาง ๆ ต้องตรงกัน
+    assert sketch.quantiles([0.25, 0.5, 0.75]) == expected.quantiles([0.25, 0.5, 0.75])
+    assert sketch.remove_many(kept).count == 0
+    assert sketch.buckets == {}
+
+
+def test_sketch_copy_is_independent(costs):
+    sketch = QuantileSketch().add_many(costs)
+    copy = sketch.copy()
+    copy.add_many([1e9])
+    assert sketch.count == len(costs)
+    assert sketch.max < 1e9
+
+
+def test_collapsed_sketch_keeps_high_quantiles(costs):
+    sketch = QuantileSketch(relative_accuracy=0.01, max_buckets=32).add_many(costs)
+    assert len(sketch.buckets) <= 32
+    assert sketch.quantile(0.99) == pytest.approx(exact_quantile(costs, 0.99), rel=0.01)
+
+
+@pytest.fixture
+def table_frame(programs):
+    frame = programs.copy()
+    frame.loc[::17, 'cost'] = np.nan
+    frame['per_semester'] = (frame['cost'] / 8).round()
+    return frame
+
+
+@pytest.mark.parametrize('equals, ranges', [
+    ({}, {}),
+    ({'สาขาวิชา': ['คอมพิวเตอร์']}, {'cost': (None, 100000)}),
+    ({'ชื่อวิทยาเขต': ['หลัก', 'ภูเก็ต'], 'ประเภทหลักสูตร': ['ปกติ']}, {'cost': (50000, 150000)}),
+    ({'สาขาวิชา': ['ไม่มีสาขานี้']}, {}),
+    ({}, {'per_semester': (10000, None), 'cost': (None, None)}),
+])
+def test_column_table_matches_pandas_filter(table_frame, equals, ranges):
+    table = ColumnTable(table_frame, BITMAP_COLUMNS, ['cost', 'per_semester'], sort_by='cost')
+    expected = pd.Series(True, index=table_frame.index)
+    for column, values in equals.items():
+        expected &= table_frame[column].isin(values)
+    for column, (low, high) in ranges.items():
+        if low is not None:
+            expected &= table_frame[column] >= low
+        if high is not None:
+            expected &= table_frame[column] <= high
+    expected_rows = table_frame[expected].sort_values('cost', kind='stable', na_position='last')
+
+    total, positions = table.page(table.mask(equals, ranges), offset=0, limit=len(table_frame))
+    assert total == len(expected_rows)
+    assert list(positions) == list(expected_rows.index)
+
+
+def test_column_table_pages_are_slices_of_sorted_result(table_frame):
+    table = ColumnTable(table_frame, BITMAP_COLUMNS, ['cost'], sort_by='cost')
+    mask = table.mask({'ประเภทหลักสูตร': ['ปกติ']}, {'cost': (None, 180000)})
+    total, everything = table.page(mask, 0, len(table_frame))
+    pages = [table.page(mask, offset, 20)[1] for offset in range(0, total, 20)]
+    assert list(np.concatenate(pages)) == list(everything)
+    assert table_frame['cost'].iloc[everything].is_monotonic_increasing
+    assert len(table.page(mask, total, 20)[1]) == 0
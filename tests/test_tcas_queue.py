@@ -0,0 +1,113 @@
+import pytest
+
+import tcas_queue
+from tcas_queue import CrawlQueue, SEARCH_TASK
+
+PROGRAM = 'https://course.mytcas.com/programs/10010121300501A'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(tcas_queue, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = CrawlQueue(str(tmp_path / 'queue.db'), lease_seconds=60, max_attempts=3, retry_backoff=30)
+    yield queue
+    queue.close()
+
+
+def status(queue, url):
+    return queue.conn.execute("SELECT status, attempts FROM tasks WHERE url = ?", (url,)).fetchone()
+
+
+def test_push_dedups_canonical_urls(queue):
+    assert queue.push(PROGRAM, 'program')
+    assert not queue.push(PROGRAM.replace('course.mytcas.com', 'COURSE.MyTCAS.com'), 'program')
+    assert not queue.push(PROGRAM + '/#top', 'program')
+    assert queue.remaining() == 1
+
+
+def test_lease_order_follows_priority(queue):
+    queue.push(PROGRAM, 'program')
+    queue.push('https://course.mytcas.com/search?page=2', 'results')
+    queue.push('วิศวกรรมคอมพิวเตอร์', SEARCH_TASK)
+    kinds = [queue.lease('w1')[0][1] for _ in range(3)]
+    assert kinds == [SEARCH_TASK, 'results', 'program']
+    assert queue.lease('w1') == []
+
+
+def test_expired_lease_is_leased_again(queue, clock):
+    queue.push(PROGRAM, 'program')
+    assert queue.lease('w1') == [(PROGRAM, 'program')]
+    assert queue.lease('w2') == []
+    clock.now += 61
+    assert queue.lease('w2') == [(PROGRAM, 'program')]
+    assert status(queue, PROGRAM) == ('leased', 2)
+
+
+def test_renew_keeps_lease_alive(queue, clock):
+    queue.push(PROGRAM, 'program')
+    queue.lease('w1')
+    clock.now += 50
+    assert queue.renew('w1', PROGRAM)
+    clock.now += 50
+    assert queue.lease('w2') == []
+    assert not queue.renew('w2', PROGRAM)
+
+
+def test_complete_rejected_after_lease_moves(queue, clock):
+    queue.push(PROGRAM, 'program')
+    queue.lease('w1')
+    clock.now += 61
+    queue.lease('w2')
+    # worker เดิมกลับมาหลัง lease หมด - ผลถูกทิ้ง, renew ก็ไม่ได้
+    assert not queue.renew('w1', PROGRAM)
+    assert not queue.complete('w1', PROGRAM, {'url': PROGRAM, 'worker': 'w1'})
+    assert queue.complete('w2', PROGRAM, {'url': PROGRAM, 'worker': 'w2'})
+    assert not queue.complete('w2', PROGRAM, {'url': PROGRAM, 'worker': 'w2'})
+    assert list(queue.results()) == [{'url': PROGRAM, 'worker': 'w2'}]
+    assert queue.stats() == {'pending': 0, 'leased': 0, 'done': 1, 'failed': 0, 'results': 1}
+
+
+def test_retry_backoff_then_failed(queue, clock):
+    queue.push(PROGRAM, 'program')
+    queue.lease('w1')
+    assert queue.fail('w1', PROGRAM, 'timeout') == 'pending'
+    # backoff 30s หลังครั้งแรก, 60s หลังครั้งที่สอง
+    clock.now += 29
+    assert queue.lease('w1') == []
+    clock.now += 2
+    assert queue.lease('w1') == [(PROGRAM, 'program')]
+    assert queue.fail('w1', PROGRAM, 'timeout') == 'pending'
+    clock.now += 59
+    assert queue.lease('w1') == []
+    clock.now += 2
+    assert queue.lease('w1') == [(PROGRAM, 'program')]
+    assert queue.fail('w1', PROGRAM, 'timeout') == 'failed'
+    clock.now += 3600
+    assert queue.lease('w1') == []
+    assert queue.remaining() == 0
+    assert queue.requeue_failed() == 1
+    assert queue.lease('w1') == [(PROGRAM, 'program')]
+
+
+def test_expired_lease_after_max_attempts_fails(queue, clock):
+    queue.push(PROGRAM, 'program')
+    for worker in ['w1', 'w2', 'w3']:
+        assert queue.lease(worker) == [(PROGRAM, 'program')]
+        clock.now += 61
+    assert queue.lease('w4') == []
+    assert status(queue, PROGRAM) == ('failed', 3)
+    assert queue.fail('w3', PROGRAM, 'late') is None